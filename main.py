@@ -4,6 +4,7 @@ import os
 # Mantenha seus imports originais aqui
 from modules import produtividade, faculdade, leitura, cursos, corpo, negocio, conhecimento, metas, carros
 from modules import dashboard, dump
+from modules import conexoes, rede
 #viagens, projetos, financeiro, daytrade,financeiro, daytrade, dashboard,hobbies,  decisoes, eisenhower, fear_setting, musica, filmes, series
 
 st.set_page_config(
@@ -134,8 +135,27 @@ with st.sidebar:
     
     # Botão Sincronizar (Estilo Cyberpunk)
     if st.button("⚡ SYNC_CLOUD"):
-        st.cache_data.clear()
+        conexoes.sincronizar()
+        # Refresh seletivo: só as abas cuja revisão mudou no remoto são trocadas no cache
+        alteradas = conexoes.atualizar_abas()
+        st.session_state["sync_alteradas"] = alteradas
         st.rerun()
+
+    if "sync_alteradas" in st.session_state:
+        alteradas = st.session_state["sync_alteradas"]
+        st.caption(f"🔄 {len(alteradas)} abas atualizadas" + (f": {', '.join(alteradas)}" if alteradas else ""))
+
+    # Estado do armazenamento (no modo local-first mostra a fila de sync)
+    status_backend = conexoes.get_backend().status()
+    if "pendentes" in status_backend:
+        st.caption(f"💾 {status_backend['backend'].upper()} · {status_backend['pendentes']} pendentes")
+        if status_backend["erro"]:
+            st.caption(f"⚠️ {status_backend['erro']}")
+        for falha in status_backend.get("falhas", []):
+            st.caption(f"❌ {falha['operacao']} em '{falha['aba']}' não subiu: {falha['erro']}")
+        if status_backend.get("falhas") and st.button("Descartar falhas de sync"):
+            conexoes.get_backend().descartar_falhas()
+            st.rerun()
     
     st.markdown("<div style='text-align: right; color: #555; font-size: 0.8em; margin-top: 20px;'>SYS_ID: HELIO_V1</div>", unsafe_allow_html=True)
 
@@ -165,4 +185,43 @@ pages = {
 
 """
 if choice in pages:
-    pages[choice].render_page()
\ No newline at end of file
+    conexoes.set_pagina(choice)
+    pages[choice].render_page()
+
+    # Chamadas de metadados do Sheets (open/worksheet) evitadas pelo registro de handles
+    with st.sidebar:
+        m = conexoes.get_metricas_handles(choice)
+        st.caption(f"📡 META_CALLS: {m['feitas']} feitas · {m['economizadas']} economizadas")
+
+        # Cache compartilhado de abas (uma aba baixada serve todas as páginas)
+        c = conexoes.get_stats_cache()
+        st.caption(f"🗃️ TAB_CACHE: {c['hits']} hits · {c['misses']} misses")
+        sonda = conexoes.get_stats_sonda()
+        if sonda["sondas"]:
+            st.caption(f"🛰️ REMOTE_PROBE: {sonda['sondas']} sondas · {sonda['mudancas']} mudanças · {sonda['abas_alteradas']} abas relidas")
+        snap = conexoes.get_stats_snapshots()
+        if snap["servidas"]:
+            st.caption(f"💽 SNAPSHOT: {snap['servidas']} do disco · {snap['alteradas']}/{snap['revalidadas']} alteradas no remoto")
+
+        # APIs externas (gateway HTTP): taxa de hit do cache e latência média da rede
+        for api, h in rede.get_stats().items():
+            st.caption(f"🌐 {api.upper()}: {h['taxa_hit']:.0%} hit · {h['downloads']} downloads · {h['latencia_media']*1000:.0f} ms")
+
+        # Cota do Sheets: esperas no token bucket e 429 recebidos (leitura / escrita)
+        cota = conexoes.get_stats_cota()
+        st.caption(
+            f"🚦 THROTTLE: {cota['leitura']['throttle_429'] + cota['escrita']['throttle_429']} × 429 · "
+            f"{cota['leitura']['esperas']}/{cota['escrita']['esperas']} esperas (L/E)"
+        )
+# --- FILA DE ESCRITA (write-behind) ---
+# Envia em fundo o que a página deixou na fila e mostra o estado do último envio
+conexoes.flush_escritas()
+status_escritas = conexoes.get_status_escritas()
+with st.sidebar:
+    if status_escritas["pendentes"] or status_escritas["enviando"]:
+        st.caption(f"⏳ WRITE_QUEUE: {status_escritas['pendentes']} pendentes · {len(status_escritas['enviando'])} enviando")
+    for aba, erro in status_escritas["falhas"].items():
+        st.error(f"Falha ao salvar '{aba}': {erro}")
+    if status_escritas["falhas"] and st.button("🔁 Reenviar escritas"):
+        conexoes.reenviar_escritas()
+        st.rerun()
@@ -0,0 +1,203 @@
+import gspread
+from requests.exceptions import ConnectionError, ReadTimeout
+from contextlib import contextmanager
+import threading
+import itertools
+import random
+import heapq
+import time
+
+# --- AGENDADOR DE COTA (Google Sheets) ---
+# Toda chamada à API do Sheets passa por aqui: um token bucket para leituras e outro
+# para escritas (cotas separadas na API, ~60 req/min por usuário cada), fila por
+# prioridade em cada bucket e retentativa com backoff exponencial + jitter em 429/5xx.
+# Escritas que não podem ser repetidas (append, batch com delete) só são reenviadas
+# no 429 ou depois de reler a aba e confirmar que não foram aplicadas.
+
+# Requisições por minuto por tipo e tamanho da rajada. A reposição é (limite - rajada)/60 por
+# segundo, então nenhuma janela de 60s passa do limite mesmo começando com o bucket cheio.
+LIMITE_LEITURAS_MIN = 60
+LIMITE_ESCRITAS_MIN = 60
+RAJADA = 10
+
+# Backoff: espera = min(BACKOFF_MAX, BACKOFF_BASE * 2^tentativa), com jitter na metade de cima
+MAX_TENTATIVAS = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 32.0
+
+# Prioridades (menor = passa na frente). Saves da página furam a fila das leituras de fundo.
+PRIORIDADE_INTERATIVA = 0
+PRIORIDADE_NORMAL = 1
+PRIORIDADE_FUNDO = 2
+
+# Códigos HTTP que valem nova tentativa (cota estourada ou instabilidade do Google)
+CODIGOS_TRANSITORIOS = {429, 500, 502, 503, 504}
+
+class EscritaIncerta(Exception):
+    """Escrita que pode ou não ter sido aplicada (a resposta se perdeu) e não deu para conferir."""
+
+class TokenBucket:
+    """Bucket de tokens com fila de espera por prioridade (FIFO dentro da mesma prioridade)."""
+
+    def __init__(self, capacidade, por_segundo):
+        self.capacidade = capacidade
+        self.por_segundo = por_segundo
+        self.tokens = float(capacidade)
+        self._ultimo = time.monotonic()
+        self._cond = threading.Condition()
+        self._fila = []  # heap de (prioridade, ordem de chegada)
+        self._ordem = itertools.count()
+
+    def _repor(self):
+        agora = time.monotonic()
+        self.tokens = min(self.capacidade, self.tokens + (agora - self._ultimo) * self.por_segundo)
+        self._ultimo = agora
+
+    def adquirir(self, prioridade=PRIORIDADE_NORMAL):
+        """Bloqueia até liberar um token para esta prioridade. Retorna os segundos esperados."""
+        senha = (prioridade, next(self._ordem))
+        inicio = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._fila, senha)
+            try:
+                while True:
+                    self._repor()
+                    if self._fila[0] == senha and self.tokens >= 1:
+                        self.tokens -= 1
+                        return time.monotonic() - inicio
+                    falta = (1 - self.tokens) / self.por_segundo if self.tokens < 1 else 0.05
+                    self._cond.wait(min(max(falta, 0.01), 1.0))
+            finally:
+                self._fila.remove(senha)
+                heapq.heapify(self._fila)
+                self._cond.notify_all()
+
+    def penalizar(self, segundos):
+        """Depois de um 429 ninguém mais sai do bucket até passar o tempo pedido pela API."""
+        with self._cond:
+            self._repor()
+            self.tokens = min(self.tokens, 1) - segundos * self.por_segundo
+            self._cond.notify_all()
+
+def _criar_bucket(limite_min):
+    return TokenBucket(RAJADA, max(limite_min - RAJADA, 1) / 60)
+
+_buckets = {
+    "leitura": _criar_bucket(LIMITE_LEITURAS_MIN),
+    "escrita": _criar_bucket(LIMITE_ESCRITAS_MIN),
+}
+
+# Contadores por tipo (visíveis na sidebar)
+_lock_stats = threading.Lock()
+_stats = {
+    tipo: {"chamadas": 0, "esperas": 0, "segundos_espera": 0.0, "throttle_429": 0, "retentativas": 0, "falhas": 0}
+    for tipo in _buckets
+}
+
+def _contar(tipo, chave, qtd=1):
+    with _lock_stats:
+        _stats[tipo][chave] += qtd
+
+def get_stats():
+    """Retorna {"leitura": {...}, "escrita": {...}} com chamadas, esperas no bucket, 429s e retentativas."""
+    with _lock_stats:
+        return {tipo: dict(s) for tipo, s in _stats.items()}
+
+# --- Prioridade da thread atual ---
+_local = threading.local()
+
+@contextmanager
+def prioridade(nivel):
+    """Tudo que for chamado dentro do bloco (nesta thread) usa a prioridade dada."""
+    anterior = getattr(_local, "prioridade", None)
+    _local.prioridade = nivel
+    try:
+        yield
+    finally:
+        _local.prioridade = anterior
+
+def _prioridade_atual(tipo):
+    nivel = getattr(_local, "prioridade", None)
+    if nivel is not None:
+        return nivel
+    # Escrita sempre vem de uma ação do usuário; leitura sem contexto é a renderização normal
+    return PRIORIDADE_INTERATIVA if tipo == "escrita" else PRIORIDADE_NORMAL
+
+# --- Erros ---
+def eh_transitorio(erro):
+    """429/5xx da API ou falha de rede: vale tentar de novo."""
+    if isinstance(erro, (ConnectionError, ReadTimeout)):
+        return True
+    return isinstance(erro, gspread.exceptions.APIError) and erro.code in CODIGOS_TRANSITORIOS
+
+def _retry_after(erro):
+    resposta = getattr(erro, "response", None)
+    try:
+        return float(resposta.headers.get("Retry-After"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def _espera_backoff(tentativa):
+    teto = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** tentativa)
+    return teto / 2 + random.uniform(0, teto / 2)
+
+# --- Execução ---
+def executar(tipo, func, *args, idempotente=None, verificar=None, **kwargs):
+    """
+    Executa uma chamada do gspread respeitando o bucket do tipo ("leitura" ou "escrita").
+    Em 429/5xx/rede tenta de novo com backoff exponencial + jitter (ou o Retry-After da API);
+    outros erros e a última falha sobem para quem chamou.
+    Escrita só é repetida sozinha no 429 (a API recusou, nada foi aplicado) ou se for
+    idempotente (reescrever o mesmo range). Nas outras (append, batch com delete/append),
+    rede/5xx pode ter aplicado e só perdido a resposta: verificar() relê a aba e diz se a
+    escrita já está lá; sem verificar, ou se não der para conferir, sobe EscritaIncerta.
+    """
+    bucket = _buckets[tipo]
+    nivel = _prioridade_atual(tipo)
+    if idempotente is None:
+        idempotente = tipo == "leitura"
+
+    for tentativa in range(MAX_TENTATIVAS):
+        esperou = bucket.adquirir(nivel)
+        if esperou > 0.001:
+            _contar(tipo, "esperas")
+            _contar(tipo, "segundos_espera", esperou)
+        _contar(tipo, "chamadas")
+
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if not eh_transitorio(e):
+                raise
+            limite = isinstance(e, gspread.exceptions.APIError) and e.code == 429
+            if limite:
+                _contar(tipo, "throttle_429")
+            elif not idempotente:
+                # Pode ter sido aplicada: só reenvia se a releitura mostrar que não foi
+                if verificar is None:
+                    _contar(tipo, "falhas")
+                    raise EscritaIncerta(f"{e} (sem como conferir se foi aplicada)") from e
+                try:
+                    aplicada = verificar()
+                except Exception as erro_verificacao:
+                    _contar(tipo, "falhas")
+                    raise EscritaIncerta(f"{e} (conferência falhou: {erro_verificacao})") from e
+                if aplicada:
+                    print(f"⚠️ Sheets ({tipo}) respondeu {e}, mas a escrita já estava aplicada.")
+                    return None
+            if tentativa == MAX_TENTATIVAS - 1:
+                _contar(tipo, "falhas")
+                raise
+
+            espera = _espera_backoff(tentativa)
+            if limite:
+                espera = _retry_after(e) or espera
+            _contar(tipo, "retentativas")
+            print(f"⚠️ Sheets ({tipo}) respondeu {e}. Tentando de novo em {espera:.1f}s... ({tentativa+1}/{MAX_TENTATIVAS})")
+
+            if limite:
+                # A espera vira dívida no bucket: segura esta e as outras threads do mesmo tipo,
+                # e quando liberar a ordem de prioridade continua valendo
+                bucket.penalizar(espera)
+            else:
+                time.sleep(espera)
@@ -0,0 +1,387 @@
+import pandas as pd
+import numpy as np
+import gspread
+import sqlite3
+import threading
+import time
+import json
+import io
+import os
+
+from modules import agendador
+
+# Banco local (a pasta "data" é criada pelo main.py)
+CAMINHO_LOCAL = os.path.join("data", "life_os.db")
+
+# Intervalo (s) entre sincronizações do modo local-first
+INTERVALO_SYNC = 60
+
+# Tabela (no mesmo banco local) com as escritas do local-first que ainda não subiram
+TABELA_FILA = "_fila_sync"
+
+# --- DIFF (compartilhado entre os backends) ---
+def calcular_diff(df_original, df_editado):
+    """
+    Compara snapshot x editado (ambos já em texto) pelo índice do load.
+    Retorna None se a estrutura mudou (colunas/índice), senão
+    (comuns, removidas, novas, linhas_mud, cols_mud).
+    """
+    estrutura_ok = (
+        list(df_original.columns) == list(df_editado.columns)
+        and df_original.index.is_unique and df_editado.index.is_unique
+        and pd.api.types.is_integer_dtype(df_original.index)
+        and (len(df_original) == 0 or df_original.index.min() >= 0)
+    )
+    if not estrutura_ok:
+        return None
+
+    comuns = df_original.index.intersection(df_editado.index)
+    removidas = df_original.index.difference(df_editado.index)
+    novas = [i for i in df_editado.index if i not in df_original.index]
+
+    # Comparação vetorizada das linhas que continuam existindo
+    antes = df_original.loc[comuns].values
+    depois = df_editado.loc[comuns].values
+    linhas_mud, cols_mud = np.nonzero(antes != depois)
+    return comuns, removidas, novas, linhas_mud, cols_mud
+
+def aplicar_anexar(atual, df):
+    """Texto da aba depois de um append: colunas novas entram no fim do cabeçalho."""
+    colunas = list(atual.columns) + [c for c in df.columns if c not in atual.columns]
+    return pd.concat([
+        atual.reindex(columns=colunas, fill_value=""),
+        df.astype(str).reindex(columns=colunas, fill_value=""),
+    ], ignore_index=True)
+
+def aplicar_diff(atual, df_original, df_editado):
+    """
+    Texto da aba depois do diff snapshot -> editado, com a mesma regra do Sheets:
+    se o diff não se aplica (estrutura mudou, colunas fora da aba) o editado vira a aba inteira.
+    """
+    orig = df_original.astype(str)
+    edit = df_editado.astype(str)
+    plano = calcular_diff(orig, edit)
+    if atual is None or plano is None or not all(c in atual.columns for c in edit.columns):
+        return edit.reset_index(drop=True)
+
+    comuns, removidas, novas, _, _ = plano
+    atual = atual.reset_index(drop=True)
+    comuns = [i for i in comuns if i < len(atual)]
+    atual.loc[comuns, list(edit.columns)] = edit.loc[comuns].values
+    atual = atual.drop(index=[i for i in removidas if i < len(atual)])
+    if novas:
+        atual = pd.concat([atual, edit.loc[novas].reindex(columns=atual.columns, fill_value="")], ignore_index=True)
+    return atual.reset_index(drop=True)
+
+# --- INTERFACE ---
+class Backend:
+    """
+    Contrato dos backends de armazenamento. Trabalham com a aba INTEIRA (todas as colunas);
+    a projeção nas colunas esperadas fica no conexoes.
+    """
+    nome = "base"
+
+    def ler(self, aba):
+        """DataFrame com a aba inteira, ou None se a aba não existe. Erros de conexão sobem."""
+        raise NotImplementedError
+
+    def ler_lote(self, abas, modo=None, max_workers=None):
+        """{aba: DataFrame ou None}. Abas que falharam ficam de fora do dicionário."""
+        resultado = {}
+        for aba in abas:
+            try:
+                resultado[aba] = self.ler(aba)
+            except Exception as e:
+                print(f"❌ Erro fatal ao ler '{aba}': {e}")
+        return resultado
+
+    def salvar(self, aba, df):
+        raise NotImplementedError
+
+    def anexar(self, aba, df):
+        raise NotImplementedError
+
+    def salvar_diff(self, aba, df_original, df_editado):
+        raise NotImplementedError
+
+    def status(self):
+        return {"backend": self.nome}
+
+# --- BACKEND LOCAL (SQLite) ---
+class BackendLocal(Backend):
+    """
+    Uma tabela SQLite por aba, tudo guardado como texto (igual ao que o save_gsheet sobe).
+    Na leitura os números são convertidos como no get_all_records do gspread.
+    """
+    nome = "local"
+
+    def __init__(self, caminho=CAMINHO_LOCAL):
+        self.caminho = caminho
+        self._lock = threading.RLock()
+        pasta = os.path.dirname(caminho)
+        if pasta and not os.path.exists(pasta):
+            os.makedirs(pasta)
+
+    def _conectar(self):
+        return sqlite3.connect(self.caminho)
+
+    @staticmethod
+    def _q(nome):
+        return '"' + str(nome).replace('"', '""') + '"'
+
+    def listar_abas(self):
+        with self._lock, self._conectar() as con:
+            nomes = [r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+        # Fora as tabelas internas (fila de sync e as do próprio SQLite)
+        return [n for n in nomes if n != TABELA_FILA and not n.startswith("sqlite_")]
+
+    def _existe(self, con, aba):
+        return con.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (aba,)).fetchone() is not None
+
+    def _ler_texto(self, con, aba):
+        if not self._existe(con, aba):
+            return None
+        return pd.read_sql(f"SELECT * FROM {self._q(aba)} ORDER BY rowid", con).fillna("")
+
+    def ler(self, aba):
+        with self._lock, self._conectar() as con:
+            df = self._ler_texto(con, aba)
+        if df is None:
+            return None
+        return df.map(gspread.utils.numericise)
+
+    def salvar(self, aba, df):
+        with self._lock, self._conectar() as con:
+            df.astype(str).to_sql(aba, con, if_exists="replace", index=False)
+
+    def anexar(self, aba, df):
+        if df.empty:
+            return
+        with self._lock, self._conectar() as con:
+            if not self._existe(con, aba):
+                df.astype(str).to_sql(aba, con, index=False)
+                return
+            colunas = [r[1] for r in con.execute(f"PRAGMA table_info({self._q(aba)})")]
+            for col in df.columns:
+                if col not in colunas:
+                    con.execute(f"ALTER TABLE {self._q(aba)} ADD COLUMN {self._q(col)} TEXT DEFAULT ''")
+                    colunas.append(col)
+            df.astype(str).reindex(columns=colunas, fill_value="").to_sql(aba, con, if_exists="append", index=False)
+
+    def salvar_diff(self, aba, df_original, df_editado):
+        with self._lock, self._conectar() as con:
+            atual = aplicar_diff(self._ler_texto(con, aba), df_original, df_editado)
+            atual.to_sql(aba, con, if_exists="replace", index=False)
+
+    # --- Fila de sync (usada pelo local-first) ---
+    def _criar_fila(self, con):
+        con.execute(
+            f"CREATE TABLE IF NOT EXISTS {TABELA_FILA} ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, aba TEXT, operacao TEXT, args TEXT, "
+            "status TEXT DEFAULT 'pendente', erro TEXT, ts REAL)"
+        )
+
+    def enfileirar(self, aba, operacao, args):
+        """Guarda a operação (args = DataFrames) na fila. Um "salvar" substitui as pendentes da aba. Retorna o id."""
+        dados = json.dumps([df.to_json(orient="split") for df in args])
+        with self._lock, self._conectar() as con:
+            self._criar_fila(con)
+            if operacao == "salvar":
+                con.execute(f"DELETE FROM {TABELA_FILA} WHERE aba=? AND status='pendente'", (aba,))
+            cur = con.execute(
+                f"INSERT INTO {TABELA_FILA} (aba, operacao, args, ts) VALUES (?, ?, ?, ?)",
+                (aba, operacao, dados, time.time()),
+            )
+            return cur.lastrowid
+
+    def ler_fila(self, status="pendente"):
+        """Pendentes: [(id, aba, operacao, args)]; falhas: [(id, aba, operacao, erro)]. Na ordem da fila."""
+        with self._lock, self._conectar() as con:
+            self._criar_fila(con)
+            linhas = con.execute(
+                f"SELECT id, aba, operacao, args, erro FROM {TABELA_FILA} WHERE status=? ORDER BY id", (status,)
+            ).fetchall()
+        if status != "pendente":
+            return [(id_op, aba, operacao, erro) for id_op, aba, operacao, _, erro in linhas]
+        return [
+            (id_op, aba, operacao, tuple(
+                pd.read_json(io.StringIO(txt), orient="split", dtype=False, convert_dates=False)
+                for txt in json.loads(dados)
+            ))
+            for id_op, aba, operacao, dados, _ in linhas
+        ]
+
+    def concluir(self, id_op):
+        with self._lock, self._conectar() as con:
+            con.execute(f"DELETE FROM {TABELA_FILA} WHERE id=?", (id_op,))
+
+    def descartar_falhas(self):
+        with self._lock, self._conectar() as con:
+            self._criar_fila(con)
+            con.execute(f"DELETE FROM {TABELA_FILA} WHERE status='falhou'")
+
+    def marcar_falha(self, id_op, erro):
+        """A operação sai da fila mas fica guardada (status "falhou") para o usuário ver."""
+        with self._lock, self._conectar() as con:
+            con.execute(f"UPDATE {TABELA_FILA} SET status='falhou', erro=?, ts=? WHERE id=?", (str(erro), time.time(), id_op))
+
+# --- BACKEND LOCAL-FIRST ---
+class BackendLocalFirst(Backend):
+    """
+    Leituras e escritas vão direto no banco local; um sincronizador em background
+    empurra as escritas pendentes para o remoto (Sheets) e puxa as abas alteradas lá.
+    A fila de pendentes fica no próprio banco local, então sobrevive a um restart.
+    Operação recusada pelo remoto (erro não transitório) sai da fila como "falhou".
+    """
+    nome = "local-first"
+
+    def __init__(self, local, remoto, intervalo=INTERVALO_SYNC, iniciar=True):
+        self.local = local
+        self.remoto = remoto
+        self.intervalo = intervalo
+        self._lock = threading.RLock()
+        self._pendentes = {}  # aba -> [(id, operacao, args), ...] na ordem em que aconteceram
+        for id_op, aba, operacao, args in local.ler_fila():
+            self._pendentes.setdefault(aba, []).append((id_op, operacao, args))
+        self._falhas = local.ler_fila("falhou")  # [(id, aba, operacao, erro)]
+        self._evento = threading.Event()
+        self.ultimo_sync = None
+        self.ultimo_erro = None
+        self._thread = None
+        if iniciar:
+            self.iniciar()
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="sync-local-first", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            self._evento.wait(self.intervalo)
+            self._evento.clear()
+            try:
+                self.sincronizar()
+            except Exception as e:
+                self.ultimo_erro = str(e)
+                print(f"⚠️ Sync local-first falhou: {e}")
+
+    def sincronizar_agora(self):
+        """Acorda o sincronizador sem esperar o intervalo."""
+        self._evento.set()
+
+    # --- Leitura ---
+    def ler(self, aba):
+        df = self.local.ler(aba)
+        if df is None:
+            # Primeira vez que a aba é pedida: puxa do remoto e guarda localmente
+            df = self.remoto.ler(aba)
+            if df is not None:
+                with self._lock:
+                    self.local.salvar(aba, df)
+        return df
+
+    def ler_lote(self, abas, modo=None, max_workers=None):
+        resultado = {aba: self.local.ler(aba) for aba in abas}
+        faltando = [aba for aba, df in resultado.items() if df is None]
+        if faltando:
+            for aba, df in self.remoto.ler_lote(faltando, modo=modo, max_workers=max_workers).items():
+                resultado[aba] = df
+                if df is not None:
+                    with self._lock:
+                        self.local.salvar(aba, df)
+        return resultado
+
+    # --- Escrita (local na hora, remoto na fila) ---
+    # A operação entra na fila persistente antes da escrita local: se cair no meio,
+    # o restart ainda empurra a escrita (e o pull traz ela de volta para o local).
+    def _enfileirar(self, aba, operacao, args):
+        id_op = self.local.enfileirar(aba, operacao, args)
+        if operacao == "salvar":
+            # Uma reescrita completa torna as operações anteriores da aba irrelevantes
+            self._pendentes[aba] = []
+        self._pendentes.setdefault(aba, []).append((id_op, operacao, args))
+
+    def salvar(self, aba, df):
+        with self._lock:
+            self._enfileirar(aba, "salvar", (df.copy(),))
+            self.local.salvar(aba, df)
+        self.sincronizar_agora()
+
+    def anexar(self, aba, df):
+        with self._lock:
+            self._enfileirar(aba, "anexar", (df.copy(),))
+            self.local.anexar(aba, df)
+        self.sincronizar_agora()
+
+    def salvar_diff(self, aba, df_original, df_editado):
+        with self._lock:
+            self._enfileirar(aba, "salvar_diff", (df_original.copy(), df_editado.copy()))
+            self.local.salvar_diff(aba, df_original, df_editado)
+        self.sincronizar_agora()
+
+    # --- Sincronização ---
+    def sincronizar(self):
+        """Empurra as escritas pendentes (na ordem) e depois puxa as abas sem pendências."""
+        # 1. Push
+        with self._lock:
+            abas_pendentes = list(self._pendentes)
+        for aba in abas_pendentes:
+            while True:
+                with self._lock:
+                    fila = self._pendentes.get(aba)
+                    if not fila:
+                        self._pendentes.pop(aba, None)
+                        break
+                    id_op, operacao, args = fila[0]
+                try:
+                    getattr(self.remoto, operacao)(aba, *args)
+                except Exception as e:
+                    self.ultimo_erro = f"{aba}: {e}"
+                    if agendador.eh_transitorio(e):
+                        # Mantém na fila para a próxima rodada
+                        print(f"⚠️ Push de '{aba}' falhou: {e}")
+                        break
+                    # Recusada pelo remoto: tentar de novo não adianta e travaria as próximas da aba
+                    print(f"❌ Push de '{aba}' ({operacao}) recusado: {e}. Operação separada como falha.")
+                    with self._lock:
+                        self.local.marcar_falha(id_op, e)
+                        self._falhas.append((id_op, aba, operacao, str(e)))
+                else:
+                    with self._lock:
+                        self.local.concluir(id_op)
+                with self._lock:
+                    fila = self._pendentes.get(aba)
+                    if fila and fila[0][0] == id_op:
+                        fila.pop(0)
+
+        # 2. Pull (uma leitura em lote de todas as abas locais), atrás das leituras da página
+        abas_locais = [a for a in self.local.listar_abas() if a not in self._pendentes]
+        if abas_locais:
+            with agendador.prioridade(agendador.PRIORIDADE_FUNDO):
+                remotas = self.remoto.ler_lote(abas_locais)
+            with self._lock:
+                for aba, df in remotas.items():
+                    # Não sobrescreve o que foi escrito localmente durante o pull
+                    if df is not None and aba not in self._pendentes:
+                        self.local.salvar(aba, df)
+
+        self.ultimo_sync = time.time()
+
+    def descartar_falhas(self):
+        """Esquece as operações que o remoto recusou (depois que o usuário viu)."""
+        with self._lock:
+            self.local.descartar_falhas()
+            self._falhas = []
+
+    def status(self):
+        with self._lock:
+            pendentes = sum(len(f) for f in self._pendentes.values())
+            falhas = [{"aba": aba, "operacao": operacao, "erro": erro} for _, aba, operacao, erro in self._falhas]
+        return {
+            "backend": self.nome,
+            "pendentes": pendentes,
+            "falhas": falhas,
+            "ultimo_sync": self.ultimo_sync,
+            "erro": self.ultimo_erro,
+        }
@@ -0,0 +1,109 @@
+import joblib
+import inspect
+import functools
+import threading
+from collections import OrderedDict
+import os
+
+# --- CACHE DE MODELOS AJUSTADOS ---
+# Guarda o resultado de funções que ajustam modelos (ARIMAX, regressão) numa chave feita de:
+# colunas de entrada usadas + parâmetros da chamada + código-fonte da função (mudou o código
+# ou uma constante dele, refaz).
+# Primeiro procura na memória do processo, depois em data/modelos/<funcao>_<hash>.joblib;
+# só ajusta de novo quando os dados de entrada mudam.
+
+PASTA_MODELOS = os.path.join("data", "modelos")
+
+# Arquivos mantidos por função (os mais recentes); os dados mudam pouco por dia
+MAX_ARQUIVOS_POR_MODELO = 5
+
+# Resultados guardados na memória do processo (LRU); o resto continua no disco
+MAX_MEMORIA = 32
+
+_lock = threading.Lock()
+_memoria = OrderedDict()  # chave -> resultado, do menos para o mais usado recente
+_stats = {"hits_memoria": 0, "hits_disco": 0, "ajustes": 0}
+
+def get_stats():
+    """Quantas chamadas saíram da memória, do disco e quantas ajustaram o modelo de novo."""
+    with _lock:
+        return dict(_stats)
+
+def _versao(func):
+    # Código-fonte inteiro (constantes, defaults, funções internas); sem fonte, bytecode + constantes
+    try:
+        return inspect.getsource(func)
+    except (OSError, TypeError):
+        return (func.__code__.co_code, repr(func.__code__.co_consts))
+
+def _chave(func, versao, colunas, args, kwargs):
+    params = inspect.signature(func).bind(*args, **kwargs)
+    params.apply_defaults()
+    argumentos = dict(params.arguments)
+    df = argumentos.pop(next(iter(argumentos)))  # primeiro argumento é o DataFrame
+    dados = df[[c for c in colunas if c in df.columns]].reset_index(drop=True)
+    return joblib.hash((func.__qualname__, versao, dados, argumentos))
+
+def _guardar(chave, resultado):
+    # Chamar com _lock
+    _memoria[chave] = resultado
+    _memoria.move_to_end(chave)
+    while len(_memoria) > MAX_MEMORIA:
+        _memoria.popitem(last=False)
+
+def _caminho(func, chave):
+    return os.path.join(PASTA_MODELOS, f"{func.__name__}_{chave}.joblib")
+
+def _limpar_antigos(func):
+    prefixo = f"{func.__name__}_"
+    arquivos = sorted(
+        (os.path.join(PASTA_MODELOS, a) for a in os.listdir(PASTA_MODELOS) if a.startswith(prefixo)),
+        key=os.path.getmtime, reverse=True,
+    )
+    for caminho in arquivos[MAX_ARQUIVOS_POR_MODELO:]:
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+
+def cache_modelo(colunas):
+    """
+    Decorador para func(df, ...) que ajusta um modelo. Só as `colunas` do DF entram na chave,
+    então editar outra coluna da aba não força um novo ajuste.
+    """
+    def decorador(func):
+        versao = _versao(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            chave = _chave(func, versao, colunas, args, kwargs)
+            with _lock:
+                if chave in _memoria:
+                    _memoria.move_to_end(chave)
+                    _stats["hits_memoria"] += 1
+                    return _memoria[chave]
+
+            caminho = _caminho(func, chave)
+            if os.path.exists(caminho):
+                try:
+                    resultado = joblib.load(caminho)
+                    with _lock:
+                        _guardar(chave, resultado)
+                        _stats["hits_disco"] += 1
+                    return resultado
+                except Exception as e:
+                    print(f"⚠️ Cache de '{func.__name__}' ilegível, ajustando de novo: {e}")
+
+            resultado = func(*args, **kwargs)
+            with _lock:
+                _guardar(chave, resultado)
+                _stats["ajustes"] += 1
+            try:
+                os.makedirs(PASTA_MODELOS, exist_ok=True)
+                joblib.dump(resultado, caminho)
+                _limpar_antigos(func)
+            except Exception as e:
+                print(f"⚠️ Não foi possível gravar o cache de '{func.__name__}': {e}")
+            return resultado
+        return wrapper
+    return decorador
@@ -4,7 +4,8 @@ import requests
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mtick
 from datetime import date
-from modules import conexoes
+from concurrent.futures import ThreadPoolExecutor
+from modules import conexoes, schemas, rede
 
 # --- CONFIGURAÇÕES VISUAIS (ESTILO TÉCNICO) ---
 plt.style.use('bmh')
@@ -13,51 +14,94 @@ plt.style.use('bmh')
 FIPE_BASE_URL = "https://parallelum.com.br/fipe/api/v1"
 
 # --- CACHE & NETWORK ---
-@st.cache_data(ttl=3600)
+# Cache em disco e TTL por endpoint ficam no gateway (modules/rede.py)
 def get_marcas(tipo_veiculo):
     url = f"{FIPE_BASE_URL}/{tipo_veiculo}/marcas"
-    try: return requests.get(url).json()
+    try: return rede.get_json(url)
     except: return []
 
-@st.cache_data(ttl=600)
 def get_modelos(tipo_veiculo, marca_id):
     url = f"{FIPE_BASE_URL}/{tipo_veiculo}/marcas/{marca_id}/modelos"
-    try: return requests.get(url).json()['modelos']
+    try: return rede.get_json(url)['modelos']
     except: return []
 
-@st.cache_data(ttl=600)
 def get_anos(tipo_veiculo, marca_id, modelo_id):
     url = f"{FIPE_BASE_URL}/{tipo_veiculo}/marcas/{marca_id}/modelos/{modelo_id}/anos"
-    try: return requests.get(url).json()
+    try: return rede.get_json(url)
     except: return []
 
 def get_fipe_details(tipo_veiculo, marca_id, modelo_id, ano_id):
     url = f"{FIPE_BASE_URL}/{tipo_veiculo}/marcas/{marca_id}/modelos/{modelo_id}/anos/{ano_id}"
-    try: return requests.get(url).json()
+    try: return rede.get_json(url)
     except: return None
 
 # --- LÓGICA DE INTELIGÊNCIA TEMPORAL (DO SCRIPT A PARA O B) ---
-def get_historico_precos(tipo_veiculo, marca_id, modelo_id, lista_anos_codigos):
+# O preço de um ano-modelo só muda na virada do mês da tabela: cache longo por (tipo, marca, modelo, ano)
+TTL_PRECO_ANO = 30 * 86400
+
+# Requisições simultâneas à API FIPE (todas as séries comparadas dividem o mesmo pool)
+MAX_WORKERS_FIPE = 6
+
+def _preco_do_ano(tipo_veiculo, marca_id, modelo_id, item_ano):
+    url = f"{FIPE_BASE_URL}/{tipo_veiculo}/marcas/{marca_id}/modelos/{modelo_id}/anos/{item_ano['codigo']}"
+    try:
+        r = rede.get_json(url, ttl=TTL_PRECO_ANO)
+        valor = float(r['Valor'].replace("R$ ", "").replace(".", "").replace(",", "."))
+        # Tratamento para ano: Se for "32000" é Zero KM, convertemos para ano atual + 1 ou label específico
+        return {'Ano': r['AnoModelo'], 'Preco': valor, 'Label': item_ano['nome']}
+    except (rede.ErroHTTP, requests.RequestException, KeyError, ValueError):
+        return None
+
+def get_historicos_precos(tipo_veiculo, modelos, max_anos=None):
     """
-    Itera sobre os anos disponíveis do modelo para construir o gráfico de desvalorização.
-    Limita aos últimos 6 anos para performance.
+    Curvas de desvalorização de vários modelos numa rajada só.
+    modelos: [(marca_id, modelo_id, lista_anos_codigos), ...]. Retorna um DF por modelo, na mesma ordem.
+    Todos os anos-modelo entram (ou só os max_anos mais recentes de cada um).
     """
-    dataset = []
-    # Pega apenas os 6 anos mais recentes para não travar a API
-    alvo = lista_anos_codigos[:6] 
-    
-    for item_ano in alvo:
-        url = f"{FIPE_BASE_URL}/{tipo_veiculo}/marcas/{marca_id}/modelos/{modelo_id}/anos/{item_ano['codigo']}"
-        try:
-            r = requests.get(url).json()
-            valor = float(r['Valor'].replace("R$ ", "").replace(".", "").replace(",", "."))
-            # Tratamento para ano: Se for "32000" é Zero KM, convertemos para ano atual + 1 ou label específico
-            ano_num = r['AnoModelo']
-            dataset.append({'Ano': ano_num, 'Preco': valor, 'Label': item_ano['nome']})
-        except:
-            continue
-    
-    return pd.DataFrame(dataset).sort_values('Ano')
+    tarefas = []
+    for i, (marca_id, modelo_id, anos) in enumerate(modelos):
+        alvo = anos if max_anos is None else anos[:max_anos]
+        tarefas += [(i, marca_id, modelo_id, item_ano) for item_ano in alvo]
+
+    linhas = [[] for _ in modelos]
+    if tarefas:
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS_FIPE, len(tarefas))) as pool:
+            futuros = [(i, pool.submit(_preco_do_ano, tipo_veiculo, marca, modelo, item)) for i, marca, modelo, item in tarefas]
+            for i, futuro in futuros:
+                linha = futuro.result()
+                if linha is not None:
+                    linhas[i].append(linha)
+
+    return [
+        pd.DataFrame(l).sort_values('Ano') if l else pd.DataFrame(columns=['Ano', 'Preco', 'Label'])
+        for l in linhas
+    ]
+
+def get_historico_precos(tipo_veiculo, marca_id, modelo_id, lista_anos_codigos, max_anos=None):
+    """Constrói o gráfico de desvalorização com todos os anos disponíveis do modelo (em paralelo)."""
+    return get_historicos_precos(tipo_veiculo, [(marca_id, modelo_id, lista_anos_codigos)], max_anos)[0]
+
+def codigos_fipe(tipo_veiculo, marca_nome, modelo_nome):
+    """(marca_id, modelo_id, anos) de um veículo guardado por nome na garagem, ou None se sumiu da FIPE."""
+    marca_id = {m['nome']: m['codigo'] for m in get_marcas(tipo_veiculo)}.get(marca_nome)
+    if marca_id is None:
+        return None
+    modelo_id = {m['nome']: m['codigo'] for m in get_modelos(tipo_veiculo, marca_id)}.get(modelo_nome)
+    if modelo_id is None:
+        return None
+    return marca_id, modelo_id, get_anos(tipo_veiculo, marca_id, modelo_id)
+
+def plotar_comparativo(curvas):
+    """Curvas de desvalorização de vários modelos no mesmo gráfico. curvas: {nome: df_hist}"""
+    fig, ax = plt.subplots(figsize=(10, 5))
+    for nome, df_hist in curvas.items():
+        if not df_hist.empty:
+            ax.plot(df_hist['Ano'], df_hist['Preco'], marker='o', linewidth=2.5, label=nome)
+    ax.set_title("Desvalorização Comparada", fontweight='bold', fontsize=12)
+    ax.yaxis.set_major_formatter(mtick.StrMethodFormatter('R$ {x:,.0f}'))
+    ax.grid(True, linestyle='--', alpha=0.6)
+    ax.legend()
+    return fig
 
 def plotar_grafico_tecnico(df_hist, modelo_nome):
     """Gera o objeto Figure do Matplotlib para renderizar no Streamlit"""
@@ -101,13 +145,8 @@ def load_data():
     
     if df.empty: df = pd.DataFrame(columns=cols)
     else:
-        for col in cols:
-            if col not in df.columns: df[col] = 0 if col in ["ID", "Fipe_Ref", "Preco_Negociado"] else ""
-
-    # Safe Cast
-    numeric_cols = ["ID", "Fipe_Ref", "Preco_Negociado", "KM", "Zero_Cem", "Consumo_Medio"]
-    for c in numeric_cols:
-        df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0)
+        # Colunas faltando entram com o default do schema (tipos já aplicados no load)
+        df = schemas.completar_colunas("Carros", df, cols)
         
     return df
 
@@ -161,7 +200,7 @@ def render_page():
                         if st.button("🔎 Executar Análise Técnica", type="primary"):
                             # Pega dado pontual
                             dados_fipe = get_fipe_details(tipo_veiculo, id_marca, id_modelo, id_ano)
-                            # Pega histórico (Loop do Script A)
+                            # Pega histórico (todos os anos-modelo, em paralelo)
                             df_hist = get_historico_precos(tipo_veiculo, id_marca, id_modelo, anos)
                             
                             st.session_state['analise_atual'] = {
@@ -291,5 +330,20 @@ def render_page():
                     diff_km = dB['KM'] - dA['KM']
                     st.metric("KM", f"{dB['KM']:,}", f"{diff_km:,}", delta_color="inverse")
 
+                # Curvas dos dois modelos numa rajada só (todos os anos-modelo dos dois em paralelo)
+                if st.button("📉 Comparar Desvalorização"):
+                    veiculos = [(v['Tipo'], v['Modelo'], codigos_fipe(v['Tipo'], v['Marca'], v['Modelo'])) for v in (dA, dB)]
+                    achados = [(tipo, nome, cod) for tipo, nome, cod in veiculos if cod is not None]
+                    for tipo, nome, cod in veiculos:
+                        if cod is None:
+                            st.warning(f"{nome} não foi encontrado na FIPE.")
+                    curvas = {}
+                    for tipo in {t for t, _, _ in achados}:
+                        do_tipo = [(nome, cod) for t, nome, cod in achados if t == tipo]
+                        historicos = get_historicos_precos(tipo, [cod for _, cod in do_tipo])
+                        curvas.update({nome: h for (nome, _), h in zip(do_tipo, historicos)})
+                    if any(not h.empty for h in curvas.values()):
+                        st.pyplot(plotar_comparativo(curvas))
+
 if __name__ == "__main__":
     render_page()
\ No newline at end of file
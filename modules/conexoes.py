@@ -2,90 +2,1089 @@ import streamlit as st
 import pandas as pd
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
-from requests.exceptions import ConnectionError, ReadTimeout
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import hashlib
+import json
 import time
+import os
+import re
+
+from modules.armazenamento import Backend, BackendLocal, BackendLocalFirst, calcular_diff, aplicar_anexar, aplicar_diff
+from modules import schemas, agendador
 
 PLANILHA_NOME = "Life_OS_Database"
 
+# Tempo (s) que um handle de aba fica válido antes de reler os metadados da planilha
+HANDLE_TTL = 300
+
+# Leitura de várias abas: "batch" (1 requisição values:batchGet) ou "paralelo" (pool de threads)
+MODO_LEITURA_LOTE = "batch"
+
+# Máximo de leituras simultâneas no modo paralelo (a cota do Sheets é ~60 leituras/min por usuário)
+MAX_WORKERS_LEITURA = 4
+
+# Backend padrão: "sheets", "local" (SQLite, sem rede) ou "local-first" (local + sync em background)
+BACKEND_PADRAO = "sheets"
+
+# Fila de escrita (write-behind): janela (s) para juntar escritas seguidas na mesma aba antes do envio
+JANELA_ESCRITA = 0.3
+
+# Tempo máximo (s) que uma leitura espera as escritas pendentes da mesma aba
+TIMEOUT_ESPERA_ESCRITA = 30
+
+# Tempo (s) que a aba inteira fica no cache compartilhado entre as páginas
+TTL_CACHE_ABAS = 600
+
+# Snapshot em disco (Parquet tipado) de cada aba: serve o primeiro render depois de reiniciar o
+# servidor e é revalidado em fundo. Só vale para o backend Sheets com o cliente real.
+SNAPSHOTS_ATIVOS = True
+PASTA_SNAPSHOTS = os.path.join("data", "snapshots")
+
+# Sonda de mudança remota: no máximo a cada INTERVALO_SONDA (s) pergunta ao Drive o modifiedTime da
+# planilha. Sem mudança o cache inteiro continua válido (o TTL vira só rede de segurança);
+# com mudança as abas em cache são relidas num lote e só as de revisão diferente são trocadas.
+SONDA_ATIVA = True
+INTERVALO_SONDA = 30
+
 # Cache para não reconectar toda hora
 @st.cache_resource
 def conectar_gsheets():
+    # Modo offline: SHEETS_FAKE aponta para as fixtures do cliente falso (sem credenciais nem rede)
+    caminho_fake = os.environ.get("SHEETS_FAKE")
+    if caminho_fake:
+        from modules.sheets_fake import FakeClient
+        return FakeClient.de_pasta(caminho_fake, latencia=float(os.environ.get("SHEETS_FAKE_LATENCIA", 0)))
+
     # Pega as credenciais dos secrets do Streamlit
     credentials_dict = st.secrets["gcp_service_account"]
-    
+
     # Escopos necessários
     scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    
+
     creds = ServiceAccountCredentials.from_json_keyfile_dict(credentials_dict, scope)
     client = gspread.authorize(creds)
     return client
 
-# Em modules/conexoes.py
+# --- REGISTRO DE HANDLES (Planilha + Abas) ---
+# A planilha é aberta uma única vez por processo e as abas ficam guardadas por nome.
+# Antes, cada load/save fazia client.open() + sh.worksheet() = 2 chamadas de metadados.
+_lock_handles = threading.RLock()
+_planilha = None
+_abas = {}  # nome_aba -> (worksheet, timestamp)
+_cabecalhos = {}  # nome_aba -> lista de colunas da linha 1 (usado pelo append_rows)
 
-def load_gsheet(aba, cols_esperadas):
+# Contabilidade de chamadas de metadados por página (visível na sidebar)
+_pagina_atual = "Global"
+_metricas_handles = {}
+
+def set_pagina(nome):
+    """Define a página atual para contabilizar as chamadas de metadados."""
+    global _pagina_atual
+    _pagina_atual = nome
+
+def _registrar_metrica(chave, qtd=1):
+    m = _metricas_handles.setdefault(_pagina_atual, {"feitas": 0, "economizadas": 0})
+    m[chave] += qtd
+
+def get_metricas_handles(pagina=None):
     """
-    Carrega dados da aba com tratamento de erro de conexão e retentativas.
+    Retorna {"feitas": n, "economizadas": m} da página (ou de todas, se None).
+    'economizadas' conta as chamadas open/worksheet que o modelo antigo teria feito.
+    """
+    with _lock_handles:
+        if pagina is not None:
+            return dict(_metricas_handles.get(pagina, {"feitas": 0, "economizadas": 0}))
+        return {p: dict(m) for p, m in _metricas_handles.items()}
+
+# Cliente injetado (ex.: o FakeClient de modules/sheets_fake.py em benchmarks/testes)
+_cliente_override = None
+
+def set_cliente(cliente):
+    """
+    Troca o cliente gspread do processo (None volta para o conectar_gsheets).
+    Descarta os handles abertos com o cliente anterior.
+    """
+    global _cliente_override
+    with _lock_handles:
+        _cliente_override = cliente
+        invalidar_handles()
+    invalidar_cache()
+    _sonda["versao"] = None
+
+def _get_cliente():
+    return _cliente_override if _cliente_override is not None else conectar_gsheets()
+
+def _get_planilha():
+    global _planilha
+    with _lock_handles:
+        if _planilha is None:
+            cliente = _get_cliente()
+            _planilha = agendador.executar("leitura", cliente.open, PLANILHA_NOME)
+            _registrar_metrica("feitas")
+        else:
+            _registrar_metrica("economizadas")
+        return _planilha
+
+def _recarregar_abas():
+    # Uma única leitura de metadados traz TODAS as abas de uma vez
+    sh = _get_planilha()
+    agora = time.time()
+    lista = agendador.executar("leitura", sh.worksheets)
+    _registrar_metrica("feitas")
+    _abas.clear()
+    for ws in lista:
+        _abas[ws.title] = (ws, agora)
+
+def get_worksheet(aba):
+    """
+    Retorna o handle da aba a partir do registro (relê os metadados só se expirou ou sumiu).
+    Levanta gspread.exceptions.WorksheetNotFound se a aba não existir na planilha.
+    """
+    with _lock_handles:
+        item = _abas.get(aba)
+        if item is not None and time.time() - item[1] < HANDLE_TTL:
+            _registrar_metrica("economizadas")
+            return item[0]
+
+        _recarregar_abas()
+        item = _abas.get(aba)
+        if item is None:
+            raise gspread.exceptions.WorksheetNotFound(aba)
+        return item[0]
+
+def invalidar_handles(aba=None):
+    """
+    Descarta o handle de uma aba (renomeada/apagada) ou o registro inteiro se aba=None.
     """
+    global _planilha
+    with _lock_handles:
+        if aba is None:
+            _planilha = None
+            _abas.clear()
+            _cabecalhos.clear()
+        else:
+            _abas.pop(aba, None)
+            _cabecalhos.pop(aba, None)
+
+def _valores_para_records(valores):
+    # Mesmo tratamento do worksheet.get_all_records(): cabeçalho na linha 1, números convertidos
+    valores = gspread.utils.fill_gaps(valores) if valores else [[]]
+    if valores == [[]]:
+        return []
+    cabecalho, linhas = valores[0], valores[1:]
+    linhas = [gspread.utils.numericise_all(linha) for linha in linhas]
+    return gspread.utils.to_records(cabecalho, linhas)
+
+def _projetar(df, cols_esperadas):
+    # Garante que as colunas existam mesmo se a planilha estiver vazia
+    if df is None or df.empty:
+        return pd.DataFrame(columns=cols_esperadas)
+
+    # Filtra apenas colunas que queremos (se existirem)
+    # (reindex devolve um DF independente: o cast do schema não esbarra no aviso de cópia de fatia)
+    cols_existentes = [c for c in cols_esperadas if c in df.columns]
+    return df.reindex(columns=cols_existentes)
 
-    client = conectar_gsheets()
-    max_retries = 3
-    wait_seconds = 2
-    
-    for attempt in range(max_retries):
+# --- GOOGLE SHEETS (gspread) ---
+# Latência (s) da última leitura de cada aba
+_latencias_abas = {}
+
+def get_stats_cota():
+    """Contadores do agendador de cota: chamadas, esperas no bucket, 429s e retentativas por tipo."""
+    return agendador.get_stats()
+
+def get_latencias_abas():
+    """Retorna {aba: segundos} da última leitura de cada aba."""
+    return dict(_latencias_abas)
+
+def _sheets_ler(aba):
+    """
+    Lê a aba inteira. Cota, 429 e falhas de rede ficam com o agendador (backoff + jitter).
+    Retorna None se a aba não existe; erros persistentes sobem.
+    """
+    for tentativa in range(2):
         try:
-            # 1. Tenta abrir a planilha (Onde seu erro estava acontecendo)
-            sh = client.open(PLANILHA_NOME)
-            
-            # 2. Tenta selecionar a aba
-            worksheet = sh.worksheet(aba)
-            
-            # 3. Pega os dados
-            data = worksheet.get_all_records()
-            
-            # 4. Converte para DataFrame
-            df = pd.DataFrame(data)
-            
-            # 5. Garante que as colunas existam mesmo se a planilha estiver vazia
-            if df.empty:
-                return pd.DataFrame(columns=cols_esperadas)
-            
-            # Filtra apenas colunas que queremos (se existirem)
-            cols_existentes = [c for c in cols_esperadas if c in df.columns]
-            return df[cols_existentes]
-
-        except (ConnectionError, ReadTimeout, gspread.exceptions.APIError) as e:
-            # Se for a última tentativa, não tem o que fazer, deixa o erro subir
-            if attempt == max_retries - 1:
-                print(f"❌ Erro fatal ao ler '{aba}': {e}")
-                # Retorna um DF vazio para o app não quebrar totalmente, ou você pode dar 'raise e'
-                return pd.DataFrame(columns=cols_esperadas) 
-            
-            print(f"⚠️ Erro de conexão ao ler '{aba}'. Tentando de novo em {wait_seconds}s... ({attempt+1}/{max_retries})")
-            time.sleep(wait_seconds)
-            wait_seconds *= 2 # Backoff exponencial (espera 2s, depois 4s...)
-            
+            inicio = time.perf_counter()
+
+            # 1. Pega o handle da aba do registro (sem reabrir a planilha)
+            worksheet = get_worksheet(aba)
+
+            # 2. Pega os dados
+            df = pd.DataFrame(agendador.executar("leitura", worksheet.get_all_records))
+            _latencias_abas[aba] = time.perf_counter() - inicio
+            return df
+
         except gspread.exceptions.WorksheetNotFound:
-            # Se a aba não existe, cria um DF vazio e não tenta de novo (erro lógico, não de conexão)
+            # Se a aba não existe, não tenta de novo (erro lógico, não de conexão)
             print(f"⚠️ Aba '{aba}' não encontrada. Retornando vazio.")
-            return pd.DataFrame(columns=cols_esperadas)
+            return None
 
-def save_gsheet(nome_aba, df):
+        except gspread.exceptions.APIError as e:
+            # Erro não transitório costuma ser handle velho (aba renomeada): relê os metadados uma vez
+            invalidar_handles(aba)
+            if agendador.eh_transitorio(e) or tentativa == 1:
+                raise
+
+def _sheets_ler_seguro(aba):
+    try:
+        return aba, _sheets_ler(aba), None
+    except Exception as e:
+        return aba, None, e
+
+def _sheets_ler_paralelo(abas, max_workers=None):
     """
-    Salva o DataFrame na aba específica (Sobrescreve tudo para garantir consistência).
-    Nota: Para grandes volumes, o ideal é usar append, mas para uso pessoal isso é mais seguro.
-    """
-    client = conectar_gsheets()
-    PLANILHA_NOME = "Life_OS_Database"
-    sh = client.open(PLANILHA_NOME)
-    worksheet = sh.worksheet(nome_aba)
-    
-    # Limpa tudo
-    worksheet.clear()
-    
+    Lê várias abas em paralelo com um pool limitado de threads.
+    Cada aba passa pelo _sheets_ler (mesmas retentativas/backoff); o retorno segue a ordem pedida.
+    """
+    max_workers = max_workers or MAX_WORKERS_LEITURA
+
+    # Abre a planilha na thread principal (o st.cache_resource do cliente precisa do contexto do Streamlit)
+    _get_planilha()
+
+    resultado = {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, max(len(abas), 1))) as pool:
+        for aba, df, erro in pool.map(_sheets_ler_seguro, abas):
+            if erro is not None:
+                print(f"❌ Erro fatal ao ler '{aba}': {erro}")
+            else:
+                resultado[aba] = df
+    return resultado
+
+def _sheets_ler_lote(abas, modo=None, max_workers=None):
+    """
+    Lê várias abas com UMA única requisição (values:batchGet).
+    Com modo="paralelo" (ou se o batch falhar) usa o _sheets_ler_paralelo.
+    """
+    if (modo or MODO_LEITURA_LOTE) == "paralelo":
+        return _sheets_ler_paralelo(abas, max_workers)
+
+    for tentativa in range(2):
+        try:
+            # 1. Resolve os handles (abas inexistentes voltam como None)
+            resultado = {}
+            titulos = {}
+            for aba in abas:
+                try:
+                    titulos[aba] = get_worksheet(aba).title
+                except gspread.exceptions.WorksheetNotFound:
+                    print(f"⚠️ Aba '{aba}' não encontrada. Retornando vazio.")
+                    resultado[aba] = None
+
+            if not titulos:
+                return resultado
+
+            # 2. Um único round trip para todas as abas
+            ranges = [gspread.utils.absolute_range_name(t) for t in titulos.values()]
+            inicio = time.perf_counter()
+            resposta = agendador.executar("leitura", _get_planilha().values_batch_get, ranges)
+            value_ranges = resposta.get("valueRanges", [])
+
+            # No batch todas as abas dividem a mesma requisição
+            latencia = time.perf_counter() - inicio
+            for aba in titulos:
+                _latencias_abas[aba] = latencia
+
+            # 3. A API devolve os ranges na mesma ordem em que foram pedidos
+            for aba, vr in zip(titulos, value_ranges):
+                resultado[aba] = pd.DataFrame(_valores_para_records(vr.get("values", [])))
+            return {aba: resultado[aba] for aba in abas if aba in resultado}
+
+        except Exception as e:
+            # Algum handle pode estar velho (aba renomeada): relê os metadados na próxima
+            invalidar_handles()
+
+            if agendador.eh_transitorio(e) or tentativa == 1:
+                # O agendador já esgotou as retentativas: cai para as leituras individuais em paralelo
+                print(f"❌ Erro ao ler lote {list(abas)}: {e}. Usando leitura paralela.")
+                return _sheets_ler_paralelo(abas, max_workers)
+
+def _sheets_salvar(nome_aba, df):
+    worksheet = get_worksheet(nome_aba)
+
+    # Limpa tudo (limpar de novo dá no mesmo: pode repetir)
+    try:
+        agendador.executar("escrita", worksheet.clear, idempotente=True)
+    except gspread.exceptions.APIError as e:
+        if agendador.eh_transitorio(e):
+            raise
+        # Handle velho (aba renomeada): busca de novo e tenta uma vez
+        invalidar_handles(nome_aba)
+        worksheet = get_worksheet(nome_aba)
+        agendador.executar("escrita", worksheet.clear, idempotente=True)
+
     # Reescreve cabeçalho e dados
     # set_with_dataframe do gspread-dataframe é melhor, mas vamos usar lista pura para não adicionar lib
     cabecalho = df.columns.tolist()
     linhas = df.astype(str).values.tolist() # Converte tudo pra texto para evitar erro de JSON
-    
+
     # Atualiza em lote (Batch Update) - Mais rápido
-    worksheet.update([cabecalho] + linhas)
\ No newline at end of file
+    agendador.executar("escrita", worksheet.update, [cabecalho] + linhas, idempotente=True)
+
+    # O cabeçalho agora é o do DataFrame (usado pelos próximos append_rows)
+    _cabecalhos[nome_aba] = cabecalho
+
+def _sheets_anexar(nome_aba, df):
+    if df.empty:
+        return
+
+    worksheet = get_worksheet(nome_aba)
+
+    # 1. Cabeçalho da aba (lido uma vez e guardado)
+    cabecalho = _cabecalhos.get(nome_aba)
+    if cabecalho is None:
+        cabecalho = agendador.executar("leitura", worksheet.row_values, 1)
+
+    # 2. Aba vazia ou colunas novas: atualiza só a linha 1
+    novas = [c for c in df.columns if c not in cabecalho]
+    if novas:
+        cabecalho = cabecalho + novas
+        if len(cabecalho) > worksheet.col_count:
+            agendador.executar("escrita", worksheet.add_cols, len(cabecalho) - worksheet.col_count)
+        agendador.executar("escrita", worksheet.update, [cabecalho], "A1", idempotente=True)
+    _cabecalhos[nome_aba] = cabecalho
+
+    # 3. Linhas na ordem do cabeçalho (colunas ausentes no DF ficam em branco)
+    linhas = df.astype(str).reindex(columns=cabecalho, fill_value="").values.tolist()
+    # Tamanho da aba antes do envio: se a resposta se perder, é ele que diz se o append entrou
+    antes = len(agendador.executar("leitura", worksheet.get_all_values))
+    agendador.executar(
+        "escrita", worksheet.append_rows, linhas, table_range="A1",
+        verificar=lambda: _anexo_aplicado(worksheet, antes, linhas),
+    )
+
+def _valores_da_aba(worksheet):
+    # Texto da aba (cabeçalho + linhas) relido para conferir uma escrita incerta
+    valores = agendador.executar("leitura", worksheet.get_all_values)
+    if not valores:
+        return pd.DataFrame()
+    largura = len(valores[0])
+    return pd.DataFrame([(l + [""] * largura)[:largura] for l in valores[1:]], columns=valores[0])
+
+def _anexo_aplicado(worksheet, antes, linhas):
+    """
+    Relê a aba depois de um append incerto (rede/5xx depois do envio). Linhas iguais seguidas
+    são normais nos logs, então o que vale é o tamanho: igual ao de antes = não entrou (pode
+    reenviar); cresceu exatamente len(linhas) com elas no fim = entrou; qualquer outra coisa é incerta.
+    """
+    valores = agendador.executar("leitura", worksheet.get_all_values)
+    if len(valores) == antes:
+        return False
+    largura = len(linhas[0])
+    fim = [(l + [""] * largura)[:largura] for l in valores[antes:]]
+    if len(valores) == antes + len(linhas) and fim == [[str(v) for v in l] for l in linhas]:
+        return True
+    raise agendador.EscritaIncerta(f"a aba tinha {antes} linhas e agora tem {len(valores)}")
+
+def _diff_aplicado(worksheet, orig, esperado):
+    """
+    Relê a aba depois de um batch_update incerto: True se já está no estado esperado,
+    False se ainda está como no snapshot (pode reenviar). Qualquer outro estado é incerto.
+    """
+    atual = _valores_da_aba(worksheet)
+    if not all(c in atual.columns for c in orig.columns):
+        raise agendador.EscritaIncerta("colunas da aba mudaram")
+    atual = atual[list(orig.columns)]
+    if atual.equals(esperado):
+        return True
+    if atual.equals(orig.reset_index(drop=True)):
+        return False
+    raise agendador.EscritaIncerta("aba não está nem no estado anterior nem no esperado")
+
+def _celula(valor):
+    # Mesmo formato do save_gsheet (texto puro, sem interpretação de fórmulas)
+    return {"userEnteredValue": {"stringValue": str(valor)}}
+
+def _sheets_salvar_diff(nome_aba, df_original, df_editado):
+    orig = df_original.astype(str)
+    edit = df_editado.astype(str)
+
+    worksheet = get_worksheet(nome_aba)
+    cabecalho = _cabecalhos.get(nome_aba)
+    if cabecalho is None:
+        cabecalho = agendador.executar("leitura", worksheet.row_values, 1)
+        _cabecalhos[nome_aba] = cabecalho
+
+    # 1. Estrutura mudou? Então reescreve tudo (caminho antigo)
+    plano = calcular_diff(orig, edit)
+    if plano is None or not all(c in cabecalho for c in orig.columns):
+        _sheets_salvar(nome_aba, df_editado)
+        return {"modo": "completo", "celulas": 0, "inseridas": len(df_editado), "removidas": 0}
+
+    comuns, removidas, novas, linhas_mud, cols_mud = plano
+    sheet_id = worksheet.id
+    col_pos = [cabecalho.index(c) for c in orig.columns]
+    depois = edit.loc[comuns].values
+    requests = []
+
+    # 2. Células alteradas
+    for r, c in zip(linhas_mud, cols_mud):
+        requests.append({"updateCells": {
+            "start": {"sheetId": sheet_id, "rowIndex": int(comuns[r]) + 1, "columnIndex": col_pos[c]},
+            "rows": [{"values": [_celula(depois[r, c])]}],
+            "fields": "userEnteredValue",
+        }})
+
+    # 3. Linhas removidas (de baixo para cima para não deslocar as próximas)
+    for label in sorted(removidas, reverse=True):
+        requests.append({"deleteDimension": {"range": {
+            "sheetId": sheet_id, "dimension": "ROWS",
+            "startIndex": int(label) + 1, "endIndex": int(label) + 2,
+        }}})
+
+    # 4. Linhas novas vão para o fim da aba
+    if novas:
+        linhas = edit.loc[novas].reindex(columns=cabecalho, fill_value="").values.tolist()
+        requests.append({"appendCells": {
+            "sheetId": sheet_id,
+            "rows": [{"values": [_celula(v) for v in linha]} for linha in linhas],
+            "fields": "userEnteredValue",
+        }})
+
+    if requests:
+        # deleteDimension/appendCells não podem ser repetidos às cegas: confere relendo a aba
+        esperado = aplicar_diff(orig.reset_index(drop=True), orig, edit)
+        agendador.executar(
+            "escrita", _get_planilha().batch_update, {"requests": requests},
+            verificar=lambda: _diff_aplicado(worksheet, orig, esperado),
+        )
+
+    return {"modo": "diff", "celulas": len(linhas_mud), "inseridas": len(novas), "removidas": len(removidas)}
+
+class BackendSheets(Backend):
+    """
+    Backend remoto: Google Sheets via gspread (registro de handles + batchGet).
+    As escritas (inclusive as leituras de cabeçalho que elas fazem) furam a fila das leituras.
+    """
+    nome = "sheets"
+
+    def ler(self, aba):
+        return _sheets_ler(aba)
+
+    def ler_lote(self, abas, modo=None, max_workers=None):
+        return _sheets_ler_lote(abas, modo, max_workers)
+
+    def salvar(self, aba, df):
+        with agendador.prioridade(agendador.PRIORIDADE_INTERATIVA):
+            _sheets_salvar(aba, df)
+
+    def anexar(self, aba, df):
+        with agendador.prioridade(agendador.PRIORIDADE_INTERATIVA):
+            _sheets_anexar(aba, df)
+
+    def salvar_diff(self, aba, df_original, df_editado):
+        with agendador.prioridade(agendador.PRIORIDADE_INTERATIVA):
+            return _sheets_salvar_diff(aba, df_original, df_editado)
+
+# --- SELEÇÃO DO BACKEND ---
+_backend = None
+_lock_backend = threading.Lock()
+
+def _nome_backend_configurado():
+    # Variável de ambiente > st.secrets > padrão
+    nome = os.environ.get("STORAGE_BACKEND")
+    if not nome:
+        try:
+            nome = st.secrets.get("STORAGE_BACKEND", BACKEND_PADRAO)
+        except Exception:
+            nome = BACKEND_PADRAO
+    return nome
+
+def criar_backend(nome):
+    """Cria o backend pelo nome: "sheets", "local" ou "local-first"."""
+    if nome == "sheets":
+        return BackendSheets()
+    if nome == "local":
+        return BackendLocal()
+    if nome == "local-first":
+        return BackendLocalFirst(BackendLocal(), BackendSheets())
+    raise ValueError(f"Backend desconhecido: {nome}")
+
+def get_backend():
+    global _backend
+    with _lock_backend:
+        if _backend is None:
+            _backend = criar_backend(_nome_backend_configurado())
+        return _backend
+
+def set_backend(backend):
+    """Troca o backend do processo (nome ou instância de Backend)."""
+    global _backend
+    with _lock_backend:
+        _backend = criar_backend(backend) if isinstance(backend, str) else backend
+    invalidar_cache()
+    _sonda["versao"] = None
+
+def sincronizar():
+    """Envia a fila de escrita e, no modo local-first, dispara a sincronização com o Sheets agora."""
+    flush_escritas(esperar=True)
+    backend = get_backend()
+    if hasattr(backend, "sincronizar_agora"):
+        backend.sincronizar_agora()
+
+# --- FILA DE ESCRITA (write-behind) ---
+# Escritas com em_fila=True entram aqui já serializadas e saem por uma thread de fundo,
+# sem spinner travando a página. Escritas seguidas na mesma aba viram uma só:
+#   - salvar descarta o que estava pendente na aba (reescrita completa)
+#   - anexar depois de anexar/salvar junta as linhas
+#   - diff encadeado (o original de um é o editado do anterior) vira um diff só
+# Leituras e escritas síncronas de uma aba esperam a fila dela esvaziar (lê o que escreveu).
+_cond_escrita = threading.Condition()
+_evento_escrita = threading.Event()
+_fila_escrita = {}    # aba -> [(operacao, args), ...] na ordem
+_em_envio = set()     # abas sendo enviadas agora
+_falhas_escrita = {}  # aba -> mensagem do último erro (a aba fica parada até reenviar)
+_stats_escrita = {"enfileiradas": 0, "enviadas": 0, "coalescidas": 0, "ultimo_flush": None}
+_thread_escrita = None
+
+def _concatenar(df_a, df_b):
+    cols = list(df_a.columns) + [c for c in df_b.columns if c not in df_a.columns]
+    return pd.concat([df_a.reindex(columns=cols, fill_value=""), df_b.reindex(columns=cols, fill_value="")], ignore_index=True)
+
+def _mesmo_df(df_a, df_b):
+    return df_a.shape == df_b.shape and df_a.index.equals(df_b.index) and df_a.equals(df_b)
+
+def _coalescer(fila, operacao, args):
+    """Tenta juntar a operação com a última da fila. Retorna True se juntou."""
+    if operacao == "salvar":
+        if fila:
+            fila[:] = [(operacao, args)]
+            return True
+        return False
+    if not fila:
+        return False
+
+    op_ant, args_ant = fila[-1]
+    if operacao == "anexar" and op_ant in ("salvar", "anexar"):
+        fila[-1] = (op_ant, (_concatenar(args_ant[0], args[0]),))
+        return True
+    if operacao == "salvar_diff":
+        orig, edit = args
+        if op_ant == "salvar" and _mesmo_df(args_ant[0], orig):
+            fila[-1] = ("salvar", (edit.reset_index(drop=True),))
+            return True
+        if op_ant == "salvar_diff" and _mesmo_df(args_ant[1], orig):
+            fila[-1] = ("salvar_diff", (args_ant[0], edit))
+            return True
+    return False
+
+def _enfileirar(aba, operacao, args):
+    with _cond_escrita:
+        fila = _fila_escrita.setdefault(aba, [])
+        if _coalescer(fila, operacao, args):
+            _stats_escrita["coalescidas"] += 1
+        else:
+            fila.append((operacao, args))
+        _stats_escrita["enfileiradas"] += 1
+        # Escrita nova na aba = nova tentativa das pendências que falharam
+        _falhas_escrita.pop(aba, None)
+    _iniciar_worker_escrita()
+    _evento_escrita.set()
+
+def _iniciar_worker_escrita():
+    global _thread_escrita
+    with _cond_escrita:
+        if _thread_escrita is None or not _thread_escrita.is_alive():
+            _thread_escrita = threading.Thread(target=_loop_escrita, name="write-behind", daemon=True)
+            _thread_escrita.start()
+
+def _loop_escrita():
+    while True:
+        _evento_escrita.wait()
+        time.sleep(JANELA_ESCRITA)  # junta o que chegar logo em seguida (mesmo rerun)
+        _evento_escrita.clear()
+        _enviar_fila()
+
+def _enviar_fila():
+    with _cond_escrita:
+        lote = {aba: ops for aba, ops in _fila_escrita.items() if aba not in _falhas_escrita}
+        for aba in lote:
+            del _fila_escrita[aba]
+        _em_envio.update(lote)
+
+    for aba, ops in lote.items():
+        for i, (operacao, args) in enumerate(ops):
+            try:
+                getattr(get_backend(), operacao)(aba, *args)
+            except Exception as e:
+                print(f"❌ Escrita em fila de '{aba}' falhou: {e}")
+                # O cache já tinha a escrita (write-through): volta a ler do remoto
+                invalidar_cache(aba)
+                # Escrita incerta não volta para a fila: reenviar poderia duplicar
+                resto = ops[i + 1:] if isinstance(e, agendador.EscritaIncerta) else ops[i:]
+                with _cond_escrita:
+                    # Devolve o que não foi enviado para a frente da fila da aba
+                    _fila_escrita[aba] = resto + _fila_escrita.get(aba, [])
+                    _falhas_escrita[aba] = str(e)
+                break
+            with _cond_escrita:
+                _stats_escrita["enviadas"] += 1
+        with _cond_escrita:
+            _em_envio.discard(aba)
+            _cond_escrita.notify_all()
+
+    with _cond_escrita:
+        _stats_escrita["ultimo_flush"] = time.time()
+        _cond_escrita.notify_all()
+
+def _tem_pendencia(abas):
+    # Abas com falha não contam: estão paradas até o reenvio
+    return any((aba in _fila_escrita and aba not in _falhas_escrita) or aba in _em_envio for aba in abas)
+
+def _aguardar_escritas(abas, timeout=TIMEOUT_ESPERA_ESCRITA):
+    with _cond_escrita:
+        if not _tem_pendencia(abas):
+            return True
+    _iniciar_worker_escrita()
+    _evento_escrita.set()
+    with _cond_escrita:
+        return _cond_escrita.wait_for(lambda: not _tem_pendencia(abas), timeout)
+
+def flush_escritas(esperar=False, timeout=TIMEOUT_ESPERA_ESCRITA):
+    """Dispara o envio da fila agora. Com esperar=True bloqueia até a fila esvaziar (ou falhar)."""
+    with _cond_escrita:
+        abas = list(_fila_escrita) + list(_em_envio)
+    if not abas:
+        return True
+    if esperar:
+        return _aguardar_escritas(abas, timeout)
+    _iniciar_worker_escrita()
+    _evento_escrita.set()
+    return True
+
+def reenviar_escritas():
+    """Libera as abas que falharam e tenta enviar de novo."""
+    with _cond_escrita:
+        _falhas_escrita.clear()
+    return flush_escritas()
+
+def get_status_escritas():
+    """Estado da fila para mostrar na página: pendências, abas enviando, falhas e contadores."""
+    with _cond_escrita:
+        return {
+            "pendentes": sum(len(ops) for ops in _fila_escrita.values()),
+            "abas_pendentes": list(_fila_escrita),
+            "enviando": sorted(_em_envio),
+            "falhas": dict(_falhas_escrita),
+            **_stats_escrita,
+        }
+
+# --- CACHE COMPARTILHADO POR ABA ---
+# Cada aba é baixada uma vez INTEIRA (já tipada pelo schema) e as páginas recebem
+# projeções dela: Log_Produtividade serve produtividade, leitura, cursos, dashboard etc.
+# com um único download por TTL. As escritas são write-through: a entrada da aba escrita
+# é atualizada com o que foi salvo e as outras abas não são tocadas.
+_lock_cache = threading.Lock()
+_cache_abas = {}  # aba -> (DataFrame inteiro tipado, timestamp, revisão)
+_stats_cache = {}  # aba -> {"hits": n, "misses": m}
+
+def _contar_cache(aba, chave):
+    s = _stats_cache.setdefault(aba, {"hits": 0, "misses": 0})
+    s[chave] += 1
+
+def _cache_get(aba):
+    with _lock_cache:
+        item = _cache_abas.get(aba)
+        if item is not None and time.time() - item[1] < TTL_CACHE_ABAS:
+            _contar_cache(aba, "hits")
+            return item[0]
+        _contar_cache(aba, "misses")
+        return None
+
+def _tipar(aba, df):
+    return pd.DataFrame() if df is None else schemas.aplicar_schema(aba, df.reset_index(drop=True))
+
+def _revisao(df):
+    """
+    Revisão do conteúdo da aba (hash das colunas + valores já tipados pelo schema).
+    Estável entre processos (sem o hash() do Python), então dá para comparar com a do snapshot.
+    """
+    if df is None or df.empty:
+        return 0
+    h = hashlib.sha1("\x1f".join(map(str, df.columns)).encode())
+    try:
+        h.update(pd.util.hash_pandas_object(df.astype(str), index=False).values.tobytes())
+    except TypeError:
+        h.update(df.to_csv(index=False).encode())
+    return int(h.hexdigest()[:16], 16)
+
+def _cache_put(aba, df, tipado=False):
+    # Aba inexistente vira DF vazio (a projeção devolve as colunas esperadas)
+    if not tipado:
+        df = _tipar(aba, df)
+    revisao = _revisao(df)
+    with _lock_cache:
+        _cache_abas[aba] = (df, time.time(), revisao)
+    _snapshot_gravar(aba, df, revisao)
+    return df
+
+def _cache_escrever(aba, operacao, *args):
+    """
+    Write-through: aplica a escrita (já em texto) na aba em cache, com as mesmas regras do backend,
+    e guarda o resultado como se tivesse sido relido. Aba fora do cache continua fora.
+    """
+    if operacao == "salvar":
+        texto = args[0]
+    else:
+        with _lock_cache:
+            item = _cache_abas.get(aba)
+        if item is None:
+            return
+        atual = schemas.serializar(aba, item[0])
+        texto = aplicar_anexar(atual, args[0]) if operacao == "anexar" else aplicar_diff(atual, *args)
+    _cache_put(aba, texto.map(gspread.utils.numericise))
+
+def atualizar_abas(abas=None):
+    """
+    Refresh seletivo (botão SYNC_CLOUD): relê as abas em cache numa requisição em lote e troca só
+    as que mudaram no remoto (revisão diferente). Retorna a lista de abas alteradas.
+    """
+    flush_escritas(esperar=True)
+    with _lock_cache:
+        abas = list(abas if abas is not None else _cache_abas)
+    if not abas:
+        return []
+
+    alteradas = []
+    for aba, df in get_backend().ler_lote(abas).items():
+        df = _tipar(aba, df)
+        with _lock_cache:
+            item = _cache_abas.get(aba)
+            if item is not None and item[2] == _revisao(df):
+                # Mesma revisão: mantém o DF e só renova o TTL
+                _cache_abas[aba] = (item[0], time.time(), item[2])
+                continue
+        _cache_put(aba, df, tipado=True)
+        alteradas.append(aba)
+    return alteradas
+
+# --- SONDA DE MUDANÇA REMOTA (Drive modifiedTime) ---
+_lock_sonda = threading.Lock()
+_sonda = {"versao": None, "ultima": 0.0, "sondas": 0, "mudancas": 0, "abas_alteradas": 0, "ultimo_erro": None}
+
+def _sonda_ativa():
+    # Só o backend Sheets: no local/local-first a leitura já é no disco
+    return SONDA_ATIVA and isinstance(get_backend(), BackendSheets)
+
+def _renovar_cache():
+    agora = time.time()
+    with _lock_cache:
+        for aba, (df, _, revisao) in list(_cache_abas.items()):
+            _cache_abas[aba] = (df, agora, revisao)
+
+def sondar_remoto(forcar=False):
+    """
+    Uma chamada de metadados do Drive diz se a planilha mudou desde a última sonda.
+    Não mudou: renova o TTL de todas as abas em cache. Mudou: atualizar_abas() (um lote, troca só
+    as abas com revisão diferente). Retorna a lista de abas alteradas (vazia se nada mudou
+    ou se a sonda não rodou agora).
+    """
+    if not _sonda_ativa():
+        return []
+    # Outra thread sondando agora: não espera, o resultado dela serve
+    if not _lock_sonda.acquire(blocking=False):
+        return []
+    try:
+        if not forcar and time.time() - _sonda["ultima"] < INTERVALO_SONDA:
+            return []
+        _sonda["ultima"] = time.time()
+        try:
+            versao = agendador.executar("leitura", _get_planilha().get_lastUpdateTime)
+        except Exception as e:
+            # Sem sonda o cache volta a depender só do TTL
+            print(f"⚠️ Sonda de mudança remota falhou: {e}")
+            _sonda["ultimo_erro"] = str(e)
+            return []
+        anterior = _sonda["versao"]
+        _sonda["versao"] = versao
+        _sonda["sondas"] += 1
+    finally:
+        _lock_sonda.release()
+
+    if anterior is None or versao == anterior:
+        # Primeira sonda só marca a referência (vem antes do primeiro download das abas)
+        _renovar_cache()
+        return []
+
+    # Nossas próprias escritas também mudam o modifiedTime: o lote confirma as revisões e
+    # não troca nada que o write-through já tinha
+    alteradas = atualizar_abas()
+    with _lock_sonda:
+        _sonda["mudancas"] += 1
+        _sonda["abas_alteradas"] += len(alteradas)
+    return alteradas
+
+def get_stats_sonda():
+    """Sondas feitas, mudanças detectadas no remoto e abas relidas por causa delas."""
+    with _lock_sonda:
+        return {k: v for k, v in _sonda.items() if k != "ultima"}
+
+def invalidar_cache(aba=None):
+    """Descarta a aba do cache compartilhado (ou tudo, se aba=None)."""
+    with _lock_cache:
+        if aba is None:
+            _cache_abas.clear()
+        else:
+            _cache_abas.pop(aba, None)
+
+def get_stats_cache(aba=None):
+    """{"hits": n, "misses": m} da aba, ou o total de todas se aba=None."""
+    with _lock_cache:
+        if aba is not None:
+            return dict(_stats_cache.get(aba, {"hits": 0, "misses": 0}))
+        return {
+            "hits": sum(s["hits"] for s in _stats_cache.values()),
+            "misses": sum(s["misses"] for s in _stats_cache.values()),
+            "abas": {a: dict(s) for a, s in _stats_cache.items()},
+        }
+
+# --- SNAPSHOT EM DISCO (Parquet) ---
+# Cada aba que entra no cache também vai para data/snapshots/<aba>.parquet, já tipada, com a hora
+# do download e a revisão nos metadados do arquivo. Num processo novo a primeira leitura da aba
+# sai do disco na hora e uma thread de fundo relê o remoto (atrás das leituras da página) e troca
+# o cache/snapshot só se a revisão mudou. Cada aba usa o snapshot uma vez por processo: depois de
+# um invalidar_cache (ex.: escrita que falhou) a leitura volta a ser no remoto.
+_lock_snapshots = threading.Lock()
+_revisoes_gravadas = {}   # aba -> revisão do último snapshot escrito/lido
+_snapshots_consultados = set()  # abas que já passaram pelo disco neste processo
+_stats_snapshots = {"servidas": 0, "revalidadas": 0, "alteradas": 0, "gravadas": 0, "ultimo_erro": None}
+_CHAVE_META = b"life_os"
+
+def _snapshots_ativos():
+    # Cliente injetado (fake/benchmark) ou outro backend não podem misturar dados com os snapshots reais
+    return (
+        SNAPSHOTS_ATIVOS and _cliente_override is None and not os.environ.get("SHEETS_FAKE")
+        and isinstance(get_backend(), BackendSheets)
+    )
+
+def _caminho_snapshot(aba):
+    return os.path.join(PASTA_SNAPSHOTS, re.sub(r"[^\w\-]", "_", aba) + ".parquet")
+
+def _snapshot_gravar(aba, df, revisao):
+    """Grava o DF tipado da aba (se a revisão mudou desde o último snapshot). Falha só avisa."""
+    with _lock_snapshots:
+        if _revisoes_gravadas.get(aba) == revisao or not _snapshots_ativos():
+            return
+    try:
+        # Colunas sem tipo no registro podem misturar número e texto (numericise): vão como texto
+        # e voltam pelo mesmo numericise da leitura do Sheets
+        mistas = [c for c in df.columns if df[c].dtype == object]
+        tabela = pa.Table.from_pandas(df.astype({c: str for c in mistas}), preserve_index=False)
+        meta = {"aba": aba, "ts": time.time(), "revisao": str(revisao), "mistas": mistas}
+        tabela = tabela.replace_schema_metadata({**(tabela.schema.metadata or {}), _CHAVE_META: json.dumps(meta).encode()})
+
+        os.makedirs(PASTA_SNAPSHOTS, exist_ok=True)
+        caminho = _caminho_snapshot(aba)
+        temporario = f"{caminho}.{threading.get_ident()}.tmp"
+        pq.write_table(tabela, temporario)
+        os.replace(temporario, caminho)  # troca atômica: nunca fica um snapshot pela metade
+    except Exception as e:
+        print(f"⚠️ Não foi possível gravar o snapshot de '{aba}': {e}")
+        _stats_snapshots["ultimo_erro"] = str(e)
+        return
+    with _lock_snapshots:
+        _revisoes_gravadas[aba] = revisao
+        _stats_snapshots["gravadas"] += 1
+
+def _snapshot_ler(aba):
+    """(DF tipado, timestamp do download, revisão) do snapshot da aba, ou None."""
+    caminho = _caminho_snapshot(aba)
+    if not os.path.exists(caminho):
+        return None
+    try:
+        tabela = pq.read_table(caminho)
+        meta = json.loads(tabela.schema.metadata[_CHAVE_META])
+        df = tabela.to_pandas()
+    except Exception as e:
+        print(f"⚠️ Snapshot de '{aba}' ilegível, ignorando: {e}")
+        return None
+    for col in meta["mistas"]:
+        df[col] = df[col].map(gspread.utils.numericise)
+    return df, meta["ts"], int(meta["revisao"])
+
+def _servir_snapshots(abas):
+    """
+    Primeira leitura das abas neste processo: coloca no cache o que tiver snapshot em disco e
+    agenda a revalidação em fundo. Retorna {aba: DF tipado} das abas servidas.
+    """
+    with _lock_snapshots:
+        abas = [aba for aba in abas if aba not in _snapshots_consultados]
+        _snapshots_consultados.update(abas)
+    if not abas or not _snapshots_ativos():
+        return {}
+
+    servidas = {}
+    for aba in abas:
+        snap = _snapshot_ler(aba)
+        if snap is None:
+            continue
+        df, ts, revisao = snap
+        with _lock_cache:
+            if aba in _cache_abas:
+                continue
+            # Vale pelo TTL a partir de agora: a revalidação em fundo decide se o conteúdo continua
+            _cache_abas[aba] = (df, time.time(), revisao)
+        with _lock_snapshots:
+            _revisoes_gravadas[aba] = revisao
+            _stats_snapshots["servidas"] += 1
+        servidas[aba] = df
+
+    if servidas:
+        threading.Thread(
+            target=_revalidar_snapshots, args=(list(servidas),), name="revalidar-snapshots", daemon=True
+        ).start()
+    return servidas
+
+def _revalidar_snapshots(abas):
+    """Relê as abas servidas do disco numa leitura em lote de prioridade baixa e troca as que mudaram."""
+    with _lock_cache:
+        servidos = {aba: _cache_abas.get(aba) for aba in abas}
+    try:
+        with agendador.prioridade(agendador.PRIORIDADE_FUNDO):
+            remotas = get_backend().ler_lote(abas)
+    except Exception as e:
+        print(f"⚠️ Revalidação dos snapshots falhou: {e}")
+        _stats_snapshots["ultimo_erro"] = str(e)
+        return
+
+    for aba, df in remotas.items():
+        df = _tipar(aba, df)
+        revisao = _revisao(df)
+        with _lock_cache:
+            item = _cache_abas.get(aba)
+            # Escrita (write-through) ou refresh durante a leitura: o cache já é mais novo que o remoto lido
+            if item is None or item is not servidos[aba]:
+                continue
+            mudou = item[2] != revisao
+            if not mudou:
+                df = item[0]
+            _cache_abas[aba] = (df, time.time(), revisao)
+        with _lock_snapshots:
+            _stats_snapshots["revalidadas"] += 1
+            _stats_snapshots["alteradas"] += int(mudou)
+            # Força a regravação: mesma revisão só renova a hora do download no arquivo
+            _revisoes_gravadas.pop(aba, None)
+        _snapshot_gravar(aba, df, revisao)
+
+def get_stats_snapshots():
+    """Contadores dos snapshots em disco: abas servidas do disco, revalidadas, alteradas no remoto e gravadas."""
+    with _lock_snapshots:
+        return dict(_stats_snapshots)
+
+# --- API PÚBLICA (usada pelas páginas) ---
+# Em modules/conexoes.py
+
+def load_gsheet(aba, cols_esperadas):
+    """
+    Carrega dados da aba com tratamento de erro de conexão e retentativas.
+    """
+    # Mudou algo no remoto? (no máximo uma chamada de metadados a cada INTERVALO_SONDA)
+    sondar_remoto()
+
+    # Hit não precisa esperar a fila de escrita: o cache já tem o que foi escrito (write-through)
+    df = _cache_get(aba)
+    if df is None:
+        # Processo novo: snapshot em disco na hora, revalidado em fundo
+        df = _servir_snapshots([aba]).get(aba)
+    if df is None:
+        _aguardar_escritas([aba])
+        try:
+            df = get_backend().ler(aba)
+        except Exception as e:
+            print(f"❌ Erro fatal ao ler '{aba}': {e}")
+            # Retorna um DF vazio para o app não quebrar totalmente
+            return pd.DataFrame(columns=cols_esperadas)
+        # Tipos aplicados pelo registro central (modules/schemas.py) uma vez, na aba inteira
+        df = _cache_put(aba, df)
+
+    # DF vazio com as colunas esperadas se a aba não existe ou não tem dados
+    return _projetar(df, cols_esperadas)
+
+def load_gsheets_paralelo(abas, max_workers=None):
+    """
+    Carrega várias abas em paralelo com um pool limitado de threads.
+    Recebe {aba: cols_esperadas} e retorna {aba: DataFrame} na ordem do dicionário recebido.
+    """
+    return load_gsheets_batch(abas, modo="paralelo", max_workers=max_workers)
+
+def load_gsheets_batch(abas, modo=None, max_workers=None):
+    """
+    Carrega várias abas com UMA única requisição (values:batchGet).
+    Recebe {aba: cols_esperadas} e retorna {aba: DataFrame} na mesma ordem,
+    com o mesmo comportamento do load_gsheet (DF vazio como fallback + filtro de colunas).
+    Com modo="paralelo" (ou se o batch falhar) usa o pool de threads.
+    """
+    sondar_remoto()
+    dfs = {aba: _cache_get(aba) for aba in abas}
+    dfs.update(_servir_snapshots([aba for aba, df in dfs.items() if df is None]))
+
+    # Só as abas fora do cache (e sem snapshot) vão para a requisição em lote
+    faltando = [aba for aba, df in dfs.items() if df is None]
+    if faltando:
+        _aguardar_escritas(faltando)
+        for aba, df in get_backend().ler_lote(faltando, modo=modo, max_workers=max_workers).items():
+            dfs[aba] = _cache_put(aba, df)
+    return {aba: _projetar(dfs.get(aba), cols) for aba, cols in abas.items()}
+
+def load_gsheets_confirmado(abas):
+    """
+    Leitura para ações que escrevem com base no que leram (migrações): vai direto ao backend,
+    sem cache nem snapshot, e levanta erro se alguma aba falhar em vez de devolver um DF vazio.
+    Aba que não existe volta vazia (com as colunas esperadas): isso é uma leitura de verdade.
+    """
+    _aguardar_escritas(list(abas))
+    lidas = get_backend().ler_lote(list(abas))
+    falharam = [aba for aba in abas if aba not in lidas]
+    if falharam:
+        raise RuntimeError(f"Não foi possível ler {', '.join(falharam)}")
+    return {aba: _projetar(_cache_put(aba, lidas[aba]), cols) for aba, cols in abas.items()}
+
+def save_gsheet(nome_aba, df, em_fila=False):
+    """
+    Salva o DataFrame na aba específica (Sobrescreve tudo para garantir consistência).
+    Nota: Para abas de log (só recebem linhas novas) use o append_rows, que não reescreve o histórico.
+    Os valores são serializados pelo registro de tipos (int sem ".0", bool como TRUE/FALSE).
+    Com em_fila=True a escrita vai para a fila de fundo e a função retorna na hora.
+    """
+    df_txt = schemas.serializar(nome_aba, df)
+    if em_fila:
+        _enfileirar(nome_aba, "salvar", (df_txt,))
+    else:
+        _aguardar_escritas([nome_aba])
+        get_backend().salvar(nome_aba, df_txt)
+    _cache_escrever(nome_aba, "salvar", df_txt)
+
+def append_rows(nome_aba, df, em_fila=False):
+    """
+    Anexa SÓ as linhas novas no final da aba (values:append), sem ler nem reescrever o histórico.
+    As colunas são alinhadas ao cabeçalho da planilha; colunas novas do DF entram no fim do cabeçalho.
+    Com em_fila=True, vários appends seguidos na mesma aba sobem numa requisição só.
+    """
+    df_txt = schemas.serializar(nome_aba, df)
+    if em_fila:
+        _enfileirar(nome_aba, "anexar", (df_txt,))
+    else:
+        _aguardar_escritas([nome_aba])
+        get_backend().anexar(nome_aba, df_txt)
+    _cache_escrever(nome_aba, "anexar", df_txt)
+
+def save_gsheet_diff(nome_aba, df_original, df_editado, em_fila=False):
+    """
+    Salva só o que mudou entre o snapshot carregado e o DF editado, num único batchUpdate:
+    células alteradas, linhas inseridas (no fim) e linhas removidas.
+    O snapshot precisa manter o índice do load (índice i = linha i+2 da planilha).
+    Se a estrutura mudou (colunas, índice), cai para o save_gsheet completo.
+    Com em_fila=True não há retorno (o resultado sai no envio em fundo).
+    """
+    orig_txt = schemas.serializar(nome_aba, df_original)
+    edit_txt = schemas.serializar(nome_aba, df_editado)
+    resultado = None
+    if em_fila:
+        _enfileirar(nome_aba, "salvar_diff", (orig_txt, edit_txt))
+    else:
+        _aguardar_escritas([nome_aba])
+        resultado = get_backend().salvar_diff(nome_aba, orig_txt, edit_txt)
+    _cache_escrever(nome_aba, "salvar_diff", orig_txt, edit_txt)
+    return resultado
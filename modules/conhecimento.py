@@ -9,8 +9,6 @@ def load_data():
     df = conexoes.load_gsheet("Wiki", cols)
     
     if not df.empty:
-        # Garante que o ID seja numérico para o auto-incremento
-        df['ID'] = pd.to_numeric(df['ID'], errors='coerce').fillna(0).astype(int)
         # Garante que as colunas de texto sejam strings (evita erro com Markdown)
         df['Conteudo'] = df['Conteudo'].astype(str)
         df['Titulo'] = df['Titulo'].astype(str)
@@ -20,6 +18,9 @@ def load_data():
 def save_data(df):
     conexoes.save_gsheet("Wiki", df)
 
+def append_data(df_novas):
+    conexoes.append_rows("Wiki", df_novas)
+
 def render_page():
     st.header("🧠 Base de Conhecimento (Wiki)")
     st.caption("Insights e aprendizados sincronizados na nuvem.")
@@ -49,8 +50,7 @@ def render_page():
                         "Data_Criacao": str(date.today())
                     }
                     
-                    df_updated = pd.concat([df, pd.DataFrame([novo])], ignore_index=True)
-                    save_data(df_updated)
+                    append_data(pd.DataFrame([novo]))
                     st.success("Sinapse sincronizada na nuvem!")
                     st.rerun()
                 else:
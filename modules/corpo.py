@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-from modules import conexoes
+from modules import conexoes, schemas, cache_modelos
 import numpy as np
 from sklearn.linear_model import LinearRegression
 import plotly.graph_objects as go
@@ -33,42 +33,40 @@ def load_data():
         st.error(f"Erro na conexão: {e}") # Mostra o erro real se houver
         df = pd.DataFrame(columns=expected_cols)
 
-    # 3. AUTO-REPAIR: Se a planilha vier sem as colunas novas, adiciona elas com 0
+    # 3. AUTO-REPAIR: Se a planilha vier sem as colunas novas, adiciona elas com o default do schema
+    # (o cast de tipos já vem do registro em modules/schemas.py)
     if not df.empty:
-        for col in expected_cols:
-            if col not in df.columns:
-                if col in ["Data", "Obs", "Treino_Tipo", "Objetivo_Tipo"]:
-                    df[col] = ""
-                else:
-                    df[col] = 0.0
-    
-    # 4. SANEAMENTO (Cast de Tipos)
-    if not df.empty:
-        cols_float = ["Peso_kg", "Altura_m", "Gordura_Perc", "Pescoco_cm", "Cintura_cm", "Quadril_cm",
-                      "Biceps_cm", "Peito_cm", "Coxa_cm", "Sono_hrs", "Agua_L", 
-                      "Meta_Peso_kg", "Meta_BF_perc", "Prot_g", "Carb_g", "Gord_g", "Calorias_Gastas"]
-        
-        for col in cols_float:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0)
-        
-        if "Idade" in df.columns:
-            df["Idade"] = pd.to_numeric(df["Idade"], errors='coerce').fillna(26).astype(int)
-        
-        if "Calorias_Ingeridas" in df.columns:
-            df["Calorias_Ingeridas"] = pd.to_numeric(df["Calorias_Ingeridas"], errors='coerce').fillna(0).astype(int)
+        df = schemas.completar_colunas("Bio", df, expected_cols)
+        # Coluna derivada: calculada na leitura, não precisa estar atualizada na planilha
+        df["Massa_Magra"] = calcular_massa_magra(df)
 
     return df
 
 def save_data(df):
     conexoes.save_gsheet("Bio", df)
 
+def calcular_massa_magra(df):
+    return (df["Peso_kg"] * (1 - (df["Gordura_Perc"] / 100))).fillna(0.0).round(2)
+
 def massa_magra_set():
-    df = load_data()
-    df["Massa_Magra"] = df["Peso_kg"] * (1 - (df["Gordura_Perc"] / 100))
-    df["Massa_Magra"] = df["Massa_Magra"].fillna(0.0).round(2)
-    save_data(df)
-    return True
+    """
+    Grava na planilha a Massa_Magra só das linhas em que o valor salvo está desatualizado
+    (manutenção; a página já calcula a coluna na leitura). Retorna quantas linhas mudaram.
+    """
+    df = conexoes.load_gsheet("Bio", ["Data", "Peso_kg", "Gordura_Perc", "Massa_Magra"])
+    if df.empty:
+        return 0
+    if "Massa_Magra" not in df.columns:
+        # Planilha antiga sem a coluna: uma reescrita completa cria a coluna para todas as linhas
+        df = load_data()
+        save_data(df)
+        return len(df)
+    editado = df.copy()
+    editado["Massa_Magra"] = calcular_massa_magra(df)
+    mudaram = int((~np.isclose(editado["Massa_Magra"], df["Massa_Magra"])).sum())
+    if mudaram:
+        conexoes.save_gsheet_diff("Bio", df, editado)
+    return mudaram
 
 import pandas as pds
 import numpy as np
@@ -76,6 +74,10 @@ from statsmodels.tsa.arima.model import ARIMA
 import warnings
 warnings.filterwarnings("ignore") # Evita alertas de convergência do statsmodels
 
+# Os dois modelos só dependem destas colunas: reruns sem mudança nelas reaproveitam o ajuste
+COLUNAS_MODELO = ["Data", "Peso_kg", "Calorias_Gastas"]
+
+@cache_modelos.cache_modelo(COLUNAS_MODELO)
 def previsao_arimax(df_input, meta_peso=65.0):
     df = df_input.copy()
 
@@ -129,6 +131,7 @@ def previsao_arimax(df_input, meta_peso=65.0):
 
     return impacto_calorico, previsoes_7_14, data_prevista
 
+@cache_modelos.cache_modelo(COLUNAS_MODELO)
 def regressao_linear(df_input, meta_peso=88.0):
     df = df_input.copy()
 
@@ -194,8 +197,6 @@ def render_page():
     st.title("🧬 Dados Corporais")
     st.markdown("---")
 
-    massa_magra_set()
-
     df = load_data()
     tendencia_arimax, previsoes_arimax, data_prevista_arimax = previsao_arimax(df, meta_peso=88.)
     tendencia, previsoes, data_prevista = regressao_linear(df)
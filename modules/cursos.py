@@ -11,9 +11,6 @@ def load_data():
     df = conexoes.load_gsheet("Cursos", cols)
     
     if not df.empty:
-        # Saneamento de tipos
-        df["Total_Aulas"] = pd.to_numeric(df["Total_Aulas"], errors='coerce').fillna(1).astype(int)
-        df["Aulas_Feitas"] = pd.to_numeric(df["Aulas_Feitas"], errors='coerce').fillna(0).astype(int)
         df["Link_Certificado"] = df["Link_Certificado"].fillna("")
     return df
 
@@ -39,7 +36,6 @@ def render_page():
             (df_log['Data'] >= primeiro_dia)
         ].copy()
         
-        df_mes['Valor'] = pd.to_numeric(df_mes['Valor'], errors='coerce').fillna(0)
         total_aulas_mes = df_mes['Valor'].sum()
         
         # Média Realista: Divide pelo dia atual (ex: dia 8)
@@ -8,46 +8,51 @@ import os
 
 from modules import conexoes
 
-@st.cache_data(ttl=600)
+# Sem st.cache_data: as abas vêm do cache por aba do conexoes (uma escrita não derruba as outras)
 def load_all_data():
-    # 1. Financeiro & Trade
-    df_trans = conexoes.load_gsheet("Transacoes", ["Data", "Tipo", "Valor_Total", "Categoria"])
-    df_invest = conexoes.load_gsheet("Investimentos", ["Total_Pago", "Qtd", "Preco_Unitario"])
-    df_trade = conexoes.load_gsheet("DayTrade", ["Data", "Lucro", "Banca_Final"])
-    
-    # 2. Produtividade & Cultura
-    df_prod = conexoes.load_gsheet("Log_Produtividade", ["Data", "Tipo", "Valor", "Unidade"])
-    df_read = conexoes.load_gsheet("Leituras", ["Status", "Paginas_Lidas"])
-    df_musica = conexoes.load_gsheet("Musica", ["ID"])
-    df_filmes = conexoes.load_gsheet("Filmes", ["Status"])
-    
-    # 3. Saúde & Alma
-    df_bio = conexoes.load_gsheet("Bio", ["Data", "Peso_kg", "Gordura_Perc", "Sono_hrs", "Calorias_Ingeridas"])
-    df_alma = conexoes.load_gsheet("Alma", ["Data", "Nivel_Paz_0_10", "Emocao_Dominante"])
-    
-    # 4. Projetos & Acadêmico & METAS SMART (ATUALIZADO)
-    df_fac_conf = conexoes.load_gsheet("Fac_Config", ["Inicio", "Fim"])
-    df_deals = conexoes.load_gsheet("CRM_Deals", ["Cliente", "Projeto", "Valor_Est", "Estagio"])
-    
-    # --- UPDATE AQUI: Novas colunas SMART ---
-    df_metas = conexoes.load_gsheet("Metas", ["ID", "Titulo", "Motivo_R", "Meta_Valor", "Unidade", "Progresso_Atual", "Deadline_T", "Ano"])
-    # ----------------------------------------
-    
-    df_hobbies = conexoes.load_gsheet("Hobbies", ["Nome", "Status", "Progresso_Perc"])
-    
-    # 5. Cognitivo
-    df_eisen = conexoes.load_gsheet("Tarefas", ["Tarefa", "Prioridade", "Concluido"]) 
-    df_fear = conexoes.load_gsheet("FearSetting", ["Medo_Acao", "Status"])
+    # Todas as abas numa única requisição (values:batchGet) em vez de 19 chamadas em sequência
+    abas = {
+        # 1. Financeiro & Trade
+        "Transacoes": ["Data", "Tipo", "Valor_Total", "Categoria"],
+        "Investimentos": ["Total_Pago", "Qtd", "Preco_Unitario"],
+        "DayTrade": ["Data", "Lucro", "Banca_Final"],
 
-    # 6. Módulos Adicionais
-    df_trip = conexoes.load_gsheet("Viagens_Fin", ["Viagem", "Valor_Final_BRL", "Pago"])
-    df_proj = conexoes.load_gsheet("Projetos", ["ID", "Nome", "Status"])
-    df_task = conexoes.load_gsheet("Tarefas_Projetos", ["Projeto_ID", "Status"])
-    df_series = conexoes.load_gsheet("Series", ["Titulo", "Temporada", "Total_Episodios", "Eps_Assistidos", "Status", "Onde_Assistir"])
-    
-    return (df_trans, df_invest, df_trade, df_prod, df_read, df_bio, df_alma, 
-            df_fac_conf, df_deals, df_metas, df_hobbies, df_eisen, df_fear, 
-            df_musica, df_filmes, df_trip, df_proj, df_task, df_series)
+        # 2. Produtividade & Cultura
+        "Log_Produtividade": ["Data", "Tipo", "Valor", "Unidade"],
+        "Leituras": ["Status", "Paginas_Lidas"],
+        "Musica": ["ID"],
+        "Filmes": ["Status"],
+
+        # 3. Saúde & Alma
+        "Bio": ["Data", "Peso_kg", "Gordura_Perc", "Sono_hrs", "Calorias_Ingeridas"],
+        "Alma": ["Data", "Nivel_Paz_0_10", "Emocao_Dominante"],
+
+        # 4. Projetos & Acadêmico & METAS SMART (ATUALIZADO)
+        "Fac_Config": ["Inicio", "Fim"],
+        "CRM_Deals": ["Cliente", "Projeto", "Valor_Est", "Estagio"],
+
+        # --- UPDATE AQUI: Novas colunas SMART ---
+        "Metas": ["ID", "Titulo", "Motivo_R", "Meta_Valor", "Unidade", "Progresso_Atual", "Deadline_T", "Ano"],
+        # ----------------------------------------
+
+        "Hobbies": ["Nome", "Status", "Progresso_Perc"],
+
+        # 5. Cognitivo
+        "Tarefas": ["Tarefa", "Prioridade", "Concluido"],
+        "FearSetting": ["Medo_Acao", "Status"],
+
+        # 6. Módulos Adicionais
+        "Viagens_Fin": ["Viagem", "Valor_Final_BRL", "Pago"],
+        "Projetos": ["ID", "Nome", "Status"],
+        "Tarefas_Projetos": ["Projeto_ID", "Status"],
+        "Series": ["Titulo", "Temporada", "Total_Episodios", "Eps_Assistidos", "Status", "Onde_Assistir"],
+    }
+    dfs = conexoes.load_gsheets_batch(abas)
+
+    return (dfs["Transacoes"], dfs["Investimentos"], dfs["DayTrade"], dfs["Log_Produtividade"], dfs["Leituras"],
+            dfs["Bio"], dfs["Alma"], dfs["Fac_Config"], dfs["CRM_Deals"], dfs["Metas"], dfs["Hobbies"],
+            dfs["Tarefas"], dfs["FearSetting"], dfs["Musica"], dfs["Filmes"], dfs["Viagens_Fin"],
+            dfs["Projetos"], dfs["Tarefas_Projetos"], dfs["Series"])
 
 def render_page():
     st.header("🚀 Mainframe: Life OS")
@@ -164,9 +169,7 @@ def render_page():
     st.subheader(f"🎯 Metas {hoje.year} (SMART)")
     
     if not df_metas.empty:
-        # Tratamento de dados para o Dashboard
-        df_metas["Ano"] = pd.to_numeric(df_metas["Ano"], errors='coerce').fillna(hoje.year).astype(int)
-        
+        # Ano já vem como int pelo registro de tipos
         # Filtra apenas metas do ano atual para o dashboard principal
         metas_ano = df_metas[df_metas['Ano'] == hoje.year]
         
@@ -240,8 +243,6 @@ def render_page():
     
     divida_viagem = 0
     if not df_trip.empty:
-        df_trip['Valor_Final_BRL'] = pd.to_numeric(df_trip['Valor_Final_BRL'], errors='coerce').fillna(0)
-        df_trip['Pago'] = df_trip['Pago'].astype(str).str.upper() == "TRUE"
         divida_viagem = df_trip[df_trip['Pago'] == False]['Valor_Final_BRL'].sum()
     kp3.metric("✈️ Viagens", f"R$ {divida_viagem:,.0f}", "A Pagar", delta_color="inverse" if divida_viagem > 0 else "off")
 
@@ -259,4 +260,11 @@ def render_page():
     kp5.metric("🎓 Semestre", status_fac)
 
     kp6.metric("🎬 Filmes", f"{len(df_filmes[df_filmes['Status']=='Assistido']) if not df_filmes.empty else 0}")
-    kp7.metric("📺 Séries", f"{len(df_series[df_series['Status']=='Assistindo']) if not df_series.empty else 0}", "Ativas")
\ No newline at end of file
+    kp7.metric("📺 Séries", f"{len(df_series[df_series['Status']=='Assistindo']) if not df_series.empty else 0}", "Ativas")
+
+    # Diagnóstico de carga (latência da última leitura de cada aba)
+    latencias = conexoes.get_latencias_abas()
+    if latencias:
+        with st.expander("⏱️ Latência por aba"):
+            df_lat = pd.DataFrame(list(latencias.items()), columns=["Aba", "Segundos"]).sort_values("Segundos", ascending=False)
+            st.dataframe(df_lat, hide_index=True, use_container_width=True)
\ No newline at end of file
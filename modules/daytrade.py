@@ -7,22 +7,24 @@ import plotly.graph_objects as go
 
 from modules import conexoes
 
+COLS_DAYTRADE = ["Data", "Banca_Inicial", "Banca_Final", "Lucro", "Perc_Dia", "Risco_USD", "Saque_USD", "Aportes_USD"]
+
 def load_data():
-    cols = ["Data", "Banca_Inicial", "Banca_Final", "Lucro", "Perc_Dia", "Risco_USD", "Saque_USD", "Aportes_USD"]
-    df = conexoes.load_gsheet("DayTrade", cols)
-    
-    if not df.empty:
-        # Saneamento para cálculos (converte tudo que é valor para float)
-        numeric_cols = ["Banca_Inicial", "Banca_Final", "Lucro", "Perc_Dia", "Risco_USD", "Saque_USD", "Aportes_USD"]
-        for col in numeric_cols:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0)
-    return df
+    # Valores já chegam como float pelo registro de tipos (modules/schemas.py)
+    return conexoes.load_gsheet("DayTrade", COLS_DAYTRADE)
 
-def save_data(df):
+def _preparar(df):
     # Converte a coluna de Data para string antes de salvar para evitar erro de JSON no GSheets
-    df_save = df.copy()
+    df_save = df[[c for c in COLS_DAYTRADE if c in df.columns]].copy()
     df_save['Data'] = df_save['Data'].astype(str)
-    conexoes.save_gsheet("DayTrade", df_save)
+    return df_save
+
+def save_data(df, df_original=None):
+    # Com o snapshot do load, sobe só as células/linhas alteradas
+    if df_original is not None:
+        conexoes.save_gsheet_diff("DayTrade", _preparar(df_original), _preparar(df))
+    else:
+        conexoes.save_gsheet("DayTrade", _preparar(df))
 
 def render_page():
     st.header("📈 Day Trade (Gestão & Performance)")
@@ -117,7 +119,8 @@ def render_page():
             st.bar_chart(df.set_index("Data")["Lucro"])
         
         st.subheader("Extrato / CRUD")
-        df_edit = df.sort_values("Data", ascending=False).reset_index(drop=True)
+        # Mantém o índice do load (posição na planilha) para o save por diff
+        df_edit = df.sort_values("Data", ascending=False)
         edited_df = st.data_editor(
             df_edit,
             column_config={
@@ -127,13 +130,12 @@ def render_page():
                 "Lucro": st.column_config.NumberColumn("Lucro", format="$ %.2f", disabled=True),
                 "Perc_Dia": st.column_config.NumberColumn("%", format="%.2f %%", disabled=True),
             },
-            width=True, num_rows="dynamic", key="dt_editor"
+            width=True, num_rows="dynamic", key="dt_editor", hide_index=True
         )
         if not edited_df.equals(df_edit):
             edited_df['Lucro'] = edited_df['Banca_Final'] - (edited_df['Banca_Inicial'] + edited_df['Aportes_USD'])
             edited_df['Perc_Dia'] = edited_df.apply(lambda x: (x['Lucro']/(x['Banca_Inicial']+x['Aportes_USD'])*100) if (x['Banca_Inicial']+x['Aportes_USD'])>0 else 0, axis=1)
-            edited_df = edited_df.sort_values("Data")
-            save_data(edited_df)
+            save_data(edited_df, df_original=df)
             st.rerun()
             
         with st.expander("🗑️ Excluir Dias"):
@@ -143,8 +145,7 @@ def render_page():
                 c1.write(row['Data'].strftime('%d/%m/%Y'))
                 c2.write(f"$ {row['Lucro']:,.2f}")
                 if c4.button("🗑️", key=f"d_{idx}"):
-                    df = df.drop(idx)
-                    save_data(df)
+                    save_data(df.drop(idx), df_original=df)
                     st.rerun()
 
     # --- ABA 2: PROJEÇÃO DETALHADA ---
@@ -11,11 +11,7 @@ def load_data():
     cols = ["Decisao_ID", "Titulo", "Opcao", "Criterio", "Peso", "Nota"]
     df = conexoes.load_gsheet("Decisoes", cols)
     
-    if not df.empty:
-        # Saneamento de tipos para cálculos matemáticos
-        df["Decisao_ID"] = pd.to_numeric(df["Decisao_ID"], errors='coerce').fillna(0).astype(int)
-        df["Peso"] = pd.to_numeric(df["Peso"], errors='coerce').fillna(1).astype(int)
-        df["Nota"] = pd.to_numeric(df["Nota"], errors='coerce').fillna(0).astype(int)
+    # Decisao_ID/Peso/Nota já chegam como int pelo registro de tipos
     return df
 
 def save_data(df):
@@ -9,8 +9,6 @@ def load_data():
     cols_d = ["ID", "Data", "Conteudo", "Tags", "Processado", "Destino"]
     df_d = conexoes.load_gsheet("Dump_Mental", cols_d)
     if not df_d.empty:
-        df_d["ID"] = pd.to_numeric(df_d["ID"], errors='coerce').fillna(0).astype(int)
-        df_d["Processado"] = df_d["Processado"].astype(str).str.upper() == "TRUE"
         # Tratamento de Data
         df_d["Data"] = pd.to_datetime(df_d["Data"], format='mixed', dayfirst=False, errors='coerce')
 
@@ -22,11 +20,19 @@ def load_data():
 
     return df_d, df_p, df_m
 
-def save_data(df, aba):
+def _preparar(df):
     df_s = df.copy()
     if "Data" in df_s.columns: 
         df_s["Data"] = pd.to_datetime(df_s["Data"], errors='coerce').dt.strftime('%Y-%m-%d').fillna(str(date.today()))
-    conexoes.save_gsheet(aba, df_s)
+    return df_s
+
+def save_data(df, aba, em_fila=False):
+    # em_fila=True: a escrita sobe em fundo pela fila do conexoes (sem travar a página)
+    conexoes.save_gsheet(aba, _preparar(df), em_fila=em_fila)
+
+def append_data(df_novas, aba):
+    # Só as linhas novas (captura rápida não reescreve o Dump inteiro)
+    conexoes.append_rows(aba, _preparar(df_novas))
 
 # --- ENGINE DO CÉREBRO ---
 def render_page():
@@ -58,8 +64,7 @@ def render_page():
                         "Processado": False,
                         "Destino": ""
                     }
-                    df_dump = pd.concat([df_dump, pd.DataFrame([novo])], ignore_index=True)
-                    save_data(df_dump, "Dump_Mental")
+                    append_data(pd.DataFrame([novo]), "Dump_Mental")
                     st.toast("Pensamento capturado!")
                     st.rerun()
                 else:
@@ -103,12 +108,12 @@ def render_page():
                                     "Resumo_Geral": row['Conteudo'], "Capa_URL": "", "ContraCapa_URL": ""
                                 }
                                 df_proj = pd.concat([df_proj, pd.DataFrame([novo_proj])], ignore_index=True)
-                                save_data(df_proj, "Criatividade_Projetos")
+                                save_data(df_proj, "Criatividade_Projetos", em_fila=True)
                                 
                                 # Marca Dump como processado
                                 df_dump.loc[df_dump['ID'] == row['ID'], 'Processado'] = True
                                 df_dump.loc[df_dump['ID'] == row['ID'], 'Destino'] = "Projeto Criativo"
-                                save_data(df_dump, "Dump_Mental")
+                                save_data(df_dump, "Dump_Mental", em_fila=True)
                                 st.success("Promovido a Projeto!")
                                 st.rerun()
 
@@ -120,11 +125,11 @@ def render_page():
                                 new_mid = 1 if df_metas.empty else df_metas['ID'].max() + 1
                                 nova_meta = {"ID": new_mid, "Titulo": row['Conteudo'][:30], "Meta_Valor": val_meta, "Progresso_Manual": 0}
                                 df_metas = pd.concat([df_metas, pd.DataFrame([nova_meta])], ignore_index=True)
-                                save_data(df_metas, "Metas")
+                                save_data(df_metas, "Metas", em_fila=True)
                                 
                                 df_dump.loc[df_dump['ID'] == row['ID'], 'Processado'] = True
                                 df_dump.loc[df_dump['ID'] == row['ID'], 'Destino'] = "Meta Financeira"
-                                save_data(df_dump, "Dump_Mental")
+                                save_data(df_dump, "Dump_Mental", em_fila=True)
                                 st.success("Virou Meta!")
                                 st.rerun()
 
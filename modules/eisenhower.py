@@ -12,13 +12,7 @@ def load_data():
     cols = ["ID", "Tarefa", "Importante", "Urgente", "Status", "Data_Add"]
     df = conexoes.load_gsheet("Eisenhower", cols)
     
-    if not df.empty:
-        # Saneamento técnico para garantir filtros booleanos corretos
-        df["ID"] = pd.to_numeric(df["ID"], errors='coerce').fillna(0).astype(int)
-        # GSheets pode trazer booleanos como strings "TRUE"/"FALSE"
-        df["Importante"] = df["Importante"].astype(str).str.upper() == "TRUE"
-        df["Urgente"] = df["Urgente"].astype(str).str.upper() == "TRUE"
-        
+    # ID e os booleanos ("TRUE"/"FALSE" do GSheets) já vêm tipados pelo registro de tipos
     return df
 
 def save_data(df):
@@ -8,7 +8,7 @@ import time
 
 from modules import conexoes
 
-@st.cache_data(ttl=600)
+# Sem st.cache_data: as abas vêm do cache por aba do conexoes (as escritas atualizam só a aba salva)
 def load_data():
     # Definição das colunas para cada aba
     cols_conf = ["Inicio", "Fim"]
@@ -18,22 +18,28 @@ def load_data():
     cols_top = ["Materia", "Topico", "Status"]
     cols_rec = ["Materia", "Nome", "Link", "Tipo"]
 
-    # Carregamento via Google Sheets
-    df_conf = conexoes.load_gsheet("Fac_Config", cols_conf)
+    # Carregamento via Google Sheets (as 6 abas numa única requisição)
+    dfs = conexoes.load_gsheets_batch({
+        "Fac_Config": cols_conf,
+        "Fac_Recursos": cols_rec,
+        "Fac_Horarios": cols_hor,
+        "Fac_Materias": cols_mat,
+        "Fac_Avaliacoes": cols_aval,
+        "Fac_Topicos": cols_top,
+    })
+
+    df_conf = dfs["Fac_Config"]
     if df_conf.empty:
         df_conf = pd.DataFrame([{"Inicio": str(date.today()), "Fim": str(date.today() + timedelta(days=120))}])
     
-    df_rec = conexoes.load_gsheet("Fac_Recursos", cols_rec)
-    df_h = conexoes.load_gsheet("Fac_Horarios", cols_hor)
-    df_m = conexoes.load_gsheet("Fac_Materias", cols_mat)
-    df_a = conexoes.load_gsheet("Fac_Avaliacoes", cols_aval)
-    df_t = conexoes.load_gsheet("Fac_Topicos", cols_top)
+    df_rec = dfs["Fac_Recursos"]
+    df_h = dfs["Fac_Horarios"]
+    df_m = dfs["Fac_Materias"]
+    df_a = dfs["Fac_Avaliacoes"]
+    df_t = dfs["Fac_Topicos"]
 
     # --- SANEAMENTO DE TIPOS (GSheets -> Python Types) ---
     if not df_a.empty:
-        df_a["Peso"] = pd.to_numeric(df_a["Peso"], errors='coerce').fillna(1.0)
-        df_a["Nota"] = pd.to_numeric(df_a["Nota"], errors='coerce').fillna(0.0)
-        df_a["Concluido"] = df_a["Concluido"].astype(str).str.upper() == "TRUE"
         if "Topicos_Ref" not in df_a.columns: df_a["Topicos_Ref"] = "-"
         df_a["Topicos_Ref"] = df_a["Topicos_Ref"].apply(str_to_list)
 
@@ -254,8 +260,7 @@ def render_page():
         }
 
         # Agrupa matérias por semestre para criar os "Clusters"
-        # Garante que Semestre_Ref seja numérico e trata erros
-        df_mat['Semestre_Ref'] = pd.to_numeric(df_mat['Semestre_Ref'], errors='coerce').fillna(99).astype(int)
+        # Semestre_Ref já vem como int (inválidos = 99) pelo registro de tipos
         semestres_unicos = sorted(df_mat['Semestre_Ref'].unique())
 
         # Adiciona nós (bolinhas) organizados por semestre
@@ -12,9 +12,6 @@ def load_data():
     ]
     df = conexoes.load_gsheet("FearSetting", cols)
     
-    if not df.empty:
-        # Saneamento de tipos para garantir IDs numéricos
-        df["ID"] = pd.to_numeric(df["ID"], errors='coerce').fillna(0).astype(int)
     return df
 
 def save_data(df):
@@ -1,9 +1,8 @@
 import streamlit as st
 import pandas as pd
-import requests
 import plotly.express as px
 from datetime import date
-from modules import conexoes
+from modules import conexoes, rede
 
 # --- CONFIGURAÇÃO API ---
 TMDB_BASE_URL = "https://api.themoviedb.org/3"
@@ -22,8 +21,6 @@ def load_data():
     
     if not df.empty:
         df["ID_TMDB"] = df["ID_TMDB"].astype(str)
-        df["Ano"] = pd.to_numeric(df["Ano"], errors='coerce').fillna(0).astype(int)
-        df["Nota"] = pd.to_numeric(df["Nota"], errors='coerce').fillna(0.0)
     return df
 
 def save_data(df):
@@ -32,15 +29,15 @@ def save_data(df):
 
 # --- INTEGRAÇÃO TMDB ---
 def search_movie(query):
-    url = f"{TMDB_BASE_URL}/search/movie?query={query}&language=pt-BR"
+    url = f"{TMDB_BASE_URL}/search/movie"
     try:
-        return requests.get(url, headers=HEADERS).json().get('results', [])
+        return rede.get_json(url, params={"query": query, "language": "pt-BR"}, headers=HEADERS).get('results', [])
     except: return []
 
 def get_movie_details(tmdb_id):
-    url = f"{TMDB_BASE_URL}/movie/{tmdb_id}?language=pt-BR&append_to_response=credits"
+    url = f"{TMDB_BASE_URL}/movie/{tmdb_id}"
     try:
-        data = requests.get(url, headers=HEADERS).json()
+        data = rede.get_json(url, params={"language": "pt-BR", "append_to_response": "credits"}, headers=HEADERS)
         diretor = "Desconhecido"
         # Busca Diretor nos Créditos
         for crew in data.get('credits', {}).get('crew', []):
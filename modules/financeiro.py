@@ -1,12 +1,11 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import datetime
-from datetime import date, timedelta
-from modules import conexoes
+from datetime import date
+from modules import conexoes, mercado, simulacao, otimizador, livro
 import altair as alt
 import time
-from dateutil.relativedelta import relativedelta
-import requests
 import math
 
 st.set_page_config(layout="wide", page_title="Finance Dashboard")
@@ -19,12 +18,6 @@ def get_financiamentos_schema():
 def load_financiamentos_data():
     try:
         df = conexoes.load_gsheet("Financiamentos", get_financiamentos_schema())
-        cols_num = ["Valor_Emprestado", "Valor_Parcela"]
-        for c in cols_num:
-            if c in df.columns: df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0.0)
-        cols_int = ["Qtd_Total", "Qtd_Pagas"]
-        for c in cols_int:
-            if c in df.columns: df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0).astype(int)
     except:
         df = pd.DataFrame(columns=get_financiamentos_schema())
     return df
@@ -37,108 +30,204 @@ def save_financiamentos_data(df):
     except Exception as e:
         st.error(f"Erro ao salvar: {e}")
 
-def projetar_futuro(df_parcelas, df_financiamentos, salario, div_mensal_inicial, saldo_cdi_inicial, config_pesos, dy_medio_carteira, teto_cdi, simulacao=None, dias_fechamento=None):
-    """
-    Atualizado para incluir Financiamentos Recorrentes.
-    """
-    hoje = datetime.now().date()
-    dados_meses = []
+# --- MOTOR DE PARCELAS (VETORIZADO) ---
+# Cada parcela de cartão e cada financiamento vira uma tripla (primeiro_mes, ultimo_mes, valor),
+# com meses como número absoluto (ano*12 + mês-1). O total de cada mês do horizonte sai de uma
+# varredura de diferenças acumuladas: +valor no primeiro mês, -valor depois do último, cumsum.
 
-    if not dias_fechamento:
-        dias_fechamento = {"Nubank": 2, "Itaú": 1, "Mercado Pago": 5, "Banco Pan": 26}
-
-    # Prepara listas
-    lista_despesas = df_parcelas.to_dict('records')
-    lista_financiamentos = df_financiamentos.to_dict('records') if not df_financiamentos.empty else []
+def _mes_abs(datas):
+    return (datas.dt.year * 12 + datas.dt.month - 1).to_numpy()
 
+def _triplas_parcelas(df_parcelas, dias_fechamento, simulacao=None):
+    df = df_parcelas[["Data_Compra", "Cartão", "Valor", "Vezes"]] if not df_parcelas.empty else pd.DataFrame(columns=["Data_Compra", "Cartão", "Valor", "Vezes"])
     if simulacao:
-        lista_despesas.append({
-            "O Quê": simulacao['desc'],
-            "Valor": simulacao['valor'] / simulacao['vezes'],
-            "Vezes": simulacao['vezes'],
+        df = pd.concat([df, pd.DataFrame([{
             "Data_Compra": simulacao['data'].strftime("%Y-%m-%d"),
             "Cartão": simulacao['cartao'],
-            "Simulado": True
-        })
+            "Valor": simulacao['valor'] / simulacao['vezes'],
+            "Vezes": simulacao['vezes'],
+        }])], ignore_index=True)
+
+    compra = pd.to_datetime(df["Data_Compra"].astype(str), format="%Y-%m-%d", errors="coerce")
+    validas = compra.notna().to_numpy()
+    dia_fec = df["Cartão"].map(dias_fechamento).fillna(1).to_numpy()
+    # Compra no dia do fechamento ou depois cai na fatura do mês seguinte
+    primeiro = _mes_abs(compra.fillna(pd.Timestamp(0))) + (compra.dt.day.fillna(0).to_numpy() >= dia_fec)
+    vezes = pd.to_numeric(df["Vezes"], errors="coerce").fillna(0).astype(int).to_numpy()
+    valor = pd.to_numeric(df["Valor"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    return primeiro[validas], (primeiro + vezes - 1)[validas], valor[validas]
+
+def _triplas_financiamentos(df_financiamentos):
+    if df_financiamentos.empty:
+        return np.array([], dtype=int), np.array([], dtype=int), np.array([])
+    inicio = pd.to_datetime(df_financiamentos["Data_Inicio"].astype(str), format="%Y-%m-%d", errors="coerce")
+    validas = inicio.notna().to_numpy()
+    inicio = inicio.fillna(pd.Timestamp(0))
+    # O mês do contrato conta a partir do dia 28 (regra antiga) e vai até Qtd_Total meses corridos
+    primeiro = _mes_abs(inicio) + (inicio.dt.day.to_numpy() > 28)
+    ultimo = _mes_abs(inicio) + pd.to_numeric(df_financiamentos["Qtd_Total"], errors="coerce").fillna(0).astype(int).to_numpy() - 1
+    valor = pd.to_numeric(df_financiamentos["Valor_Parcela"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    return primeiro[validas], ultimo[validas], valor[validas]
+
+def _varrer_meses(primeiro, ultimo, valor, mes_inicial, horizonte):
+    """Total por mês do horizonte: parcelas ativas em [primeiro, ultimo] somadas em O(n + horizonte)."""
+    ini = np.clip(primeiro - mes_inicial, 0, horizonte)
+    fim = np.clip(ultimo - mes_inicial + 1, 0, horizonte)
+    ativas = ini < fim
+    delta = np.zeros(horizonte + 1)
+    np.add.at(delta, ini[ativas], valor[ativas])
+    np.add.at(delta, fim[ativas], -valor[ativas])
+    total = np.cumsum(delta[:-1])
+    # Resíduo de ponto flutuante quando todas as parcelas já saíram (evita "R$ -0.00")
+    return np.where(np.abs(total) < 1e-6, 0.0, total)
+
+def gastos_projetados(df_parcelas, df_financiamentos, horizonte=12, simulacao=None, dias_fechamento=None):
+    """(cartão, financiamentos): arrays com o total de cada mês do horizonte a partir do mês atual."""
+    if not dias_fechamento:
+        dias_fechamento = {"Nubank": 2, "Itaú": 1, "Mercado Pago": 5, "Banco Pan": 26}
+    hoje = datetime.now()
+    mes_inicial = hoje.year * 12 + hoje.month - 1
+    return (
+        _varrer_meses(*_triplas_parcelas(df_parcelas, dias_fechamento, simulacao), mes_inicial, horizonte),
+        _varrer_meses(*_triplas_financiamentos(df_financiamentos), mes_inicial, horizonte),
+    )
 
-    # Variáveis Acumuladoras
-    div_projetado = div_mensal_inicial
-    saldo_cdi_proj = saldo_cdi_inicial
+def projetar_futuro(df_parcelas, df_financiamentos, salario, div_mensal_inicial, saldo_cdi_inicial, config_pesos, dy_medio_carteira, teto_cdi, simulacao=None, dias_fechamento=None, rendimento_cdi=None, horizonte=12):
+    """
+    Atualizado para incluir Financiamentos Recorrentes.
+    rendimento_cdi: taxa mensal da reserva (padrão: CDI médio dos últimos 12 meses).
+    horizonte: meses projetados a partir do mês atual.
+    """
+    if rendimento_cdi is None:
+        rendimento_cdi = mercado.taxa_media("CDI", 12)
+
+    # 1. Gastos de cada mês (uma passada nas parcelas e nos contratos, independente do horizonte)
+    gastos_cartao, gastos_finan = gastos_projetados(df_parcelas, df_financiamentos, horizonte, simulacao, dias_fechamento)
+
+    # 2. A bola de neve depende do mês anterior (dividendo reinvestido): recorrência O(horizonte)
     peso_fii = config_pesos.get('p_fii', 0.25)
     peso_cdi = config_pesos.get('p_cdi', 0.25)
     soma_pesos = peso_fii + peso_cdi
     if soma_pesos == 0: soma_pesos = 1
 
-    for i in range(12):
-        data_ref = hoje + relativedelta(months=i)
-        mes_ref = data_ref.month
-        ano_ref = data_ref.year
-        
-        gastos_cartao = 0.0
-        gastos_finan = 0.0
-
-        # 1. Soma Cartão (Lógica existente)
-        for despesa in lista_despesas:
-            data_compra = datetime.strptime(str(despesa["Data_Compra"]), "%Y-%m-%d").date()
-            dia_fec = dias_fechamento.get(despesa["Cartão"], 1)
-            
-            if data_compra.day >= dia_fec: inicio_pagto = data_compra + relativedelta(months=1)
-            else: inicio_pagto = data_compra
-            
-            data_primeira_parc = date(inicio_pagto.year, inicio_pagto.month, 1)
-            data_ultima_parc = data_primeira_parc + relativedelta(months=despesa["Vezes"] - 1)
-            data_mes_loop = date(ano_ref, mes_ref, 1)
+    entradas = np.empty(horizonte)
+    dividendos = np.empty(horizonte)
+    aportes_fii = np.zeros(horizonte)
+    aportes_cdi = np.zeros(horizonte)
+    saldos_cdi = np.empty(horizonte)
+    balancos = np.empty(horizonte)
 
-            if data_primeira_parc <= data_mes_loop <= data_ultima_parc:
-                gastos_cartao += float(despesa["Valor"])
-        
-        # 2. Soma Financiamentos (NOVA LÓGICA)
-        for fin in lista_financiamentos:
-            # Assume que começa a pagar no mês seguinte ao inicio
-            dt_inicio = datetime.strptime(str(fin["Data_Inicio"]), "%Y-%m-%d").date()
-            dt_fim = dt_inicio + relativedelta(months=fin["Qtd_Total"])
-            
-            # Se a data atual do loop está dentro do contrato
-            if dt_inicio <= date(ano_ref, mes_ref, 28) <= dt_fim:
-                # Verifica se já não foi quitado (Pagas < Total)
-                # Na projeção, assumimos pagamento linear, mas descontamos o que já foi pago
-                meses_corridos = (ano_ref - dt_inicio.year) * 12 + (mes_ref - dt_inicio.month)
-                if meses_corridos < fin["Qtd_Total"]:
-                    gastos_finan += float(fin["Valor_Parcela"])
-
-        # --- A MÁGICA DA PROJEÇÃO ---
-        total_entradas = salario + div_projetado
-        saldo_operacional = total_entradas - gastos_cartao - gastos_finan # Subtrai financiamento
-        
-        aporte_fii = 0.0
-        aporte_cdi = 0.0
-        
-        if saldo_operacional > 0:
-            investimento_total_mes = saldo_operacional 
-            aporte_fii = investimento_total_mes * (peso_fii / soma_pesos)
-            aporte_cdi = investimento_total_mes * (peso_cdi / soma_pesos)
-            
-            div_projetado += (aporte_fii * dy_medio_carteira)
-            saldo_cdi_proj = saldo_cdi_proj + (saldo_cdi_proj * 0.01) + aporte_cdi
-        else:
-            saldo_cdi_proj += (saldo_cdi_proj * 0.01)
-            
-        atingiu_teto = "✅" if saldo_cdi_proj >= teto_cdi else "⏳"
-
-        dados_meses.append({
-            "Mês": data_ref.strftime("%b/%y"),
-            "Entradas (Cresc.)": total_entradas,
-            "Dividendos Proj.": div_projetado,
-            "Gastos Cartão": gastos_cartao,
-            "Financiamentos": gastos_finan, # Nova Coluna
-            "Aporte FII": aporte_fii,
-            "Aporte CDI": aporte_cdi,
-            "Saldo CDI (Juros)": saldo_cdi_proj,
-            "Status Reserva": atingiu_teto,
-            "Balanço": saldo_operacional
-        })
-
-    return pd.DataFrame(dados_meses)
+    div_projetado = div_mensal_inicial
+    saldo_cdi_proj = saldo_cdi_inicial
+    for i in range(horizonte):
+        entradas[i] = salario + div_projetado
+        balancos[i] = entradas[i] - gastos_cartao[i] - gastos_finan[i]
+        if balancos[i] > 0:
+            aportes_fii[i] = balancos[i] * (peso_fii / soma_pesos)
+            aportes_cdi[i] = balancos[i] * (peso_cdi / soma_pesos)
+            div_projetado += aportes_fii[i] * dy_medio_carteira
+        saldo_cdi_proj = saldo_cdi_proj + (saldo_cdi_proj * rendimento_cdi) + aportes_cdi[i]
+        dividendos[i] = div_projetado
+        saldos_cdi[i] = saldo_cdi_proj
+
+    meses = pd.date_range(pd.Timestamp(datetime.now().date()).replace(day=1), periods=horizonte, freq="MS")
+    return pd.DataFrame({
+        "Mês": meses.strftime("%b/%y"),
+        "Entradas (Cresc.)": entradas,
+        "Dividendos Proj.": dividendos,
+        "Gastos Cartão": gastos_cartao,
+        "Financiamentos": gastos_finan,
+        "Aporte FII": aportes_fii,
+        "Aporte CDI": aportes_cdi,
+        "Saldo CDI (Juros)": saldos_cdi,
+        "Status Reserva": np.where(saldos_cdi >= teto_cdi, "✅", "⏳"),
+        "Balanço": balancos,
+    })
+
+# --- MONTE CARLO (FUTURO) ---
+def _grafico_leque(df, titulo, cor):
+    """Faixas P5-P95 e P25-P75 com a mediana por cima."""
+    base = alt.Chart(df).encode(x=alt.X('Mês', sort=None))
+    externa = base.mark_area(color=cor, opacity=0.2).encode(y=alt.Y('P5', title=titulo), y2='P95')
+    interna = base.mark_area(color=cor, opacity=0.4).encode(y='P25', y2='P75')
+    mediana = base.mark_line(color=cor, strokeWidth=2).encode(y='P50', tooltip=['Mês', 'P5', 'P50', 'P95'])
+    return externa + interna + mediana
+
+def render_monte_carlo(salario, div_atual, patrimonio_fii, saldo_cdi, pesos, dy_mensal, teto_cdi, gastos, n_cenarios, reais=False):
+    inicio = time.perf_counter()
+    # Semente fixa: o gráfico não muda a cada rerun da página
+    faixas, prob = simulacao.simular(
+        salario, div_atual, patrimonio_fii, saldo_cdi, pesos, dy_mensal, teto_cdi, gastos,
+        n=n_cenarios, semente=42, reais=reais,
+    )
+    duracao = time.perf_counter() - inicio
+
+    with st.container(border=True):
+        st.markdown(f"#### 🎲 Monte Carlo ({n_cenarios:,} cenários)".replace(",", "."))
+        final = faixas.groupby("Série").last()
+        k1, k2, k3 = st.columns(3)
+        k1.metric("Renda Passiva (mediana)", f"R$ {final.loc['Renda Passiva', 'P50']:,.2f}",
+                  help=f"P5: R$ {final.loc['Renda Passiva', 'P5']:,.2f} | P95: R$ {final.loc['Renda Passiva', 'P95']:,.2f}")
+        k2.metric("Reserva (mediana)", f"R$ {final.loc['Reserva', 'P50']:,.2f}",
+                  help=f"P5: R$ {final.loc['Reserva', 'P5']:,.2f} | P95: R$ {final.loc['Reserva', 'P95']:,.2f}")
+        k3.metric("Chance de bater o teto", f"{prob['Probabilidade'].iloc[-1]:.0%}")
+
+        g1, g2, g3 = st.tabs(["Patrimônio FII", "Renda Passiva", "Reserva"])
+        with g1:
+            st.altair_chart(_grafico_leque(faixas[faixas["Série"] == "Patrimônio FII"], "Patrimônio FII (R$)", "#6A1B9A"), width='stretch')
+        with g2:
+            st.altair_chart(_grafico_leque(faixas[faixas["Série"] == "Renda Passiva"], "Renda Passiva Mensal (R$)", "#2E7D32"), width='stretch')
+        with g3:
+            teto = alt.Chart(pd.DataFrame({'y': [teto_cdi]})).mark_rule(color='red', strokeDash=[5, 5]).encode(y='y')
+            st.altair_chart(_grafico_leque(faixas[faixas["Série"] == "Reserva"], "Saldo CDI (R$)", "#1565C0") + teto, width='stretch')
+
+        st.markdown("##### 🎯 Probabilidade de já ter batido o teto da reserva")
+        st.altair_chart(
+            alt.Chart(prob).mark_line(color='#1565C0', strokeWidth=3).encode(
+                x=alt.X('Mês', sort=None),
+                y=alt.Y('Probabilidade', axis=alt.Axis(format='%'), scale=alt.Scale(domain=[0, 1])),
+                tooltip=['Mês', alt.Tooltip('Probabilidade', format='.1%')],
+            ),
+            width='stretch',
+        )
+        st.caption(f"Faixas P5–P95 e P25–P75; CDI/IPCA sorteados do histórico do BCB, DY ±{simulacao.VOL_DY:.0%}. ⏱️ {duracao:.2f}s")
+
+# --- OTIMIZADOR (PROJEÇÃO DETALHADA) ---
+@st.fragment(run_every=1)
+def _acompanhar_otimizacao():
+    # Só este trecho reroda a cada segundo enquanto o pool trabalha
+    op = st.session_state.get("otimizacao")
+    if op is None or not op.rodando:
+        st.rerun()  # terminou: a página inteira mostra o resultado
+    st.progress(min(op.progresso, 1.0), text=f"{op.etapa} · {op.avaliadas} alocações avaliadas")
+    if st.button("⛔ Cancelar", key="cancelar_otimizacao"):
+        op.cancelar()
+
+def render_otimizacao(pesos):
+    op = st.session_state.get("otimizacao")
+    if op is None:
+        return
+    if op.rodando:
+        _acompanhar_otimizacao()
+        return
+    if op.erro:
+        st.error(f"Otimização falhou: {op.erro}")
+        return
+    if op.resultado is None:
+        st.info(f"Otimização {op.etapa.lower()}.")
+        return
+
+    r = op.resultado
+    renda_atual, chance_atual = op.avaliar_atual(pesos["FIIs"], pesos["CDI"])
+    if not r["viavel"]:
+        st.warning(f"Nenhuma alocação completa a reserva até o mês {op.mes_limite} em {op.confianca:.0%} dos cenários. Mostrando a de maior chance.")
+    k1, k2, k3, k4, k5 = st.columns(5)
+    k1.metric("FIIs", f"{r['FIIs']:.1%}", delta=f"{(r['FIIs'] - pesos['FIIs']) * 100:+.1f} p.p.")
+    k2.metric("CDI", f"{r['CDI']:.1%}", delta=f"{(r['CDI'] - pesos['CDI']) * 100:+.1f} p.p.")
+    k3.metric("Lazer", f"{r['Lazer']:.1%}", delta=f"{(r['Lazer'] - pesos['Lazer']) * 100:+.1f} p.p.")
+    k4.metric("Renda Mês 60 (mediana)", f"R$ {r['Renda Passiva']:,.2f}", delta=f"R$ {r['Renda Passiva'] - renda_atual:+,.2f}")
+    k5.metric(f"Reserva até o mês {op.mes_limite}", f"{r['Chance Reserva']:.0%}", delta=f"{(r['Chance Reserva'] - chance_atual) * 100:+.0f} p.p.")
+    st.caption(f"{r['Avaliadas']} alocações avaliadas em {op.fim - op.inicio:.1f}s. Deltas contra os pesos atuais.")
 
 # --- FUNÇÕES DE CONTROLE DE CICLO (MÊS VIGENTE) ---
 def get_datas_ciclo(dia_corte=5):
@@ -218,8 +307,13 @@ def carregar_estado_do_ciclo_atual(df):
 
 # --- SCHEMAS DE DADOS ---
 def get_portfolio_schema():
+    # Carteira montada: cadastro + posição derivada do Historico_Transacoes
     return ["Ticker", "Cotas", "Preco_Medio", "DY_Anual_Estimado", "Segmento"]
 
+def get_cadastro_schema():
+    # O que fica na aba Carteira (cotas e PM saem do histórico)
+    return ["Ticker", "DY_Anual_Estimado", "Segmento"]
+
 def get_transacoes_schema():
     return ["Data", "Ticker", "Tipo", "Cotas", "Preco", "Total"]
 
@@ -234,14 +328,6 @@ def get_parcelas_schema():
 def load_parcelas_data():
     try:
         df = conexoes.load_gsheet("Parcelas", get_parcelas_schema())
-        # Garante tipos numéricos
-        cols_num = ["Valor", "Faltam"]
-        for c in cols_num:
-            if c in df.columns: df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0.0)
-        # Garante inteiros
-        cols_int = ["Vezes", "Pagas", "Restantes"]
-        for c in cols_int:
-            if c in df.columns: df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0).astype(int)
     except:
         df = pd.DataFrame(columns=get_parcelas_schema())
     return df
@@ -255,39 +341,150 @@ def save_parcelas_data(df):
         st.error(f"Erro ao salvar: {e}")
 
 # --- FUNÇÕES DE ETL PARA INVESTIMENTOS ---
-def load_investments_data():
-    # Carrega Carteira
+def ler_investimentos():
+    """Cadastro da Carteira, Historico_Transacoes e CDI_Caixinhas como estão na planilha (só leitura)."""
+    # As 3 abas de investimento numa única requisição
+    try:
+        dfs = conexoes.load_gsheets_batch({
+            "Carteira": get_portfolio_schema(),
+            "Historico_Transacoes": get_transacoes_schema(),
+            "CDI_Caixinhas": get_cdi_schema(),
+        })
+    except:
+        dfs = {}
+
+    # Carrega Carteira (cadastro; a antiga ainda tem Cotas/Preco_Medio)
     try:
-        df_port = conexoes.load_gsheet("Carteira", get_portfolio_schema())
-        # Garante numérico
-        for c in ["Cotas", "Preco_Medio", "DY_Mensal_Perc"]:
-            if c in df_port.columns: df_port[c] = pd.to_numeric(df_port[c], errors='coerce').fillna(0.0)
+        df_cad = dfs["Carteira"]
     except:
-        df_port = pd.DataFrame(columns=get_portfolio_schema())
+        df_cad = pd.DataFrame(columns=get_cadastro_schema())
 
     # Carrega Histórico Transações
     try:
-        df_hist = conexoes.load_gsheet("Historico_Transacoes", get_transacoes_schema())
+        df_hist = dfs["Historico_Transacoes"]
     except:
         df_hist = pd.DataFrame(columns=get_transacoes_schema())
 
     # Carrega CDI (Caixinhas)
     try:
-        df_cdi = conexoes.load_gsheet("CDI_Caixinhas", get_cdi_schema())
-        if not df_cdi.empty:
-             df_cdi["Saldo_Atual"] = pd.to_numeric(df_cdi["Saldo_Atual"], errors='coerce').fillna(0.0)
+        df_cdi = dfs["CDI_Caixinhas"]
     except:
         # Cria a caixinha padrão se não existir
         df_cdi = pd.DataFrame([{"Nome_Caixa": "Reserva de Emergência", "Saldo_Atual": 0.0, "Ultima_Atualizacao": datetime.now().strftime("%Y-%m-%d")}])
-    
-    return df_port, df_hist, df_cdi
 
-def save_investments_data(df_port, df_hist, df_cdi):
+    return df_cad, df_hist, df_cdi
+
+def load_investments_data():
+    df_cad, df_hist, df_cdi = ler_investimentos()
+    return montar_carteira(df_cad, df_hist), df_hist, df_cdi
+
+def carteira_legada(df_cad):
+    """Carteira antiga: cotas e PM guardados na própria aba (ainda não migrada para o histórico)."""
+    return "Cotas" in df_cad.columns and not df_cad.empty
+
+def tickers_sem_cadastro(df_cad, df_hist):
+    """Ativos com posição no histórico que não têm linha na Carteira."""
+    cadastrados = set(df_cad["Ticker"].astype(str).str.strip()) if "Ticker" in df_cad.columns else set()
+    return [t for t in livro.posicoes(df_hist)["Ticker"] if t not in cadastrados]
+
+def inicio_migracao(df_hist):
+    """Data padrão das posições da Carteira antiga: a véspera do primeiro evento do histórico (ou hoje)."""
+    datas = pd.to_datetime(df_hist["Data"].astype(str), format="%Y-%m-%d", errors="coerce").dropna() if "Data" in df_hist.columns else pd.Series(dtype="datetime64[ns]")
+    if datas.empty:
+        return date.today()
+    return min((datas.min() - pd.Timedelta(days=1)).date(), date.today())
+
+def migrar_carteira(data_inicial):
+    """
+    Ação explícita (botão): relê Carteira e Historico_Transacoes direto da planilha (erro se
+    alguma leitura falhar), transforma as Cotas/Preco_Medio da Carteira antiga em eventos "Ajuste"
+    (as posições valem desde data_inicial), deixa só o cadastro na aba e cadastra os ativos do
+    histórico que faltam nela. Retorna (ajustes, cadastrados).
+    """
+    dfs = conexoes.load_gsheets_confirmado({
+        "Carteira": get_portfolio_schema(),
+        "Historico_Transacoes": get_transacoes_schema(),
+    })
+    df_cad, df_hist = dfs["Carteira"], dfs["Historico_Transacoes"]
+    cols_cad = get_cadastro_schema()
+
+    ajustes = []
+    if carteira_legada(df_cad):
+        df_cad = df_cad.copy()
+        if "Preco_Medio" not in df_cad.columns:
+            df_cad["Preco_Medio"] = 0.0
+        ajustes = livro.reconciliar(df_cad, df_hist, date.today(), data_inicial=data_inicial)
+        if ajustes:
+            df_ajustes = pd.DataFrame(ajustes, columns=get_transacoes_schema())
+            conexoes.append_rows("Historico_Transacoes", df_ajustes)
+            df_hist = pd.concat([df_hist, df_ajustes], ignore_index=True)
+        for c in cols_cad:
+            if c not in df_cad.columns:
+                df_cad[c] = 0.0 if c == "DY_Anual_Estimado" else ""
+        df_cad = df_cad[cols_cad]
+        conexoes.save_gsheet("Carteira", df_cad)
+
+    faltando = tickers_sem_cadastro(df_cad, df_hist)
+    if faltando:
+        conexoes.append_rows("Carteira", pd.DataFrame({"Ticker": faltando, "DY_Anual_Estimado": 0.0, "Segmento": ""}, columns=cols_cad))
+    return len(ajustes), len(faltando)
+
+def montar_carteira(df_cad, df_hist, ate=None):
+    """
+    Cadastro da Carteira com Cotas, Preco_Medio e Lucro_Realizado do fold do histórico (hoje ou na data).
+    Carteira antiga (não migrada): mostra as cotas/PM guardados nela, como antes.
+    """
+    if carteira_legada(df_cad):
+        df = df_cad.reindex(columns=get_portfolio_schema())
+        for c in ["Cotas", "Preco_Medio", "DY_Anual_Estimado"]:
+            df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0.0)
+        df["Lucro_Realizado"] = 0.0
+        return df
+    df = df_cad.reindex(columns=get_cadastro_schema())
+    pos = livro.posicoes(df_hist, ate=ate, incluir_zeradas=True).set_index("Ticker")
+    tickers = df["Ticker"].astype(str).str.strip()
+    df["Cotas"] = tickers.map(pos["Cotas"]).fillna(0.0)
+    df["Preco_Medio"] = tickers.map(pos["Preco_Medio"]).fillna(0.0)
+    df["Lucro_Realizado"] = tickers.map(pos["Lucro_Realizado"]).fillna(0.0)
+    df["DY_Anual_Estimado"] = pd.to_numeric(df["DY_Anual_Estimado"], errors="coerce").fillna(0.0)
+    return df[get_portfolio_schema() + ["Lucro_Realizado"]]
+
+def registrar_transacao(transacao, df_port=None, df_port_orig=None):
+    """
+    Compra/venda: anexa UMA linha ao Historico_Transacoes (a carteira sai do fold dele).
+    Com df_port/df_port_orig, salva junto o diff do cadastro (DY, Segmento, ativo novo).
+    """
+    try:
+        with st.spinner('Registrando transação...'):
+            conexoes.append_rows("Historico_Transacoes", pd.DataFrame([transacao], columns=get_transacoes_schema()))
+            if df_port is not None:
+                cols = get_cadastro_schema()
+                conexoes.save_gsheet_diff("Carteira", df_port_orig[cols], df_port[cols])
+        st.toast(f"{transacao['Tipo']} de {transacao['Ticker']} registrada!", icon="💰")
+        return True
+    except Exception as e:
+        st.error(f"Erro ao salvar: {e}")
+        return False
+
+def save_investments_data(df_port, df_hist, df_cdi, originais=None):
+    """
+    Com originais=(port, hist, cdi) do load, salva só o diff de cada aba.
+    Da Carteira vai só o cadastro: Cotas, Preco_Medio e as colunas calculadas não vão para a planilha.
+    """
+    abas = [
+        ("Carteira", df_port, get_cadastro_schema()),
+        ("Historico_Transacoes", df_hist, get_transacoes_schema()),
+        ("CDI_Caixinhas", df_cdi, get_cdi_schema()),
+    ]
     try:
         with st.spinner('Salvando dados de investimento...'):
-            conexoes.save_gsheet("Carteira", df_port)
-            conexoes.save_gsheet("Historico_Transacoes", df_hist)
-            conexoes.save_gsheet("CDI_Caixinhas", df_cdi)
+            for i, (aba, df, schema) in enumerate(abas):
+                df = df[[c for c in schema if c in df.columns]]
+                if originais is not None:
+                    df_orig = originais[i][[c for c in schema if c in originais[i].columns]]
+                    conexoes.save_gsheet_diff(aba, df_orig, df)
+                else:
+                    conexoes.save_gsheet(aba, df)
         st.toast("Investimentos atualizados!", icon="💰")
     except Exception as e:
         st.error(f"Erro ao salvar: {e}")
@@ -313,26 +510,13 @@ def load_data():
     
     # 1. Carrega usando seu módulo conexoes
     # Nota: Certifique-se de criar uma aba chamada "Financeiro" na sua planilha Life_OS_Database
+    # Os tipos (float nas colunas de valor) já vêm do registro em modules/schemas.py
     df = conexoes.load_gsheet("Financeiro", schema) 
     
-    # 2. Tratamento de Tipos (Casting)
-    # Como o save_gsheet converte tudo para string, precisamos converter de volta para float
-    if not df.empty:
-        # Colunas que são números
-        cols_float = [c for c in schema if c not in ["Data_Registro", "Outros_Desc"]]
-        
-        for col in cols_float:
-            if col in df.columns:
-                # 'coerce' transforma erros (textos vazios) em NaN, depois fillna(0.0)
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0)
-    
     return df
 
 def save_current_state():
-    # 1. Carrega histórico para não perder dados anteriores
-    df_antigo = load_data()
-    
-    # 2. Captura dados da Sessão Atual
+    # 1. Captura dados da Sessão Atual
     new_data = {
         "Data_Registro": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "Salario": st.session_state.get("sal_prin", 0.0),
@@ -360,18 +544,12 @@ def save_current_state():
         "Meta_Preco_Cota_FII": st.session_state.get("preco_cota", 0.0)
     }
     
-    # 3. Concatena e Salva
-    df_new_row = pd.DataFrame([new_data])
-    
-    # Se o df antigo estiver vazio, o novo é o principal, senão concatena
-    if df_antigo.empty:
-        df_final = df_new_row
-    else:
-        df_final = pd.concat([df_antigo, df_new_row], ignore_index=True)
+    # 2. Anexa só a linha nova (não precisa carregar o histórico)
+    df_new_row = pd.DataFrame([new_data], columns=get_financial_schema())
     
     try:
         with st.spinner('Salvando no Google Sheets...'):
-            conexoes.save_gsheet("Financeiro", df_final)
+            conexoes.append_rows("Financeiro", df_new_row)
         st.toast("Dados salvos com sucesso!", icon="✅")
     except Exception as e:
         st.error(f"Erro ao salvar: {e}")
@@ -681,7 +859,39 @@ def render_page():
 
     with tab_investimento:
         # Carrega dados
-        df_portfolio, df_historico, df_cdi = load_investments_data()
+        df_cadastro, df_historico, df_cdi = ler_investimentos()
+        df_portfolio = montar_carteira(df_cadastro, df_historico)
+        # Snapshot do load para os saves por diff
+        originais_invest = (df_portfolio.copy(), df_historico.copy(), df_cdi.copy())
+
+        # Carteira antiga / ativos sem cadastro: só mudam a planilha com confirmação
+        legada = carteira_legada(df_cadastro)
+        sem_cadastro = tickers_sem_cadastro(df_cadastro, df_historico) if not legada else []
+        if legada or sem_cadastro:
+            with st.container(border=True):
+                if legada:
+                    st.warning("A Carteira ainda guarda Qtd./PM. Migre para o histórico de transações virar a fonte da carteira (compras e vendas ficam bloqueadas até lá).")
+                else:
+                    st.warning(f"Ativos no histórico sem cadastro na Carteira: {', '.join(sem_cadastro)}")
+                with st.form("form_migrar_carteira"):
+                    padrao = inicio_migracao(df_historico)
+                    data_migracao = st.date_input(
+                        "Posições da Carteira valem desde", value=padrao, max_value=padrao,
+                        help="Data dos ajustes que criam as posições antigas no histórico (até a véspera do primeiro evento).",
+                        disabled=not legada,
+                    )
+                    confirmar = st.checkbox("Confirmo: gravar os ajustes no histórico e regravar a Carteira")
+                    if st.form_submit_button("🔁 Migrar Carteira"):
+                        if not confirmar:
+                            st.error("Marque a confirmação.")
+                        else:
+                            try:
+                                with st.spinner("Migrando carteira..."):
+                                    n_ajustes, n_cadastrados = migrar_carteira(data_migracao)
+                                st.toast(f"Carteira migrada: {n_ajustes} ajustes, {n_cadastrados} ativos cadastrados.", icon="🔁")
+                                st.rerun()
+                            except Exception as e:
+                                st.error(f"Migração cancelada (nada foi gravado se a leitura falhou): {e}")
         
         # Garante que a coluna nova exista se vier de um save antigo
         if "DY_Anual_Estimado" not in df_portfolio.columns:
@@ -713,11 +923,12 @@ def render_page():
             cobertura_custo = (renda_mensal_total / salario_atual) * 100
 
             # --- VISUALIZAÇÃO DOS KPI's ---
-            col_bi_1, col_bi_2, col_bi_3, col_bi_4 = st.columns(4)
+            col_bi_1, col_bi_2, col_bi_3, col_bi_4, col_bi_5 = st.columns(5)
             col_bi_1.metric("Renda Mensal (Estimada)", f"R$ {renda_mensal_total:.2f}", help="Baseada no DY Anual / 12")
             col_bi_2.metric("Renda Anual (Proj.)", f"R$ {renda_anual_proj:.2f}")
             col_bi_3.metric("Patrimônio FIIs", f"R$ {(df_portfolio['Cotas'] * df_portfolio['Preco_Medio']).sum():,.2f}")
             col_bi_4.metric("Liberdade Financeira", f"{cobertura_custo:.2f}%", help="% do seu salário coberto por FIIs")
+            col_bi_5.metric("Lucro Realizado", f"R$ {df_portfolio['Lucro_Realizado'].sum():,.2f}", help="Vendas (líquidas de taxas) menos o custo médio das cotas vendidas")
 
             # --- GRÁFICOS ---
             c_chart1, c_chart2 = st.columns([2, 1])
@@ -731,8 +942,9 @@ def render_page():
                         mapa_dy = dict(zip(df_portfolio["Ticker"], df_portfolio["DY_Anual_Estimado"]))
                         df_evolucao["DY_Ref_Anual"] = df_evolucao["Ticker"].map(mapa_dy).fillna(0)
                         
-                        # Transforma em mensal decimal para o gráfico
-                        df_evolucao["Renda_Adicionada"] = df_evolucao["Cotas"] * df_evolucao["Preco"] * ((df_evolucao["DY_Ref_Anual"]/100)/12)
+                        # Transforma em mensal decimal para o gráfico (venda tira renda; ajuste já vem com sinal)
+                        sinal = np.where(df_evolucao["Tipo"] == "Venda", -1, 1)
+                        df_evolucao["Renda_Adicionada"] = sinal * df_evolucao["Cotas"] * df_evolucao["Preco"] * ((df_evolucao["DY_Ref_Anual"]/100)/12)
                         
                         df_evolucao["Data"] = pd.to_datetime(df_evolucao["Data"])
                         df_evolucao = df_evolucao.sort_values("Data")
@@ -798,6 +1010,7 @@ def render_page():
         with col_rv_1:
             with st.container(border=True):
                 st.markdown("#### 📂 Carteira (Edite o DY Aqui)")
+                st.caption("Qtd., PM e lucro saem do histórico de transações: use o formulário ao lado para comprar ou vender.")
                 
                 # AQUI ESTAVA O ERRO DO SPRINTF.
                 # Mudamos o format para "%.2f" (número normal) e o título para "DY Anual (%)"
@@ -810,8 +1023,9 @@ def render_page():
                     key="editor_portfolio",
                     column_config={
                         "Ticker": st.column_config.TextColumn("Ativo", validate="^[A-Z0-9]+$"),
-                        "Cotas": st.column_config.NumberColumn("Qtd.", format="%d"),
-                        "Preco_Medio": st.column_config.NumberColumn("PM (R$)", format="R$ %.2f"),
+                        "Cotas": st.column_config.NumberColumn("Qtd.", format="%d", disabled=True),
+                        "Preco_Medio": st.column_config.NumberColumn("PM (R$)", format="R$ %.2f", disabled=True),
+                        "Lucro_Realizado": st.column_config.NumberColumn("Lucro Realizado", format="R$ %.2f", disabled=True),
                         
                         # CORREÇÃO CRÍTICA AQUI:
                         "DY_Anual_Estimado": st.column_config.NumberColumn(
@@ -832,10 +1046,11 @@ def render_page():
 
         with col_rv_2:
             with st.container(border=True):
-                st.markdown("#### 🛒 Nova Compra")
+                st.markdown("#### 🛒 Compra / Venda")
                 
                 with st.form("form_compra_fii"):
-                    lista_tickers = edited_portfolio["Ticker"].unique().tolist() if not edited_portfolio.empty else []
+                    tipo_operacao = st.radio("Operação", options=["Compra", "Venda"], horizontal=True)
+                    lista_tickers = edited_portfolio["Ticker"].dropna().unique().tolist() if not edited_portfolio.empty else []
                     ticker_input = st.selectbox("Ativo", options=lista_tickers + ["NOVO..."])
                     
                     if ticker_input == "NOVO...":
@@ -855,54 +1070,61 @@ def render_page():
                     # Adicionei input de DY na compra para já cadastrar certo se for novo
                     dy_compra_input = st.number_input("DY Anual Atual (%)", value=10.0, step=0.5, help="Ex: 12.0")
 
-                    if st.form_submit_button("Confirmar", type="primary"):
+                    if st.form_submit_button("Confirmar", type="primary", disabled=legada):
+                        # Venda (mesmo retroativa) não pode deixar a posição negativa em nenhuma data
+                        cotas_livres = livro.cotas_disponiveis(df_historico, ativo_final, data_compra) if ativo_final else 0.0
                         if not ativo_final:
                             st.error("Defina o Ticker")
+                        elif tipo_operacao == "Venda" and qtd_compra > cotas_livres + 1e-9:
+                            st.error(f"Em {data_compra.strftime('%d/%m/%Y')} dá para vender no máximo {cotas_livres:g} cotas de {ativo_final} (sem deixar a posição negativa depois).")
                         else:
-                            # 1. Histórico
-                            nova_transacao = {
-                                "Data": data_compra.strftime("%Y-%m-%d"),
-                                "Ticker": ativo_final,
-                                "Tipo": "Compra",
-                                "Cotas": qtd_compra,
-                                "Preco": preco_compra,
-                                "Total": (qtd_compra * preco_compra) + taxas
-                            }
-                            df_historico = pd.concat([df_historico, pd.DataFrame([nova_transacao])], ignore_index=True)
+                            # 1. Histórico: uma linha nova (cotas, PM e lucro saem do fold)
+                            nova_transacao = livro.evento(data_compra, ativo_final, tipo_operacao, qtd_compra, preco_compra, taxas)
 
-                            # 2. Atualizar PM e DY na Carteira
+                            # 2. Cadastro: DY informado (e o ativo, se for novo)
                             if ativo_final in edited_portfolio["Ticker"].values:
                                 idx = edited_portfolio.index[edited_portfolio["Ticker"] == ativo_final][0]
-                                cotas_antigas = edited_portfolio.at[idx, "Cotas"]
-                                pm_antigo = edited_portfolio.at[idx, "Preco_Medio"]
-                                nova_qtd = cotas_antigas + qtd_compra
-                                novo_pm = ((cotas_antigas * pm_antigo) + (qtd_compra * preco_compra)) / nova_qtd
-                                
-                                edited_portfolio.at[idx, "Cotas"] = nova_qtd
-                                edited_portfolio.at[idx, "Preco_Medio"] = novo_pm
-                                # Atualiza o DY também com o valor informado na compra (opcional, mas bom pra manter atualizado)
-                                edited_portfolio.at[idx, "DY_Anual_Estimado"] = dy_compra_input
+                                if tipo_operacao == "Compra":
+                                    edited_portfolio.at[idx, "DY_Anual_Estimado"] = dy_compra_input
                             else:
-                                novo_ativo = {
-                                    "Ticker": ativo_final, 
-                                    "Cotas": qtd_compra, 
-                                    "Preco_Medio": preco_compra, 
-                                    "DY_Anual_Estimado": dy_compra_input, 
-                                    "Segmento": "Papel"
-                                }
+                                novo_ativo = {"Ticker": ativo_final, "DY_Anual_Estimado": dy_compra_input, "Segmento": "Papel"}
                                 edited_portfolio = pd.concat([edited_portfolio, pd.DataFrame([novo_ativo])], ignore_index=True)
-                            
-                            # Salva limpando colunas calculadas
-                            cols_to_save = ["Ticker", "Cotas", "Preco_Medio", "DY_Anual_Estimado", "Segmento"]
-                            save_investments_data(edited_portfolio[cols_to_save], df_historico, df_cdi)
-                            st.rerun()
+
+                            if registrar_transacao(nova_transacao, edited_portfolio, originais_invest[0]):
+                                st.rerun()
+
+        # --- CARTEIRA NUMA DATA (fold do histórico até o dia) ---
+        with st.expander("🕰️ Carteira em uma data", expanded=False):
+            data_posicao = st.date_input("Posição no fim do dia", value=datetime.now(), key="data_posicao_carteira")
+            df_na_data = montar_carteira(df_cadastro, df_historico, ate=data_posicao)
+            df_na_data = df_na_data[(df_na_data["Cotas"] > 0) | (df_na_data["Lucro_Realizado"] != 0)]
+            if legada:
+                st.info("Disponível depois de migrar a Carteira para o histórico.")
+            elif df_na_data.empty:
+                st.info("Nenhuma posição nessa data.")
+            else:
+                df_na_data["Custo_Total"] = df_na_data["Cotas"] * df_na_data["Preco_Medio"]
+                c_pos1, c_pos2 = st.columns(2)
+                c_pos1.metric("Custo da Carteira", f"R$ {df_na_data['Custo_Total'].sum():,.2f}")
+                c_pos2.metric("Lucro Realizado até a data", f"R$ {df_na_data['Lucro_Realizado'].sum():,.2f}")
+                st.dataframe(
+                    df_na_data[["Ticker", "Cotas", "Preco_Medio", "Custo_Total", "Lucro_Realizado"]],
+                    width='stretch', hide_index=True,
+                    column_config={
+                        "Cotas": st.column_config.NumberColumn("Qtd.", format="%g"),
+                        "Preco_Medio": st.column_config.NumberColumn("PM (R$)", format="R$ %.2f"),
+                        "Custo_Total": st.column_config.NumberColumn("Custo", format="R$ %.2f"),
+                        "Lucro_Realizado": st.column_config.NumberColumn("Lucro Realizado", format="R$ %.2f"),
+                    }
+                )
 
         st.divider()
 
         # ==========================================
         # SEÇÃO 3: RENDA FIXA (CDI) - MANTIDA IGUAL
         # ==========================================
-        st.markdown('<p class="main-header">Renda Fixa (Caixinhas CDI 1%)</p>', unsafe_allow_html=True)
+        cdi_mes, mes_cdi = mercado.ultima_taxa("CDI")
+        st.markdown(f'<p class="main-header">Renda Fixa (Caixinhas CDI {cdi_mes:.2%} a.m.)</p>', unsafe_allow_html=True)
         col_cdi_1, col_cdi_2 = st.columns([2, 1], gap="large")
 
         with col_cdi_1:
@@ -932,15 +1154,16 @@ def render_page():
                             if not df_cdi_editado.empty and caixa_sel:
                                 idx = df_cdi_editado.index[df_cdi_editado["Nome_Caixa"] == caixa_sel][0]
                                 df_cdi_editado.at[idx, "Saldo_Atual"] += valor_aporte
-                                save_investments_data(edited_portfolio, df_historico, df_cdi_editado)
+                                save_investments_data(edited_portfolio, df_historico, df_cdi_editado, originais=originais_invest)
                                 st.rerun()
                 
                 with st.expander("📈 Virar o Mês (Juros)", expanded=False):
-                    st.warning("Isso aplicará 1% em todas as caixas.")
-                    if st.button("Aplicar 1% Agora"):
-                        df_cdi_editado["Saldo_Atual"] = df_cdi_editado["Saldo_Atual"] * 1.01
+                    ref_cdi = mes_cdi.strftime("%m/%Y") if mes_cdi is not None else "padrão"
+                    st.warning(f"Isso aplicará o CDI do último mês publicado ({cdi_mes:.2%}, {ref_cdi}) em todas as caixas.")
+                    if st.button(f"Aplicar {cdi_mes:.2%} Agora"):
+                        df_cdi_editado["Saldo_Atual"] = df_cdi_editado["Saldo_Atual"] * (1 + cdi_mes)
                         df_cdi_editado["Ultima_Atualizacao"] = datetime.now().strftime("%Y-%m-%d")
-                        save_investments_data(edited_portfolio, df_historico, df_cdi_editado)
+                        save_investments_data(edited_portfolio, df_historico, df_cdi_editado, originais=originais_invest)
                         st.success("Juros Aplicados!")
                         time.sleep(1)
                         st.rerun()
@@ -1151,6 +1374,11 @@ def render_page():
             with st.container(border=True):
                 st.markdown('<p class="main-header">Parâmetros Futuros</p>', unsafe_allow_html=True)
                 teto_cdi = st.number_input("Meta Teto Reserva (R$)", value=20000.0, step=1000.0)
+                horizonte = st.select_slider("Horizonte (meses)", options=[12, 24, 60, 120, 240, 360], value=12)
+                monte_carlo = st.toggle("🎲 Modo Monte Carlo", help="Sorteia CDI, IPCA, DY e reajustes de salário em milhares de cenários")
+                if monte_carlo:
+                    n_cenarios = st.select_slider("Cenários", options=[10000, 20000, 50000, 100000], value=20000)
+                    valores_reais = st.toggle("Em valores de hoje (desconta IPCA)")
                 
                 st.divider()
                 st.markdown("#### 🔮 Simulador")
@@ -1168,17 +1396,17 @@ def render_page():
         df_proj = projetar_futuro(
             df_parcelas, df_finan, salario, div_atual, saldo_cdi_atual, 
             pesos, dy_medio_mensal, teto_cdi, 
-            dados_simulacao, CONFIG_FECHAMENTOS
+            dados_simulacao, CONFIG_FECHAMENTOS, horizonte=horizonte
         )
 
         # --- DIREITA: PROJEÇÃO EVOLUTIVA ---
         with col_fut2:
-            # Pega o último mês (Mês 12) para ver o resultado do efeito bola de neve
+            # Pega o último mês do horizonte para ver o resultado do efeito bola de neve
             mes_12 = df_proj.iloc[-1]
             crescimento_renda = mes_12["Dividendos Proj."] - div_atual
             
             with st.container(border=True):
-                st.markdown(f"#### 🚀 Resultado em 12 Meses ({mes_12['Mês']})")
+                st.markdown(f"#### 🚀 Resultado em {horizonte} Meses ({mes_12['Mês']})")
                 k1, k2, k3, k4 = st.columns(4)
                 
                 k1.metric("Novo Dividendo", f"R$ {mes_12['Dividendos Proj.']:,.2f}", delta=f"+R$ {crescimento_renda:.2f}")
@@ -1233,6 +1461,15 @@ def render_page():
                     }
                 )
 
+        if monte_carlo:
+            with col_fut2:
+                patrimonio_fii = (df_portfolio["Cotas"] * df_portfolio["Preco_Medio"]).sum() if not df_portfolio.empty else 0.0
+                gastos_cartao, gastos_finan = gastos_projetados(df_parcelas, df_finan, horizonte, dados_simulacao, CONFIG_FECHAMENTOS)
+                render_monte_carlo(
+                    salario, div_atual, patrimonio_fii, saldo_cdi_atual, pesos, dy_medio_mensal, teto_cdi,
+                    gastos_cartao + gastos_finan, n_cenarios, reais=valores_reais,
+                )
+
     with tab_financiamento:
         df_finan = load_financiamentos_data()
 
@@ -1395,21 +1632,13 @@ def render_page():
                 with st.container(border=True):
                     st.subheader("📊 Investimentos", divider="gray")
 
-                    @st.cache_data(ttl=86400) # Cache de 24h
-                    def get_ipca_recente():
-                        url = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.433/dados/ultimos/12?formato=json"
-                        response = requests.get(url)
-                        data = response.json()
-                        df_ipca = pd.DataFrame(data)
-                        # i_mensal = valor / 100
-                        return pd.to_numeric(df_ipca['valor']).mean() / 100
-                    
                     # Cálculos
                     aporte_financeiro = salario * pesos["FIIs"]
                     num_cotas = int(aporte_financeiro / custo_pacote)
                     dividendos_estimados = (media_dy / 12) * (num_cotas * custo_pacote)
 
-                    i = get_ipca_recente()
+                    # IPCA médio dos últimos 12 meses (histórico local do BCB)
+                    i = mercado.taxa_media("IPCA", 12)
 
                     dividendos_necessarios_inflacao = (i / (1 + i))*salario
                     compra_ideal_inflac = dividendos_necessarios_inflacao / (media_dy/12)
@@ -1464,17 +1693,8 @@ def render_page():
                         st.write(f"Tempo: **{meses_totais:.0f} meses**")
 
         with desvalorizacao:
-                @st.cache_data(ttl=86400) # Cache de 24h
-                def get_ipca_recente():
-                    url = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.433/dados/ultimos/12?formato=json"
-                    response = requests.get(url)
-                    data = response.json()
-                    df_ipca = pd.DataFrame(data)
-                    # i_mensal = valor / 100
-                    return pd.to_numeric(df_ipca['valor']).mean() / 100
-
                 # Cálculos de Engenharia Financeira
-                i_mensal_real = get_ipca_recente()
+                i_mensal_real = mercado.taxa_media("IPCA", 12)
                 data_final = datetime(2027, 9, 1)
                 meses_faltantes = (data_final.year - datetime.today().year) * 12 + (data_final.month - datetime.today().month)
                 fator_acumulado = (1 + i_mensal_real)**meses_faltantes
@@ -1529,67 +1749,29 @@ def render_page():
                         else:
                             st.success("✅ Plano de proteção sustentável dentro da renda atual.")
 
+        # Parâmetros de Entrada (Projeção Detalhada e Varredura)
+        taxa_aumento_salarial = 0.05  # 5% a.a.
+        yield_fiis_mensal = media_dy / 12
+        yield_cdi_mensal = mercado.taxa_media("CDI", 12) # 100% CDI (média 12m, histórico BCB)
+
         with st.expander("📅 Projeção Detalhada (Otimizada) - 60 Meses", expanded=False):
-            # Parâmetros de Entrada
-            taxa_aumento_salarial = 0.05  # 5% a.a.
-            yield_fiis_mensal = media_dy / 12
-            yield_cdi_mensal = 0.0085 # ~0.85% a.m. (100% CDI Liq)
-            
-            # Inicialização de Estado
-            proj_dados = []
-            salario_corrente = salario
-            saldo_fiis = 0.0
-            saldo_reserva = 0.0
-            dividendos_anterior = 0.0
-            
-            # Loop de Simulação Discreta
-            for mes in range(1, 61):
-                # 1. Reajuste Salarial Anual (Step Function)
-                if mes > 1 and (mes - 1) % 12 == 0:
-                    salario_corrente *= (1 + taxa_aumento_salarial)
-                    
-                # 2. Logic Gate: Saturação da Reserva
-                target_reserva = salario_corrente * 6
-                
-                if saldo_reserva >= target_reserva:
-                    # Redirecionamento de Fluxo (CDI -> FIIs)
-                    alocacao_fiis = pesos["FIIs"] + pesos["CDI"]
-                    alocacao_cdi = 0.0
-                    status_reserva = "Otimizada (Full)"
-                else:
-                    # Acumulação Padrão
-                    alocacao_fiis = pesos["FIIs"]
-                    alocacao_cdi = pesos["CDI"]
-                    status_reserva = "Em Construção"
-
-                # 3. Execução dos Aportes
-                aporte_fiis = (salario_corrente * alocacao_fiis) + dividendos_anterior
-                aporte_reserva = salario_corrente * alocacao_cdi
-                
-                # 4. Evolução Patrimonial (Juros Compostos)
-                saldo_fiis += aporte_fiis
-                # Reserva rende mesmo se aporte for zero
-                saldo_reserva = (saldo_reserva + aporte_reserva) * (1 + yield_cdi_mensal)
-                
-                # 5. Output de Renda Passiva (Para o próximo ciclo)
-                dividendos_anterior = saldo_fiis * yield_fiis_mensal
-                
-                # 6. Gastos Operacionais (Indexados ao salário)
-                gastos = {k: salario_corrente * v for k, v in pesos.items() if k not in ["FIIs", "CDI"]}
-
-                proj_dados.append({
-                    "Mês": mes,
-                    "Salário Base": salario_corrente,
-                    "Status Reserva": status_reserva,
-                    "Aporte FIIs (+Div)": aporte_fiis,
-                    "Patrimônio FIIs": saldo_fiis,
-                    "Renda Passiva": dividendos_anterior,
-                    "Saldo Reserva": saldo_reserva,
-                    "Renda Total (Sal+Div)": salario_corrente + dividendos_anterior
-                })
+            # Mesma simulação da varredura, com uma alocação só (reserva cheia -> CDI vai para FIIs)
+            proj = simulacao.projetar_alocacoes(
+                salario, pesos["FIIs"], pesos["CDI"], yield_fiis_mensal, yield_cdi_mensal,
+                meses=60, reajuste_anual=taxa_aumento_salarial,
+            )
 
             # Renderização
-            df_proj = pd.DataFrame(proj_dados)
+            df_proj = pd.DataFrame({
+                "Mês": np.arange(1, 61),
+                "Salário Base": proj["Salário"],
+                "Status Reserva": np.where(proj["Reserva Cheia"][:, 0], "Otimizada (Full)", "Em Construção"),
+                "Aporte FIIs (+Div)": proj["Aporte FIIs (+Div)"][:, 0],
+                "Patrimônio FIIs": proj["Patrimônio FIIs"][:, 0],
+                "Renda Passiva": proj["Renda Passiva"][:, 0],
+                "Saldo Reserva": proj["Saldo Reserva"][:, 0],
+                "Renda Total (Sal+Div)": proj["Salário"] + proj["Renda Passiva"][:, 0],
+            })
             
             tabs = st.tabs([f"Ano {i+1}" for i in range(5)])
             cols_visualizacao = ["Mês", "Salário Base", "Status Reserva", "Aporte FIIs (+Div)", "Patrimônio FIIs", "Renda Passiva", "Saldo Reserva"]
@@ -1611,5 +1793,85 @@ def render_page():
                         hide_index=True
                     )
 
+        with st.expander("🧮 Varredura de Alocações (FIIs x CDI x Estilo de Vida)", expanded=False):
+            st.caption("Todas as combinações de pesos simuladas num lote só, com as premissas da Projeção Detalhada (60 meses).")
+            cv1, cv2 = st.columns(2)
+            passo = cv1.select_slider("Passo da grade", options=[0.10, 0.05, 0.02, 0.01], value=0.05, format_func=lambda p: f"{p:.0%}")
+            estilo_atual = int(round((1 - pesos["FIIs"] - pesos["CDI"]) * 100))
+            estilo_minimo = cv2.slider("Estilo de vida mínimo (%)", 0, 100, estilo_atual, step=5) / 100
+
+            df_varredura = simulacao.varrer_pesos(
+                salario, yield_fiis_mensal, yield_cdi_mensal, passo=passo, estilo_minimo=estilo_minimo,
+                reajuste_anual=taxa_aumento_salarial,
+            )
+            renda_atual = proj["Renda Passiva"][-1, 0]
+            mes_atual = proj["Mês Reserva"][0]
+
+            col_heat, col_pareto = st.columns(2)
+            with col_heat:
+                st.markdown("##### 🌡️ Renda Passiva no Mês 60")
+                heatmap = alt.Chart(df_varredura).mark_rect().encode(
+                    x=alt.X('FIIs:O', axis=alt.Axis(format='%')),
+                    y=alt.Y('CDI:O', sort='descending', axis=alt.Axis(format='%')),
+                    color=alt.Color('Renda Passiva:Q', scale=alt.Scale(scheme='greens')),
+                    tooltip=[
+                        alt.Tooltip('FIIs', format='.0%'), alt.Tooltip('CDI', format='.0%'),
+                        alt.Tooltip('Estilo de Vida', format='.0%'), alt.Tooltip('Renda Passiva', format=',.2f'),
+                        'Mês Reserva',
+                    ],
+                )
+                st.altair_chart(heatmap, width='stretch')
+
+            with col_pareto:
+                st.markdown("##### 🎯 Fronteira: Renda x Mês da Reserva")
+                pontos = alt.Chart(df_varredura).mark_circle(color='#B0BEC5', opacity=0.5).encode(
+                    x=alt.X('Mês Reserva:Q', title='Mês em que a reserva completa'),
+                    y=alt.Y('Renda Passiva:Q', title='Renda Passiva no Mês 60 (R$)'),
+                    tooltip=[alt.Tooltip('FIIs', format='.0%'), alt.Tooltip('CDI', format='.0%'), alt.Tooltip('Renda Passiva', format=',.2f'), 'Mês Reserva'],
+                )
+                fronteira = alt.Chart(df_varredura[df_varredura["Pareto"]]).mark_line(color='#2E7D32', point=True).encode(
+                    x='Mês Reserva:Q', y='Renda Passiva:Q',
+                    tooltip=[alt.Tooltip('FIIs', format='.0%'), alt.Tooltip('CDI', format='.0%'), alt.Tooltip('Renda Passiva', format=',.2f'), 'Mês Reserva'],
+                )
+                atual = alt.Chart(pd.DataFrame({"Mês Reserva": [mes_atual], "Renda Passiva": [renda_atual]})).mark_point(
+                    color='red', size=120, shape='diamond', filled=True
+                ).encode(x='Mês Reserva:Q', y='Renda Passiva:Q')
+                st.altair_chart(pontos + fronteira + atual, width='stretch')
+                st.caption("♦ vermelho: pesos atuais. Alocações que não completam a reserva em 60 meses ficam fora do gráfico.")
+
+            st.markdown("##### 🏆 Melhores Alocações (fronteira, por renda)")
+            ranking = df_varredura[df_varredura["Pareto"]].sort_values("Renda Passiva", ascending=False).head(10)
+            ranking = ranking.assign(**{"Δ Renda vs Atual": ranking["Renda Passiva"] - renda_atual})
+            st.dataframe(
+                ranking[["FIIs", "CDI", "Estilo de Vida", "Renda Passiva", "Δ Renda vs Atual", "Patrimônio FIIs", "Mês Reserva"]].style.format({
+                    "FIIs": "{:.0%}", "CDI": "{:.0%}", "Estilo de Vida": "{:.0%}",
+                    "Renda Passiva": "R$ {:,.2f}", "Δ Renda vs Atual": "R$ {:+,.2f}",
+                    "Patrimônio FIIs": "R$ {:,.2f}", "Mês Reserva": "{:.0f}",
+                }, na_rep="—"),
+                width='stretch',
+                hide_index=True
+            )
+
+        with st.expander("🤖 Otimizador de Alocação (Renda x Reserva x Lazer)", expanded=False):
+            st.caption(
+                "Maximiza a renda passiva mediana no mês 60 com a reserva de 6 salários completa até o mês limite "
+                "(na confiança pedida) e o Lazer acima do mínimo. Casa, Carro e Vida ficam como estão."
+            )
+            co1, co2, co3, co4 = st.columns(4)
+            mes_limite = co1.slider("Reserva completa até o mês", 6, 60, 24)
+            lazer_minimo = co2.slider("Lazer mínimo (%)", 0, 50, int(round(pesos["Lazer"] * 100))) / 100
+            confianca = co3.slider("Confiança (%)", 50, 99, 90) / 100
+            n_cenarios_ot = co4.select_slider("Cenários", options=[500, 1000, 2000, 5000], value=otimizador.CENARIOS_PADRAO)
+
+            op = st.session_state.get("otimizacao")
+            if st.button("🚀 Otimizar", type="primary", disabled=op is not None and op.rodando):
+                st.session_state["otimizacao"] = otimizador.Otimizacao(
+                    salario, yield_fiis_mensal, mercado.parametros_ar1("CDI"), mercado.ultima_taxa("CDI")[0],
+                    fixos=pesos["Casa"] + pesos["Carro"] + pesos["Vida"], lazer_minimo=lazer_minimo,
+                    mes_limite=mes_limite, confianca=confianca, reajuste_anual=taxa_aumento_salarial,
+                    n_cenarios=n_cenarios_ot,
+                ).iniciar()
+            render_otimizacao(pesos)
+
 if __name__ == "__main__":
     render_page()
\ No newline at end of file
@@ -12,11 +12,6 @@ def load_data():
     ]
     df = conexoes.load_gsheet("Hobbies", cols)
     
-    if not df.empty:
-        # Saneamento técnico para os componentes visuais
-        df["ID"] = pd.to_numeric(df["ID"], errors='coerce').fillna(0).astype(int)
-        df["Progresso_Perc"] = pd.to_numeric(df["Progresso_Perc"], errors='coerce').fillna(0).astype(int)
-        
     return df
 
 def save_data(df):
@@ -8,10 +8,8 @@ from modules.linear_model_project import fazer_analise_com_modelo_linear
 
 def load_data():
     cols = ["Titulo", "Autor", "Total_Paginas", "Paginas_Lidas", "Nota", "Status"]
+    # Total_Paginas/Paginas_Lidas já vêm como int pelo registro de tipos
     df = conexoes.load_gsheet("Leituras", cols)
-    if not df.empty:
-        df["Total_Paginas"] = pd.to_numeric(df["Total_Paginas"], errors='coerce').fillna(1).astype(int)
-        df["Paginas_Lidas"] = pd.to_numeric(df["Paginas_Lidas"], errors='coerce').fillna(0).astype(int)
     return df
 
 def render_page():
@@ -33,7 +31,6 @@ def render_page():
     
     # Filtra logs de leitura do mês atual
     df_mes = df_log[(df_log['Tipo'] == "Leitura") & (df_log['Data'] >= primeiro_dia_mes)].copy()
-    df_mes['Valor'] = pd.to_numeric(df_mes['Valor'], errors='coerce').fillna(0)
     
     # Cálculo de métricas realistas
     total_lido_mes = df_mes['Valor'].sum()
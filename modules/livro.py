@@ -0,0 +1,184 @@
+import pandas as pd
+import numpy as np
+import threading
+
+# --- LIVRO DE TRANSAÇÕES (EVENT SOURCING DA CARTEIRA) ---
+# Historico_Transacoes é a fonte da verdade: cotas, preço médio e lucro realizado de cada ativo
+# saem de um fold dos eventos em ordem de data (empates na ordem da planilha).
+#   Compra: cotas += q; custo += Total (com taxas)
+#   Venda:  baixa = PM * q; cotas -= q; custo -= baixa; realizado += Total (líquido) - baixa
+#   Ajuste: cotas += q; custo += Total (migração/correção; pode ser negativo)
+# O estado é guardado a cada INTERVALO_SNAPSHOT eventos junto com o hash de cada evento.
+# Na próxima consulta só os eventos depois do último trecho igual são dobrados de novo:
+# um append custa O(eventos novos), e uma compra retroativa refaz só a partir da data dela.
+# A carteira numa data qualquer parte do snapshot anterior mais próximo.
+
+COLUNAS_EVENTO = ["Data", "Ticker", "Tipo", "Cotas", "Preco", "Total"]
+TIPOS = ("Compra", "Venda", "Ajuste")
+
+INTERVALO_SNAPSHOT = 64
+
+_lock = threading.Lock()
+_hashes = np.array([], dtype=np.uint64)  # hash de cada evento já dobrado (ordem cronológica)
+_snapshots = {0: {}}  # nº de eventos dobrados -> {ticker: (cotas, custo, realizado)}
+_stats = {"consultas": 0, "eventos_dobrados": 0, "eventos_reaproveitados": 0}
+
+def get_stats():
+    """Quantos eventos foram dobrados de fato e quantos vieram de snapshots."""
+    with _lock:
+        return dict(_stats, snapshots=len(_snapshots))
+
+def evento(data, ticker, tipo, cotas, preco, taxas=0.0):
+    """Linha nova do Historico_Transacoes. Total = valor com taxas (compra) ou líquido (venda)."""
+    bruto = cotas * preco
+    return {
+        "Data": pd.Timestamp(data).strftime("%Y-%m-%d"),
+        "Ticker": ticker,
+        "Tipo": tipo,
+        "Cotas": cotas,
+        "Preco": preco,
+        "Total": bruto - taxas if tipo == "Venda" else bruto + taxas,
+    }
+
+# --- FOLD ---
+def _eventos(df_hist):
+    """Eventos válidos em ordem cronológica, como arrays, com o hash de cada um."""
+    df = df_hist.reindex(columns=COLUNAS_EVENTO)
+    datas = pd.to_datetime(df["Data"].astype(str), format="%Y-%m-%d", errors="coerce")
+    df = df.assign(_data=datas)[datas.notna() & df["Tipo"].isin(TIPOS)]
+    df = df.sort_values("_data", kind="stable")
+
+    cotas = pd.to_numeric(df["Cotas"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    precos = pd.to_numeric(df["Preco"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    totais = pd.to_numeric(df["Total"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    tipos = df["Tipo"].to_numpy()
+    # Linhas antigas sem Total: vale cotas x preço (ajuste usa o Total como veio)
+    totais = np.where((tipos != "Ajuste") & (totais <= 0), cotas * precos, totais)
+    return {
+        "datas": df["_data"].to_numpy(),
+        "tickers": df["Ticker"].astype(str).str.strip().to_numpy(),
+        "tipos": tipos,
+        "cotas": cotas,
+        "totais": totais,
+        "hashes": pd.util.hash_pandas_object(df[COLUNAS_EVENTO].astype(str), index=False).to_numpy(),
+    }
+
+def _dobrar(estado, ev, inicio, fim, snapshots=None):
+    tickers, tipos, cotas, totais = ev["tickers"], ev["tipos"], ev["cotas"], ev["totais"]
+    for i in range(inicio, fim):
+        qtd, custo, realizado = estado.get(tickers[i], (0.0, 0.0, 0.0))
+        if tipos[i] == "Venda":
+            if cotas[i] > qtd + 1e-9:
+                data = pd.Timestamp(ev["datas"][i]).strftime("%Y-%m-%d")
+                print(f"⚠️ Venda de {cotas[i]:g} {tickers[i]} em {data} passa da posição ({qtd:g}): o histórico está inconsistente.")
+            baixa = (custo / qtd if qtd > 0 else 0.0) * cotas[i]
+            qtd, custo, realizado = qtd - cotas[i], custo - baixa, realizado + totais[i] - baixa
+            if qtd <= 1e-9:
+                qtd, custo = 0.0, 0.0  # posição zerada
+        else:
+            qtd, custo = qtd + cotas[i], custo + totais[i]
+        estado[tickers[i]] = (qtd, custo, realizado)
+        if snapshots is not None and (i + 1) % INTERVALO_SNAPSHOT == 0:
+            snapshots[i + 1] = dict(estado)
+    return estado
+
+def _estado(df_hist, ate=None):
+    global _hashes, _snapshots
+    ev = _eventos(df_hist)
+    n = len(ev["hashes"])
+    with _lock:
+        _stats["consultas"] += 1
+        # Trecho inicial igual ao que já foi dobrado: os snapshots dentro dele continuam valendo
+        m = min(n, len(_hashes))
+        diferentes = np.flatnonzero(ev["hashes"][:m] != _hashes[:m])
+        iguais = int(diferentes[0]) if len(diferentes) else m
+        _snapshots = {k: v for k, v in _snapshots.items() if k <= iguais}
+
+        base = max(_snapshots)
+        estado = _dobrar(dict(_snapshots[base]), ev, base, n, _snapshots)
+        # Fica o estado final (para o próximo append) e os periódicos
+        _snapshots = {k: v for k, v in _snapshots.items() if k % INTERVALO_SNAPSHOT == 0}
+        _snapshots[n] = estado
+        _hashes = ev["hashes"]
+        _stats["eventos_dobrados"] += n - base
+        _stats["eventos_reaproveitados"] += base
+
+        if ate is None:
+            return dict(estado)
+        # Carteira numa data: eventos até o fim do dia, a partir do snapshot anterior
+        corte = int(np.searchsorted(ev["datas"], np.datetime64(pd.Timestamp(ate).normalize()), side="right"))
+        base = max(k for k in _snapshots if k <= corte)
+        snapshot = dict(_snapshots[base])
+    return _dobrar(snapshot, ev, base, corte)
+
+def posicoes(df_hist, ate=None, incluir_zeradas=False):
+    """
+    Carteira derivada do histórico (hoje ou na data `ate`): Ticker, Cotas, Preco_Medio,
+    Custo_Total e Lucro_Realizado. Zeradas só entram com incluir_zeradas (o lucro delas fica).
+    """
+    estado = _estado(df_hist, ate)
+    df = pd.DataFrame(
+        [(t, q, c, r) for t, (q, c, r) in estado.items()],
+        columns=["Ticker", "Cotas", "Custo_Total", "Lucro_Realizado"],
+    )
+    df["Preco_Medio"] = np.where(df["Cotas"] > 0, df["Custo_Total"] / df["Cotas"].where(df["Cotas"] > 0, 1.0), 0.0)
+    if not incluir_zeradas:
+        df = df[df["Cotas"] > 1e-9]
+    return df[["Ticker", "Cotas", "Preco_Medio", "Custo_Total", "Lucro_Realizado"]].reset_index(drop=True)
+
+def cotas_disponiveis(df_hist, ticker, data):
+    """
+    Quanto do ativo dá para vender na data: a menor posição entre o fim desse dia e
+    todos os eventos depois dele (uma venda retroativa não pode deixar nenhuma data negativa).
+    """
+    ev = _eventos(df_hist)
+    doativo = ev["tickers"] == str(ticker).strip()
+    sinal = np.where(ev["tipos"][doativo] == "Venda", -1.0, 1.0)
+    posicao = np.cumsum(sinal * ev["cotas"][doativo])
+    corte = int(np.searchsorted(ev["datas"][doativo], np.datetime64(pd.Timestamp(data).normalize()), side="right"))
+    na_data = posicao[corte - 1] if corte > 0 else 0.0
+    return float(max(min(na_data, posicao[corte:].min(initial=na_data)), 0.0))
+
+def reconciliar(df_carteira, df_hist, data, data_inicial=None):
+    """
+    Eventos "Ajuste" que levam o livro até as Cotas/Preco_Medio de uma carteira guardada à
+    parte (migração da Carteira antiga). As cotas que faltam no livro entram em `data_inicial`
+    (antes do primeiro evento: a posição antiga existe no passado e vendas retroativas dela
+    passam); reduções e a diferença de custo que sobrar entram em `data`. Ativos do livro
+    que não estão na carteira vão para zero.
+    """
+    data_inicial = data if data_inicial is None else data_inicial
+    cotas_alvo = pd.to_numeric(df_carteira["Cotas"], errors="coerce").fillna(0.0)
+    alvo = pd.DataFrame({
+        "Ticker": df_carteira["Ticker"].astype(str).str.strip(),
+        "Cotas": cotas_alvo,
+        "Custo": cotas_alvo * pd.to_numeric(df_carteira["Preco_Medio"], errors="coerce").fillna(0.0),
+    })
+    alvo = alvo[alvo["Ticker"] != ""].groupby("Ticker")[["Cotas", "Custo"]].sum()
+
+    def _ajuste(dia, ticker, cotas, custo):
+        return {
+            "Data": pd.Timestamp(dia).strftime("%Y-%m-%d"), "Ticker": ticker, "Tipo": "Ajuste",
+            "Cotas": round(float(cotas), 6), "Preco": round(float(custo / cotas), 6) if cotas else 0.0,
+            "Total": round(float(custo), 6),
+        }
+
+    # 1. Cotas que faltam, no início (custo pelo PM da carteira)
+    livro = posicoes(df_hist).set_index("Ticker")
+    iniciais = []
+    for ticker in alvo.index:
+        falta = alvo.at[ticker, "Cotas"] - livro["Cotas"].get(ticker, 0.0)
+        if falta > 1e-9:
+            pm = alvo.at[ticker, "Custo"] / alvo.at[ticker, "Cotas"]
+            iniciais.append(_ajuste(data_inicial, ticker, falta, falta * pm))
+
+    # 2. O que ainda difere depois delas (reduções, custo) vai na data da migração
+    if iniciais:
+        livro = posicoes(pd.concat([df_hist, pd.DataFrame(iniciais)], ignore_index=True)).set_index("Ticker")
+    finais = []
+    for ticker in alvo.index.union(livro.index):
+        cotas = alvo["Cotas"].get(ticker, 0.0) - livro["Cotas"].get(ticker, 0.0)
+        custo = alvo["Custo"].get(ticker, 0.0) - livro["Custo_Total"].get(ticker, 0.0)
+        if abs(cotas) > 1e-9 or abs(custo) > 0.005:
+            finais.append(_ajuste(data, ticker, cotas, custo))
+    return iniciais + finais
@@ -0,0 +1,174 @@
+import pandas as pd
+import numpy as np
+import threading
+import sqlite3
+import time
+import os
+
+from modules import rede
+
+# --- DADOS DE MERCADO (BCB / SGS) ---
+# Histórico completo das séries mensais do Banco Central guardado localmente (SQLite).
+# Cada série é atualizada no máximo a cada INTERVALO_ATUALIZACAO e só pede ao BCB as
+# observações depois da última data guardada. As consultas (média dos últimos meses,
+# fator acumulado entre datas, média móvel) rodam em memória, vetorizadas.
+
+CAMINHO_MERCADO = os.path.join("data", "mercado.db")
+
+# Séries mensais em % a.m. (o valor guardado já é fração: 0.5% -> 0.005)
+SERIES_BCB = {
+    "IPCA": 433,   # IPCA - variação mensal
+    "CDI": 4391,   # CDI acumulado no mês
+    "SELIC": 4390, # Selic acumulada no mês
+}
+
+# Início do histórico na primeira carga
+INICIO_HISTORICO = "01/01/2000"
+
+# Tempo (s) entre consultas ao BCB por série (sai um dado novo por mês)
+INTERVALO_ATUALIZACAO = 12 * 3600
+
+# Usadas só se não houver histórico local nem rede (valores típicos % a.m.)
+TAXAS_PADRAO = {"IPCA": 0.004, "CDI": 0.0085, "SELIC": 0.0085}
+
+URL_SGS = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.{codigo}/dados"
+
+_lock = threading.RLock()
+_series = {}     # nome -> pd.Series (fração a.m., índice = 1º dia do mês)
+_consultas = {}  # nome -> timestamp da última consulta ao BCB
+
+# --- ARMAZENAMENTO LOCAL ---
+def _conectar():
+    pasta = os.path.dirname(CAMINHO_MERCADO)
+    if pasta and not os.path.exists(pasta):
+        os.makedirs(pasta)
+    con = sqlite3.connect(CAMINHO_MERCADO, timeout=10)
+    con.execute("CREATE TABLE IF NOT EXISTS observacoes (serie TEXT, data TEXT, valor REAL, PRIMARY KEY (serie, data))")
+    con.execute("CREATE TABLE IF NOT EXISTS consultas (serie TEXT PRIMARY KEY, ts REAL)")
+    return con
+
+def _ler_local(nome):
+    with _conectar() as con:
+        df = pd.read_sql("SELECT data, valor FROM observacoes WHERE serie=? ORDER BY data", con, params=(nome,))
+        linha = con.execute("SELECT ts FROM consultas WHERE serie=?", (nome,)).fetchone()
+    s = pd.Series(df["valor"].values, index=pd.to_datetime(df["data"]), name=nome, dtype=float)
+    return s, (linha[0] if linha else 0.0)
+
+def _gravar_local(nome, novas, ts):
+    with _conectar() as con:
+        con.executemany(
+            "INSERT OR REPLACE INTO observacoes (serie, data, valor) VALUES (?, ?, ?)",
+            [(nome, d.strftime("%Y-%m-%d"), float(v)) for d, v in novas.items()],
+        )
+        con.execute("INSERT OR REPLACE INTO consultas (serie, ts) VALUES (?, ?)", (nome, ts))
+
+# --- ATUALIZAÇÃO INCREMENTAL ---
+def _baixar(nome, desde):
+    """Observações do BCB a partir da data (inclusive) como Series de frações."""
+    params = {
+        "formato": "json",
+        "dataInicial": desde.strftime("%d/%m/%Y") if desde is not None else INICIO_HISTORICO,
+        "dataFinal": pd.Timestamp.today().strftime("%d/%m/%Y"),
+    }
+    # O histórico local é o cache: o gateway só cuida de sessão, timeout e contadores
+    dados = rede.get_json(URL_SGS.format(codigo=SERIES_BCB[nome]), params=params, ttl=0)
+    if not dados:
+        return pd.Series(dtype=float, name=nome)
+    df = pd.DataFrame(dados)
+    return pd.Series(
+        pd.to_numeric(df["valor"], errors="coerce").values / 100,
+        index=pd.to_datetime(df["data"], format="%d/%m/%Y"), name=nome,
+    ).dropna()
+
+def atualizar(nome, forcar=False):
+    """Busca no BCB só as observações depois da última guardada. Retorna quantas entraram."""
+    with _lock:
+        s = serie(nome, atualizar_se_velha=False)
+        if not forcar and time.time() - _consultas.get(nome, 0.0) < INTERVALO_ATUALIZACAO:
+            return 0
+        # A última observação é pedida de novo (o BCB pode revisar o mês corrente)
+        desde = s.index[-1] if not s.empty else None
+        try:
+            novas = _baixar(nome, desde)
+        except Exception as e:
+            print(f"⚠️ BCB indisponível para {nome}: {e}. Usando o histórico local.")
+            _consultas[nome] = time.time()  # não tenta de novo a cada render
+            return 0
+        agora = time.time()
+        _gravar_local(nome, novas, agora)
+        _consultas[nome] = agora
+        qtd = len(novas.index.difference(s.index))
+        _series[nome] = novas.combine_first(s).sort_index() if not s.empty else novas.sort_index()
+        return qtd
+
+def serie(nome, atualizar_se_velha=True):
+    """Série mensal (fração a.m.) com índice no 1º dia de cada mês. Vazia se nunca foi baixada."""
+    with _lock:
+        if nome not in _series:
+            _series[nome], _consultas[nome] = _ler_local(nome)
+        if atualizar_se_velha and time.time() - _consultas.get(nome, 0.0) >= INTERVALO_ATUALIZACAO:
+            atualizar(nome)
+        return _series[nome]
+
+# --- CONSULTAS ---
+def taxa_media(nome, meses=12):
+    """Média da taxa mensal (fração) nos últimos `meses` meses disponíveis."""
+    s = serie(nome)
+    if s.empty:
+        return TAXAS_PADRAO[nome]
+    return float(s.iloc[-meses:].mean())
+
+def ultima_taxa(nome):
+    """Taxa do último mês publicado (fração) e a data dele (ou o padrão e None sem histórico)."""
+    s = serie(nome)
+    if s.empty:
+        return TAXAS_PADRAO[nome], None
+    return float(s.iloc[-1]), s.index[-1]
+
+def media_movel(nome, janela=12):
+    """Média móvel da taxa mensal (fração) sobre o histórico inteiro."""
+    return serie(nome).rolling(janela, min_periods=1).mean()
+
+def parametros_ar1(nome, meses=120):
+    """
+    (média, persistência, desvio do choque) de um AR(1) mensal ajustado aos últimos `meses`
+    meses da série: x[t] - média = phi * (x[t-1] - média) + choque. Base das simulações.
+    """
+    x = serie(nome).iloc[-meses:].to_numpy()
+    if len(x) < 24:
+        # Pouco histórico: taxa padrão com persistência alta e choque de 10% do nível
+        return TAXAS_PADRAO[nome], 0.9, TAXAS_PADRAO[nome] * 0.1
+    media = x.mean()
+    desvio_ant, desvio_seg = x[:-1] - media, x[1:] - media
+    phi = float(np.clip((desvio_ant @ desvio_seg) / (desvio_ant @ desvio_ant), 0.0, 0.98))
+    choques = desvio_seg - phi * desvio_ant
+    return float(media), phi, float(choques.std(ddof=1))
+
+def _mes_abs(datas):
+    # Data -> nº absoluto do mês (ano*12 + mês-1), para aritmética de meses em arrays
+    d = pd.DatetimeIndex(pd.to_datetime(np.atleast_1d(datas)))
+    return d.year.to_numpy() * 12 + d.month.to_numpy() - 1
+
+def fator_acumulado(nome, inicio, fim):
+    """
+    Fator acumulado da série entre datas: prod(1 + taxa) dos meses em [inicio, fim).
+    inicio/fim podem ser datas soltas ou arrays (uma resposta por par, sem laço em Python).
+    Meses fora do histórico contam com a média dos últimos 12 meses.
+    """
+    escalar = np.ndim(inicio) == 0 and np.ndim(fim) == 0
+    m_ini, m_fim = _mes_abs(inicio), _mes_abs(fim)
+    s = serie(nome)
+    if s.empty:
+        fatores = (1 + TAXAS_PADRAO[nome]) ** (m_fim - m_ini)
+        return float(fatores[0]) if escalar else fatores
+
+    # Log do índice acumulado numa grade mensal contínua que cobre o histórico e os pedidos
+    m_serie = _mes_abs(s.index)
+    primeiro = min(m_serie.min(), m_ini.min(), m_fim.min())
+    ultimo = max(m_serie.max(), m_ini.max(), m_fim.max())
+    taxas = np.full(ultimo - primeiro + 1, taxa_media(nome, 12))
+    taxas[m_serie - primeiro] = s.to_numpy()
+    log_idx = np.concatenate([[0.0], np.cumsum(np.log1p(taxas))])
+
+    fatores = np.exp(log_idx[m_fim - primeiro] - log_idx[m_ini - primeiro])
+    return float(fatores[0]) if escalar else fatores
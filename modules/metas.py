@@ -29,13 +29,9 @@ def load_data():
     if "Deadline_T" not in df.columns: df["Deadline_T"] = None
     # ------------------------------------------------
 
-    # Agora é seguro converter os tipos
-    df["ID"] = pd.to_numeric(df["ID"], errors='coerce').fillna(0).astype(int)
-    df["Meta_Valor"] = pd.to_numeric(df["Meta_Valor"], errors='coerce').fillna(0.0)
-    df["Progresso_Atual"] = pd.to_numeric(df["Progresso_Atual"], errors='coerce').fillna(0.0)
-    
+    # ID/Meta_Valor/Progresso_Atual/Ano já vêm tipados pelo registro de tipos
     # Garante que Ano é Texto
-    df["Ano"] = pd.to_numeric(df["Ano"], errors='coerce').fillna(date.today().year).astype(int).astype(str)
+    df["Ano"] = df["Ano"].astype(str)
     
     # Tratamento de Data
     df["Deadline_T"] = pd.to_datetime(df["Deadline_T"], errors='coerce').dt.date
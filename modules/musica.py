@@ -3,14 +3,15 @@ import pandas as pd
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
 from datetime import date
-from modules import conexoes
+from modules import conexoes, rede
 
 # --- CONFIGURAÇÃO API SPOTIFY ---
 try:
+    # Mesma Session com pool/retentativa do gateway HTTP (modules/rede.py)
     sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(
         client_id=st.secrets['SPOTIPY_CLIENT_ID'],
         client_secret=st.secrets['SPOTIPY_CLIENT_SECRET']
-    ))
+    ), requests_session=rede.sessao("api.spotify.com"), requests_timeout=rede.TIMEOUT_PADRAO)
     API_AVAILABLE = True
 except:
     API_AVAILABLE = False
@@ -20,10 +21,6 @@ def load_data():
     cols = ["ID", "Album", "Artista", "Ano", "Genero", "Capa_URL", "Nota", "Top_Tracks", "Skip_Tracks", "Review", "Data_Ouvido", "Tracklist_Raw"]
     df = conexoes.load_gsheet("Musica", cols)
     
-    if not df.empty:
-        df["ID"] = pd.to_numeric(df["ID"], errors='coerce').fillna(0).astype(int)
-        df["Ano"] = pd.to_numeric(df["Ano"], errors='coerce').fillna(0).astype(int)
-        df["Nota"] = pd.to_numeric(df["Nota"], errors='coerce').fillna(0.0)
     return df
 
 def save_data(df):
@@ -36,14 +33,14 @@ def save_data(df):
 def search_album(query):
     if not API_AVAILABLE: return []
     try:
-        results = sp.search(q=query, type='album', limit=5)
+        results = rede.memorizar("spotify", f"search/album/{query}", 6 * 3600, sp.search, q=query, type='album', limit=5)
         return results['albums']['items']
     except: return []
 
 def get_album_details(album_id):
     if not API_AVAILABLE: return None
     try:
-        album = sp.album(album_id)
+        album = rede.memorizar("spotify", f"album/{album_id}", 7 * 86400, sp.album, album_id)
         # Busca Tracklist
         tracks = [t['name'] for t in album['tracks']['items']]
         tracklist_str = "\n".join(tracks)
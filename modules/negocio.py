@@ -15,28 +15,26 @@ def load_data():
     cols_d = ["ID", "Cliente", "Projeto", "Valor_Est", "Estagio", "Probabilidade", "Data_Inicio", "Previsao_Fechamento", "Obs", "Faturado_Check"]
     df_d = conexoes.load_gsheet("CRM_Deals", cols_d)
     
-    # Saneamento de Tipos
-    if not df_d.empty:
-        df_d["Valor_Est"] = pd.to_numeric(df_d["Valor_Est"], errors='coerce').fillna(0.0)
-        df_d["Faturado_Check"] = df_d["Faturado_Check"].astype(str).str.upper() == "TRUE"
-    if not df_c.empty:
-        df_c["ID"] = pd.to_numeric(df_c["ID"], errors='coerce').fillna(0).astype(int)
-        
+    # Valor_Est, Faturado_Check e ID já vêm tipados pelo registro de tipos
     return df_c, df_d
 
-def save_data(df, aba):
+def _preparar(df):
     # Converte tipos para garantir compatibilidade com GSheets
     df_save = df.copy()
     # Converte colunas de data/bool para string antes do upload
     for col in ["Data_Cadastro", "Data_Inicio", "Previsao_Fechamento"]:
         if col in df_save.columns: df_save[col] = df_save[col].astype(str)
-    conexoes.save_gsheet(aba, df_save)
+    return df_save
+
+def save_data(df, aba, df_original=None):
+    # Com o snapshot do load, sobe só as células/linhas alteradas
+    if df_original is not None:
+        conexoes.save_gsheet_diff(aba, _preparar(df_original), _preparar(df))
+    else:
+        conexoes.save_gsheet(aba, _preparar(df))
 
 def lancar_no_financeiro(descricao, valor, data_ref):
-    # Puxa transações existentes para anexar a nova receita
-    cols_f = ["Data", "Tipo", "Categoria", "Descricao", "Valor_Total", "Pagamento"]
-    df_fin = conexoes.load_gsheet("Transacoes", cols_f)
-    
+    # Anexa a nova receita direto em Transacoes (sem baixar as transações existentes)
     nova_transacao = {
         "Data": str(data_ref),
         "Tipo": "Receita",
@@ -46,8 +44,7 @@ def lancar_no_financeiro(descricao, valor, data_ref):
         "Pagamento": "Pix/Transf"
     }
     
-    df_updated = pd.concat([df_fin, pd.DataFrame([nova_transacao])], ignore_index=True)
-    conexoes.save_gsheet("Transacoes", df_updated)
+    conexoes.append_rows("Transacoes", pd.DataFrame([nova_transacao]))
     return True
 
 def render_page():
@@ -154,7 +151,7 @@ def render_page():
                             edited_deals.at[idx, 'Faturado_Check'] = True
                             st.toast(f"💸 KA-CHING! R$ {row['Valor_Est']} lançado no Financeiro!", icon="🤑")
                 
-                save_data(edited_deals, "CRM_Deals")
+                save_data(edited_deals, "CRM_Deals", df_original=df_deals)
                 st.rerun()
 
             # 2. EXCLUSÃO (Área Dedicada)
@@ -166,8 +163,7 @@ def render_page():
                 
                 if col_btn_del.button("Excluir Deal"):
                     id_del = int(deal_to_delete.split("|")[0].replace("ID ", "").strip())
-                    df_deals = df_deals[df_deals['ID'] != id_del]
-                    save_data(df_deals, "CRM_Deals")
+                    save_data(df_deals[df_deals['ID'] != id_del], "CRM_Deals", df_original=df_deals)
                     st.success("Deal removido.")
                     st.rerun()
         else:
@@ -13,7 +13,6 @@ def load_data():
     cols_log = ["Data", "Tipo", "Subtipo", "Valor", "Unidade", "Detalhe"]
     df_log = conexoes.load_gsheet("Log_Produtividade", cols_log)
     if not df_log.empty:
-        df_log["Valor"] = pd.to_numeric(df_log["Valor"], errors='coerce').fillna(0)
         df = df_log
     return df
 
@@ -0,0 +1,199 @@
+import numpy as np
+import multiprocessing
+import threading
+import functools
+import time
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from modules import simulacao
+
+# --- OTIMIZADOR DE ALOCAÇÃO ---
+# Procura os pesos (FIIs, CDI) da Projeção Detalhada que maximizam a renda passiva no último mês
+# (mediana dos cenários), sujeito a: reserva de N salários completa até o mês limite em pelo menos
+# `confianca` dos cenários, e Lazer >= mínimo (Casa/Carro/Vida ficam como estão).
+# Grade grossa e depois refinamentos em volta da melhor alocação. As alocações de cada rodada vão
+# em lotes para um pool de processos; a coordenação roda numa thread, então a página só lê o
+# progresso e pode cancelar. Os processos recebem só a semente e os parâmetros dos cenários
+# e sorteiam os mesmos caminhos localmente (sem mandar arrays grandes a cada lote).
+
+# Processos do pool (um núcleo fica para o servidor do Streamlit)
+MAX_PROCESSOS = max(1, (os.cpu_count() or 2) - 1)
+
+# Alocações por tarefa enviada ao pool
+TAMANHO_LOTE = 16
+
+CENARIOS_PADRAO = 2000
+
+# (passo da grade, raio em volta da melhor alocação; None = região inteira)
+RODADAS = [(0.02, None), (0.005, 0.02), (0.001, 0.005)]
+
+class OtimizacaoCancelada(Exception):
+    """Cancelada pela página antes de terminar."""
+
+# --- POOL DE PROCESSOS ---
+_lock_pool = threading.Lock()
+_pool = None
+
+def _get_pool():
+    global _pool
+    with _lock_pool:
+        if _pool is None:
+            # spawn: o servidor tem várias threads, e fork copiaria locks travados
+            _pool = ProcessPoolExecutor(max_workers=MAX_PROCESSOS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _descartar_pool():
+    global _pool
+    with _lock_pool:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+# --- TAREFA (roda nos processos) ---
+@functools.lru_cache(maxsize=4)
+def _cenarios(parametros):
+    return simulacao.cenarios_alocacao(**dict(parametros))
+
+def _avaliar_lote(parametros, pesos_fii, pesos_cdi, mes_limite, meses_reserva):
+    return simulacao.avaliar_alocacoes(pesos_fii, pesos_cdi, _cenarios(parametros), mes_limite, meses_reserva)
+
+# --- COORDENAÇÃO ---
+class Otimizacao:
+    """
+    Uma otimização em background. A página cria, chama iniciar() e depois só lê
+    progresso/etapa/resultado/erro (ou chama cancelar()).
+    """
+
+    def __init__(self, salario, yield_fii, cdi_ar1, cdi_inicio, fixos, lazer_minimo, mes_limite,
+                 confianca=0.9, meses=60, meses_reserva=6, reajuste_anual=0.05, n_cenarios=CENARIOS_PADRAO, semente=0):
+        self.teto_pesos = 1 - fixos - lazer_minimo  # FIIs + CDI não passam disso
+        self.fixos = fixos
+        self.mes_limite = mes_limite
+        self.confianca = confianca
+        self.meses_reserva = meses_reserva
+        self.parametros = tuple(sorted({
+            "salario": float(salario), "yield_fii": float(yield_fii),
+            "cdi_ar1": tuple(float(x) for x in cdi_ar1), "cdi_inicio": float(cdi_inicio),
+            "meses": int(meses), "n": int(n_cenarios), "semente": int(semente),
+            "reajuste_anual": float(reajuste_anual),
+        }.items()))
+
+        self.progresso = 0.0
+        self.etapa = "Na fila"
+        self.avaliadas = 0
+        self.resultado = None
+        self.erro = None
+        self.inicio = None
+        self.fim = None
+        self._cancelar = threading.Event()
+        self._thread = threading.Thread(target=self._rodar, name="otimizador", daemon=True)
+
+    @property
+    def rodando(self):
+        return self._thread.is_alive()
+
+    @property
+    def cancelada(self):
+        return self._cancelar.is_set()
+
+    def iniciar(self):
+        self.inicio = time.time()
+        self._thread.start()
+        return self
+
+    def cancelar(self):
+        self._cancelar.set()
+
+    def _rodar(self):
+        try:
+            self.resultado = self._otimizar()
+            self.etapa = "Concluída"
+        except OtimizacaoCancelada:
+            self.etapa = "Cancelada"
+        except BrokenProcessPool as e:
+            _descartar_pool()
+            self.erro = f"Pool de processos caiu: {e}"
+            print(f"❌ Otimizador: {self.erro}")
+        except Exception as e:
+            self.erro = str(e)
+            print(f"❌ Otimizador falhou: {e}")
+        finally:
+            self.fim = time.time()
+
+    def _grade(self, passo, centro=None, raio=None):
+        if centro is None:
+            eixo_fii = eixo_cdi = np.arange(0, self.teto_pesos + passo / 2, passo)
+        else:
+            eixo_fii = np.arange(max(centro[0] - raio, 0), centro[0] + raio + passo / 2, passo)
+            eixo_cdi = np.arange(max(centro[1] - raio, 0), centro[1] + raio + passo / 2, passo)
+        fii, cdi = (np.round(g.ravel(), 4) for g in np.meshgrid(eixo_fii, eixo_cdi, indexing="ij"))
+        validas = fii + cdi <= self.teto_pesos + 1e-9
+        return fii[validas], cdi[validas]
+
+    def _avaliar(self, fii, cdi, rodada):
+        """Renda e chance de cumprir a reserva de cada alocação, em lotes no pool."""
+        pool = _get_pool()
+        futuros = {}
+        for i in range(0, len(fii), TAMANHO_LOTE):
+            f = pool.submit(_avaliar_lote, self.parametros, fii[i:i + TAMANHO_LOTE], cdi[i:i + TAMANHO_LOTE],
+                            self.mes_limite, self.meses_reserva)
+            futuros[f] = i
+
+        renda = np.empty(len(fii))
+        no_prazo = np.empty(len(fii))
+        feitos = 0
+        try:
+            for f in as_completed(futuros):
+                if self._cancelar.is_set():
+                    raise OtimizacaoCancelada()
+                i = futuros[f]
+                renda[i:i + TAMANHO_LOTE], no_prazo[i:i + TAMANHO_LOTE] = f.result()
+                feitos += 1
+                self.avaliadas += min(TAMANHO_LOTE, len(fii) - i)
+                self.progresso = (rodada + feitos / len(futuros)) / len(RODADAS)
+        finally:
+            # Cancelada ou com erro: o que ainda está na fila não roda
+            for f in futuros:
+                f.cancel()
+        return renda, no_prazo
+
+    def _otimizar(self):
+        if self.teto_pesos < 0:
+            raise ValueError("Lazer mínimo + gastos fixos passam de 100% do salário.")
+
+        melhor = None  # (renda, no_prazo, fii, cdi)
+        mais_perto = None  # sem alocação viável: a de maior chance de cumprir a reserva
+        for rodada, (passo, raio) in enumerate(RODADAS):
+            self.etapa = f"Rodada {rodada + 1}/{len(RODADAS)} (passo {passo:.1%})"
+            centro = (melhor or mais_perto)[2:] if rodada > 0 else None
+            fii, cdi = self._grade(passo, centro, raio)
+            renda, no_prazo = self._avaliar(fii, cdi, rodada)
+
+            viaveis = no_prazo >= self.confianca
+            if viaveis.any():
+                i = np.flatnonzero(viaveis)[np.argmax(renda[viaveis])]
+                if melhor is None or renda[i] > melhor[0]:
+                    melhor = (renda[i], no_prazo[i], fii[i], cdi[i])
+            elif melhor is None:
+                # Maior chance; empate (ex.: todas zero) vai para quem guarda mais no CDI
+                i = np.lexsort((-renda, -cdi, -no_prazo))[0]
+                if mais_perto is None or no_prazo[i] > mais_perto[1]:
+                    mais_perto = (renda[i], no_prazo[i], fii[i], cdi[i])
+
+        escolhida = melhor or mais_perto
+        return {
+            "viavel": melhor is not None,
+            "FIIs": float(escolhida[2]),
+            "CDI": float(escolhida[3]),
+            "Lazer": round(float(1 - self.fixos - escolhida[2] - escolhida[3]), 4),
+            "Renda Passiva": float(escolhida[0]),
+            "Chance Reserva": float(escolhida[1]),
+            "Avaliadas": self.avaliadas,
+        }
+
+    def avaliar_atual(self, pesos_fii, pesos_cdi):
+        """Mesma métrica para a alocação atual (um lote só, direto nesta thread)."""
+        renda, no_prazo = _avaliar_lote(self.parametros, [pesos_fii], [pesos_cdi], self.mes_limite, self.meses_reserva)
+        return float(renda[0]), float(no_prazo[0])
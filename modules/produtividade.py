@@ -3,22 +3,31 @@ import pandas as pd
 from modules import conexoes
 from datetime import date, timedelta
 
-def save_data(df, aba):
+def save_data(df, aba, em_fila=False):
     df_save = df.copy()
 
     for col in ["Data", "Status", "Concluido", "Ativo"]:
         if col in df_save.columns:
             df_save[col] = df_save[col].astype(str)
 
-    conexoes.save_gsheet(aba, df_save)
+    conexoes.save_gsheet(aba, df_save, em_fila=em_fila)
 
-@st.cache_data(ttl=600)
+def append_data(df_novas, aba, em_fila=False):
+    # Logs (Log_Produtividade / Habitos_Log) só recebem linhas novas
+    # em_fila=True: vai para a fila de escrita (appends seguidos na mesma aba viram um só)
+    df_save = df_novas.copy()
+
+    for col in ["Data", "Status", "Concluido", "Ativo"]:
+        if col in df_save.columns:
+            df_save[col] = df_save[col].astype(str)
+
+    conexoes.append_rows(aba, df_save, em_fila=em_fila)
+
+# Sem st.cache_data: o cache por aba do conexoes já é atualizado a cada save (write-through)
 def load_data():
 
     cols_log = ["Data", "Tipo", "Subtipo", "Valor", "Unidade", "Detalhe"]
     df_log = conexoes.load_gsheet("Log_Produtividade", cols_log)
-    if not df_log.empty:
-        df_log["Valor"] = pd.to_numeric(df_log["Valor"], errors='coerce').fillna(0)
 
     cols_h_conf = ["Habito", "Categoria", "Ativo"]
     df_h_conf = conexoes.load_gsheet("Habitos_Config", cols_h_conf)
@@ -31,9 +40,6 @@ def load_data():
         df_h_conf = pd.DataFrame(defaults)
         conexoes.save_gsheet("Habitos_Config", df_h_conf)
 
-    else:
-        df_h_conf["Ativo"] = df_h_conf["Ativo"].astype(str).str.upper() == "TRUE"
-
 
     cols_esperadas = ["Data", "Habito", "Status"]
     try:
@@ -53,7 +59,6 @@ def load_data():
 
     if not df_h_check.empty:
         df_h_check = df_h_check.dropna(subset=['Habito'])
-        df_h_check["Status"] = df_h_check["Status"].astype(str).str.upper() == "TRUE"
 
     return df_log, df_h_conf, df_h_check
 
@@ -95,7 +100,7 @@ def calcular_streak(df_checks, habito_nome):
     
     return streak, consistencia
 
-def atualizar_leitura_externa(livro_nome, paginas_lidas_hoje):
+def atualizar_leitura_externa(livro_nome, paginas_lidas_hoje, em_fila=False):
     cols = ["Titulo", "Autor", "Total_Paginas", "Paginas_Lidas", "Nota", "Status"]
     df = conexoes.load_gsheet("Leituras", cols)
     if df.empty: return False
@@ -115,7 +120,7 @@ def atualizar_leitura_externa(livro_nome, paginas_lidas_hoje):
             acabou_agora = True
             
         df.at[idx, 'Paginas_Lidas'] = nova_pag
-        conexoes.save_gsheet("Leituras", df)
+        conexoes.save_gsheet("Leituras", df, em_fila=em_fila)
         
     return acabou_agora
 
@@ -161,7 +166,6 @@ def render_page():
                     novo_reg = {"Habito": novo_h.strip(), "Categoria": cat_h.strip(), "Ativo": True}
                     df_h_conf = pd.concat([df_h_conf, pd.DataFrame([novo_reg])], ignore_index=True)
                     save_data(df_h_conf, "Habitos_Config")
-                    st.cache_data.clear()
                     st.rerun()
 
             st.divider()
@@ -174,7 +178,6 @@ def render_page():
                     df_h_conf.at[idx, 'Ativo'] = False
 
                     save_data(df_h_conf, "Habitos_Config")
-                    st.cache_data.clear()
                     st.rerun()
 
         habitos_ativos = df_h_conf[df_h_conf['Ativo'] == True]
@@ -223,10 +226,8 @@ def render_page():
                                 novos_registros.append({"Data": hoje, "Habito": habito, "Status": True})
 
                         if novos_registros:
-                            df_h_check = pd.concat([df_h_check, pd.DataFrame(novos_registros)], ignore_index=True)
-                            save_data(df_h_check, "Habitos_Log")
+                            append_data(pd.DataFrame(novos_registros), "Habitos_Log")
 
-                            st.cache_data.clear()
                             st.rerun()
                         else:
                             st.warning("Não marcaste nenhum hábito. Seleciona pelo menos um para guardar!")
@@ -291,11 +292,10 @@ def render_page():
 
                 if submitted:
                     if sel_livro != "Nenhum":
-                        livro_finalizado = atualizar_leitura_externa(sel_livro, qtd_pag)
+                        # Tudo pela fila de escrita: sobe em fundo, os checks de hábito num append só
+                        livro_finalizado = atualizar_leitura_externa(sel_livro, qtd_pag, em_fila=True)
                         log = {"Data": date.today(), "Tipo": "Leitura", "Subtipo": sel_livro, "Valor": qtd_pag, "Unidade": "Paginas"}
-                        df_log = pd.concat([df_log, pd.DataFrame([log])], ignore_index=True)
-
-                        save_data(df_log, "Habitos_Log")
+                        append_data(pd.DataFrame([log]), "Log_Produtividade", em_fila=True)
 
                         st.success("Progresso registrado!")
 
@@ -304,12 +304,10 @@ def render_page():
 
                             if "LEITURA" in habito.upper() or "LER" in habito.upper():
                                 novo_check = {"Data": date.today(), "Habito": habito, "Status": True}
-                                df_h_check = pd.concat([df_h_check, pd.DataFrame([novo_check])], ignore_index=True)
-                                save_data(df_h_check, "Habitos_Log")
+                                append_data(pd.DataFrame([novo_check]), "Habitos_Log", em_fila=True)
                          
                                 st.toast(f"✅ Hábito '{habito}' marcado automaticamente!")
                         
-                        st.cache_data.clear()
                         st.rerun()
 
         elif tipo_sessao == "Cursos":
@@ -338,8 +336,7 @@ def render_page():
                         "Unidade": "Aulas"
                     }
 
-                    df_log = pd.concat([df_log, pd.DataFrame([log_qtd])], ignore_index=True)
-                    save_data(df_log, "Log_Produtividade")
+                    append_data(pd.DataFrame([log_qtd]), "Log_Produtividade")
                     st.success("Foco registrado!")
 
         elif tipo_sessao == "Faculdade":
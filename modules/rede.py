@@ -0,0 +1,243 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlsplit, urlencode
+import threading
+import sqlite3
+import json
+import time
+import re
+import os
+
+# --- GATEWAY HTTP (APIs externas: TMDB, FIPE, BCB, Spotify) ---
+# Toda chamada externa passa por aqui:
+#   - uma Session por host (keep-alive + pool de conexões) com timeout e retentativa em 429/5xx
+#   - cache persistente das respostas (SQLite em data/http_cache.db) com TTL por endpoint;
+#     resposta vencida com ETag/Last-Modified é revalidada com requisição condicional (304 = reusa)
+#   - se a rede falhar, serve a última resposta guardada (mesmo vencida)
+#   - contadores por API (hits, revalidações, downloads, erros, latência) para a sidebar
+
+CAMINHO_CACHE = os.path.join("data", "http_cache.db")
+
+# (conexão, leitura) em segundos
+TIMEOUT_PADRAO = (3.05, 15)
+
+# Conexões abertas por host (as buscas concorrentes da FIPE/TMDB dividem o pool)
+MAX_CONEXOES_HOST = 8
+
+# TTL (s) por endpoint: o primeiro padrão que casar com a URL vale. 0 = não guarda.
+TTLS = [
+    (r"api\.themoviedb\.org/3/search/", 6 * 3600),
+    (r"api\.themoviedb\.org/3/tv/\d+/season/", 24 * 3600),
+    (r"api\.themoviedb\.org/3/", 24 * 3600),
+    (r"parallelum\.com\.br/fipe/api/v1/.+/anos/[^/]+$", 7 * 86400),  # preço de um ano-modelo
+    (r"parallelum\.com\.br/fipe/", 7 * 86400),
+    (r"api\.bcb\.gov\.br/", 12 * 3600),
+]
+TTL_PADRAO = 3600
+
+# Nome curto da API nos contadores
+APIS = {
+    "api.themoviedb.org": "tmdb",
+    "parallelum.com.br": "fipe",
+    "api.bcb.gov.br": "bcb",
+    "api.spotify.com": "spotify",
+}
+
+class ErroHTTP(Exception):
+    """Resposta com status de erro (4xx/5xx) sem cópia guardada para servir no lugar."""
+
+    def __init__(self, status, url):
+        super().__init__(f"HTTP {status} em {url}")
+        self.status = status
+        self.url = url
+
+# --- SESSÕES ---
+_lock_sessoes = threading.Lock()
+_sessoes = {}  # host -> Session
+
+def sessao(host):
+    """Session compartilhada do host (keep-alive, pool e retentativa com backoff em 429/5xx)."""
+    with _lock_sessoes:
+        s = _sessoes.get(host)
+        if s is None:
+            s = requests.Session()
+            retry = Retry(
+                total=2, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET"], respect_retry_after_header=True,
+            )
+            adaptador = HTTPAdapter(pool_connections=2, pool_maxsize=MAX_CONEXOES_HOST, max_retries=retry)
+            s.mount("https://", adaptador)
+            s.mount("http://", adaptador)
+            _sessoes[host] = s
+        return s
+
+# --- CONTADORES ---
+_lock_stats = threading.Lock()
+_stats = {}  # api -> {...}
+
+def _nome_api(host):
+    return APIS.get(host, host)
+
+def _contar(api, chave, qtd=1):
+    with _lock_stats:
+        s = _stats.setdefault(api, {
+            "chamadas": 0, "hits": 0, "revalidadas": 0, "downloads": 0,
+            "erros": 0, "servidas_vencidas": 0, "segundos_rede": 0.0,
+        })
+        s[chave] += qtd
+
+def get_stats(api=None):
+    """Contadores por API (ou só da API pedida), com a taxa de hit e a latência média da rede."""
+    with _lock_stats:
+        stats = {nome: dict(s) for nome, s in _stats.items()}
+    for s in stats.values():
+        idas = s["downloads"] + s["revalidadas"]
+        s["taxa_hit"] = (s["hits"] + s["revalidadas"]) / s["chamadas"] if s["chamadas"] else 0.0
+        s["latencia_media"] = s["segundos_rede"] / idas if idas else 0.0
+    return stats.get(api, {}) if api is not None else stats
+
+# --- CACHE PERSISTENTE (SQLite) ---
+_lock_cache = threading.Lock()
+
+def _conectar():
+    pasta = os.path.dirname(CAMINHO_CACHE)
+    if pasta and not os.path.exists(pasta):
+        os.makedirs(pasta)
+    con = sqlite3.connect(CAMINHO_CACHE, timeout=10)
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS respostas ("
+        "chave TEXT PRIMARY KEY, corpo TEXT, etag TEXT, last_modified TEXT, ts REAL)"
+    )
+    return con
+
+def _cache_ler(chave):
+    try:
+        with _lock_cache, _conectar() as con:
+            linha = con.execute("SELECT corpo, etag, last_modified, ts FROM respostas WHERE chave=?", (chave,)).fetchone()
+    except sqlite3.Error as e:
+        print(f"⚠️ Cache HTTP indisponível: {e}")
+        return None
+    if linha is None:
+        return None
+    return {"dados": json.loads(linha[0]), "etag": linha[1], "last_modified": linha[2], "ts": linha[3]}
+
+def _cache_gravar(chave, dados, etag=None, last_modified=None):
+    try:
+        with _lock_cache, _conectar() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO respostas (chave, corpo, etag, last_modified, ts) VALUES (?, ?, ?, ?, ?)",
+                (chave, json.dumps(dados), etag, last_modified, time.time()),
+            )
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        print(f"⚠️ Não foi possível guardar a resposta no cache HTTP: {e}")
+
+def _cache_renovar(chave):
+    try:
+        with _lock_cache, _conectar() as con:
+            con.execute("UPDATE respostas SET ts=? WHERE chave=?", (time.time(), chave))
+    except sqlite3.Error:
+        pass
+
+def limpar_cache(prefixo=None):
+    """Apaga as respostas guardadas (todas ou só as de URLs que começam com o prefixo)."""
+    with _lock_cache, _conectar() as con:
+        if prefixo is None:
+            con.execute("DELETE FROM respostas")
+        else:
+            con.execute("DELETE FROM respostas WHERE substr(chave, 1, ?) = ?", (len(prefixo), prefixo))
+
+def ttl_da_url(url):
+    for padrao, ttl in TTLS:
+        if re.search(padrao, url):
+            return ttl
+    return TTL_PADRAO
+
+def _chave(url, params):
+    if not params:
+        return url
+    return f"{url}{'&' if '?' in url else '?'}{urlencode(sorted(params.items()))}"
+
+# --- API PÚBLICA ---
+def get_json(url, params=None, headers=None, ttl=None, timeout=None):
+    """
+    GET que devolve o JSON da resposta, passando pelo cache (ttl=None usa a tabela TTLS).
+    Status de erro levanta ErroHTTP; falha de rede levanta a exceção do requests.
+    Nos dois casos, se houver uma cópia guardada (mesmo vencida), ela é servida no lugar.
+    """
+    chave = _chave(url, params)
+    api = _nome_api(urlsplit(url).hostname)
+    ttl = ttl_da_url(chave) if ttl is None else ttl
+    _contar(api, "chamadas")
+
+    guardada = _cache_ler(chave) if ttl > 0 else None
+    if guardada is not None and time.time() - guardada["ts"] < ttl:
+        _contar(api, "hits")
+        return guardada["dados"]
+
+    # Vencida: pergunta se mudou (304 reaproveita o corpo guardado)
+    headers = dict(headers or {})
+    if guardada is not None:
+        if guardada["etag"]:
+            headers["If-None-Match"] = guardada["etag"]
+        if guardada["last_modified"]:
+            headers["If-Modified-Since"] = guardada["last_modified"]
+
+    inicio = time.perf_counter()
+    try:
+        r = sessao(urlsplit(url).hostname).get(url, params=params, headers=headers, timeout=timeout or TIMEOUT_PADRAO)
+    except requests.RequestException as e:
+        _contar(api, "erros")
+        if guardada is not None:
+            print(f"⚠️ {api}: rede falhou ({e}). Usando a resposta guardada.")
+            _contar(api, "servidas_vencidas")
+            return guardada["dados"]
+        raise
+    finally:
+        _contar(api, "segundos_rede", time.perf_counter() - inicio)
+
+    if r.status_code == 304 and guardada is not None:
+        _cache_renovar(chave)
+        _contar(api, "revalidadas")
+        return guardada["dados"]
+
+    if r.status_code >= 400:
+        _contar(api, "erros")
+        if guardada is not None and r.status_code >= 500:
+            _contar(api, "servidas_vencidas")
+            return guardada["dados"]
+        raise ErroHTTP(r.status_code, url)
+
+    dados = r.json()
+    _contar(api, "downloads")
+    if ttl > 0:
+        _cache_gravar(chave, dados, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+    return dados
+
+def memorizar(api, chave, ttl, func, *args, **kwargs):
+    """
+    Mesmo cache persistente para clientes que não expõem a URL (ex.: spotipy):
+    guarda o retorno (JSON) de func(*args, **kwargs) em "<api>:<chave>" por ttl segundos.
+    """
+    chave = f"{api}:{chave}"
+    _contar(api, "chamadas")
+    guardada = _cache_ler(chave)
+    if guardada is not None and time.time() - guardada["ts"] < ttl:
+        _contar(api, "hits")
+        return guardada["dados"]
+
+    inicio = time.perf_counter()
+    try:
+        dados = func(*args, **kwargs)
+    except Exception as e:
+        _contar(api, "erros")
+        if guardada is not None:
+            print(f"⚠️ {api}: chamada falhou ({e}). Usando a resposta guardada.")
+            _contar(api, "servidas_vencidas")
+            return guardada["dados"]
+        raise
+    finally:
+        _contar(api, "segundos_rede", time.perf_counter() - inicio)
+    _contar(api, "downloads")
+    _cache_gravar(chave, dados)
+    return dados
@@ -8,13 +8,11 @@ from datetime import date
 # Configuração inicial da página
 st.title("Análise de Sazonalidade de Produtividade")
 
-@st.cache_data
 def load_data():
     cols_log = ["Data", "Tipo", "Subtipo", "Valor", "Unidade", "Detalhe"]
     df_log = conexoes.load_gsheet("Log_Produtividade", cols_log)
     
     if not df_log.empty:
-        df_log["Valor"] = pd.to_numeric(df_log["Valor"], errors='coerce').fillna(0)
         df_log['Data'] = pd.to_datetime(df_log['Data'], errors='coerce')
         return df_log.dropna(subset=['Data'])
     
@@ -0,0 +1,185 @@
+import pandas as pd
+import numpy as np
+from datetime import date
+
+# --- REGISTRO CENTRAL DE TIPOS ---
+# aba -> {coluna: (tipo, default)}. Tipos: "float", "int", "bool", "str".
+# O conexoes aplica na leitura (cast vetorizado por coluna) e usa o mesmo registro
+# para serializar na escrita, então os módulos recebem os DataFrames já tipados.
+# O default pode ser uma função (avaliada na hora do cast).
+
+def _ano_atual():
+    return date.today().year
+
+SCHEMAS = {
+    # Finanças
+    "Financeiro": {
+        c: ("float", 0.0) for c in [
+            "Salario", "Gasto_Pan", "Gasto_Itau", "Gasto_MP", "Gasto_Nu", "Outros_Val",
+            "Peso_FII", "Peso_CDI", "Peso_Lazer", "Peso_Casa", "Peso_Carro", "Peso_Vida",
+            "Div_Valor", "Free_Valor", "DT_Valor", "Pres_Valor", "Meta_Preco_Cota_FII",
+        ]
+    },
+    "Financiamentos": {
+        "Valor_Emprestado": ("float", 0.0),
+        "Valor_Parcela": ("float", 0.0),
+        "Qtd_Total": ("int", 0),
+        "Qtd_Pagas": ("int", 0),
+    },
+    "Parcelas": {
+        "Valor": ("float", 0.0),
+        "Faltam": ("float", 0.0),
+        "Vezes": ("int", 0),
+        "Pagas": ("int", 0),
+        "Restantes": ("int", 0),
+    },
+    "Carteira": {
+        "Cotas": ("float", 0.0),
+        "Preco_Medio": ("float", 0.0),
+        "DY_Anual_Estimado": ("float", 0.0),
+        "DY_Mensal_Perc": ("float", 0.0),
+    },
+    "Historico_Transacoes": {
+        "Cotas": ("float", 0.0),
+        "Preco": ("float", 0.0),
+        "Total": ("float", 0.0),
+    },
+    "CDI_Caixinhas": {"Saldo_Atual": ("float", 0.0)},
+    "Transacoes": {"Valor_Total": ("float", 0.0)},
+    "Investimentos": {"Qtd": ("float", 0.0), "Preco_Unitario": ("float", 0.0)},
+    "DayTrade": {
+        c: ("float", 0.0) for c in [
+            "Banca_Inicial", "Banca_Final", "Lucro", "Perc_Dia", "Risco_USD", "Saque_USD", "Aportes_USD",
+        ]
+    },
+
+    # Corpo
+    "Bio": {
+        **{c: ("float", 0.0) for c in [
+            "Peso_kg", "Altura_m", "Gordura_Perc", "Pescoco_cm", "Cintura_cm", "Quadril_cm",
+            "Biceps_cm", "Peito_cm", "Coxa_cm", "Sono_hrs", "Humor_0_10", "Agua_L",
+            "Meta_Peso_kg", "Meta_BF_perc", "Prot_g", "Carb_g", "Gord_g", "Calorias_Gastas", "Massa_Magra",
+        ]},
+        "Idade": ("int", 26),
+        "Calorias_Ingeridas": ("int", 0),
+    },
+
+    # Garagem
+    "Carros": {
+        "ID": ("int", 0),
+        **{c: ("float", 0.0) for c in ["Fipe_Ref", "Preco_Negociado", "KM", "Zero_Cem", "Consumo_Medio"]},
+    },
+
+    # Cultura
+    "Series_Master": {"ID_TMDB": ("str", "")},
+    "Series_Log": {
+        "ID_TMDB": ("str", ""),
+        "Temporada": ("int", 0),
+        "Episodio": ("int", 0),
+        "Nota": ("int", 0),
+        "Visto": ("bool", False),
+    },
+    "Musica": {"ID": ("int", 0), "Ano": ("int", 0), "Nota": ("float", 0.0)},
+    "Filmes": {"Ano": ("int", 0), "Nota": ("float", 0.0)},
+
+    # Produtividade
+    "Log_Produtividade": {"Valor": ("float", 0)},
+    "Habitos_Config": {"Ativo": ("bool", False)},
+    "Habitos_Log": {"Status": ("bool", False)},
+    "Leituras": {"Total_Paginas": ("int", 1), "Paginas_Lidas": ("int", 0)},
+    "Cursos": {"Total_Aulas": ("int", 1), "Aulas_Feitas": ("int", 0)},
+
+    # Mente
+    "Decisoes": {"Decisao_ID": ("int", 0), "Peso": ("int", 1), "Nota": ("int", 0)},
+    "Dump_Mental": {"ID": ("int", 0), "Processado": ("bool", False)},
+    "Eisenhower": {"ID": ("int", 0), "Importante": ("bool", False), "Urgente": ("bool", False)},
+    "FearSetting": {"ID": ("int", 0)},
+    "Hobbies": {"ID": ("int", 0), "Progresso_Perc": ("int", 0)},
+    "Metas": {
+        "ID": ("int", 0),
+        "Meta_Valor": ("float", 0.0),
+        "Progresso_Atual": ("float", 0.0),
+        "Ano": ("int", _ano_atual),
+    },
+    "Wiki": {"ID": ("int", 0)},
+
+    # Faculdade
+    "Fac_Avaliacoes": {"Peso": ("float", 1.0), "Nota": ("float", 0.0), "Concluido": ("bool", False)},
+    "Fac_Materias": {"Semestre_Ref": ("int", 99)},
+
+    # Negócio
+    "CRM_Clientes": {"ID": ("int", 0)},
+    "CRM_Deals": {"Valor_Est": ("float", 0.0), "Faturado_Check": ("bool", False)},
+
+    # Viagens
+    "Viagens_Fin": {"Valor_Final_BRL": ("float", 0.0), "Pago": ("bool", False)},
+}
+
+def get_schema(aba):
+    return SCHEMAS.get(aba, {})
+
+def _default(valor):
+    return valor() if callable(valor) else valor
+
+def _para_bool(serie):
+    return serie.astype(str).str.strip().str.upper() == "TRUE"
+
+# --- LEITURA ---
+def aplicar_schema(aba, df):
+    """
+    Converte as colunas presentes no DF para os tipos do registro (uma operação por coluna).
+    Colunas fora do registro ficam como vieram da planilha.
+    """
+    schema = get_schema(aba)
+    if not schema or df is None or df.empty:
+        return df
+
+    for col, (tipo, default) in schema.items():
+        if col not in df.columns:
+            continue
+        if tipo == "bool":
+            df[col] = _para_bool(df[col])
+        elif tipo in ("float", "int"):
+            serie = pd.to_numeric(df[col], errors='coerce').fillna(_default(default))
+            df[col] = serie.astype(int) if tipo == "int" else serie.astype(float)
+        else:
+            df[col] = df[col].fillna(_default(default)).astype(str)
+    return df
+
+def completar_colunas(aba, df, cols):
+    """Cria as colunas que faltam no DF com o default do registro ('' se a coluna não é tipada)."""
+    schema = get_schema(aba)
+    for col in cols:
+        if col not in df.columns:
+            df[col] = _default(schema[col][1]) if col in schema else ""
+    return df
+
+# --- ESCRITA ---
+def serializar(aba, df):
+    """
+    DataFrame -> texto para subir. Colunas tipadas são formatadas pelo registro
+    (int sem ".0", bool como TRUE/FALSE, vazio em vez de "nan"); o resto vira str como antes.
+    Valores que não batem com o tipo (ex.: texto numa coluna numérica) sobem como estão.
+    """
+    df_txt = df.astype(str)
+    schema = get_schema(aba)
+    if not schema or df.empty:
+        return df_txt
+
+    for col, (tipo, _) in schema.items():
+        if col not in df.columns:
+            continue
+        original = df[col]
+        vazio = original.isna()
+        if tipo == "bool":
+            upper = original.astype(str).str.strip().str.upper()
+            df_txt[col] = upper.where(upper.isin(["TRUE", "FALSE"]), df_txt[col])
+        elif tipo in ("float", "int"):
+            num = pd.to_numeric(original, errors='coerce')
+            texto = num.astype(str)
+            if tipo == "int":
+                inteiro = np.isfinite(num) & (num == num.round())
+                texto = texto.where(~inteiro, num.where(inteiro, 0).astype("int64").astype(str))
+            df_txt[col] = texto.where(num.notna(), df_txt[col])
+        df_txt[col] = df_txt[col].where(~vazio, "")
+    return df_txt
@@ -1,8 +1,8 @@
 import streamlit as st
 import pandas as pd
-import requests
 from datetime import date
-from modules import conexoes
+from concurrent.futures import ThreadPoolExecutor
+from modules import conexoes, rede
 
 # --- CONFIGURAÇÃO API ---
 TMDB_BASE_URL = "https://api.themoviedb.org/3"
@@ -19,50 +19,103 @@ def load_data():
     df_master = conexoes.load_gsheet("Series_Master", ["ID_TMDB", "Titulo", "Status", "Poster_URL", "Total_Seasons"])
     df_log = conexoes.load_gsheet("Series_Log", ["ID_TMDB", "Titulo", "Temporada", "Episodio", "Nome_Epi", "Data_Estreia", "Visto", "Nota", "Data_Visto"])
     
-    if not df_master.empty: df_master["ID_TMDB"] = df_master["ID_TMDB"].astype(str)
-    if not df_log.empty:
-        df_log["ID_TMDB"] = df_log["ID_TMDB"].astype(str)
-        df_log["Temporada"] = pd.to_numeric(df_log["Temporada"], errors='coerce').fillna(0).astype(int)
-        df_log["Episodio"] = pd.to_numeric(df_log["Episodio"], errors='coerce').fillna(0).astype(int)
-        df_log["Nota"] = pd.to_numeric(df_log["Nota"], errors='coerce').fillna(0).astype(int)
-        df_log["Visto"] = df_log["Visto"].astype(str).str.upper() == "TRUE"
-        
+    # ID_TMDB (texto), Temporada/Episodio/Nota (int) e Visto (bool) vêm do registro de tipos
     return df_master, df_log
 
 def save_log(df):
-    df_save = df.copy()
-    df_save["Visto"] = df_save["Visto"].astype(str).str.upper()
-    conexoes.save_gsheet("Series_Log", df_save)
+    # Visto sobe como TRUE/FALSE pela serialização do registro de tipos
+    conexoes.save_gsheet("Series_Log", df)
+
+def save_master(df, df_original=None):
+    # Com o snapshot do load, sobe só as células/linhas alteradas
+    if df_original is not None:
+        conexoes.save_gsheet_diff("Series_Master", df_original, df)
+    else:
+        conexoes.save_gsheet("Series_Master", df)
+
+# --- SYNC DE EPISÓDIOS (TMDB) ---
+# O TMDB aceita até 20 itens no append_to_response: uma chamada /tv/{id} traz os detalhes
+# da série e 20 temporadas de uma vez; blocos seguintes (séries enormes) saem em paralelo.
+MAX_TEMPORADAS_POR_CHAMADA = 20
+MAX_WORKERS_TMDB = 4
+
+# Episódios novos aparecem na última temporada: o sync não reaproveita resposta com mais de 1h
+TTL_SYNC = 3600
+
+def _buscar_temporadas(tmdb_id, temporadas):
+    params = {"language": "pt-BR", "append_to_response": ",".join(f"season/{sn}" for sn in temporadas)}
+    return rede.get_json(f"{TMDB_BASE_URL}/tv/{tmdb_id}", params=params, headers=HEADERS, ttl=TTL_SYNC)
+
+def _blocos(inicio, fim):
+    return [range(a, min(a + MAX_TEMPORADAS_POR_CHAMADA, fim + 1)) for a in range(inicio, fim + 1, MAX_TEMPORADAS_POR_CHAMADA)]
+
+def sync_episodes(tmdb_id, titulo, df_log):
+    """
+    Busca só o que falta no Series_Log: as temporadas anteriores à última salva já estão completas,
+    então a busca começa na última (pode ter episódios novos) e vai até a seguinte ao total do TMDB.
+    Retorna (episódios que ainda não estão no log, total de temporadas da série).
+    """
+    log_serie = df_log[df_log['ID_TMDB'] == str(tmdb_id)]
+    inicio = max(int(log_serie['Temporada'].max()), 1) if not log_serie.empty else 1
 
-def save_master(df):
-    conexoes.save_gsheet("Series_Master", df)
+    # 1ª chamada: detalhes (number_of_seasons) + as próximas 20 temporadas
+    respostas = [_buscar_temporadas(tmdb_id, range(inicio, inicio + MAX_TEMPORADAS_POR_CHAMADA))]
+    total = int(respostas[0].get('number_of_seasons') or inicio)
+    restantes = _blocos(inicio + MAX_TEMPORADAS_POR_CHAMADA, total + 1)
+    if restantes:
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS_TMDB, len(restantes))) as pool:
+            respostas += list(pool.map(lambda bloco: _buscar_temporadas(tmdb_id, bloco), restantes))
 
-def fetch_all_episodes(tmdb_id, titulo, total_seasons):
+    ja_salvos = set(zip(log_serie['Temporada'].astype(int), log_serie['Episodio'].astype(int)))
     novos = []
-    total_seasons = max(1, int(total_seasons))
-    placeholder = st.empty()
-    bar = st.progress(0)
-    for sn in range(1, total_seasons + 2):
-        try:
-            url = f"{TMDB_BASE_URL}/tv/{tmdb_id}/season/{sn}?language=pt-BR"
-            r = requests.get(url, headers=HEADERS)
-            if r.status_code == 200:
-                data = r.json()
-                for ep in data.get('episodes', []):
-                    if ep.get('air_date'):
-                        novos.append({
-                            "ID_TMDB": str(tmdb_id), "Titulo": titulo,
-                            "Temporada": sn, "Episodio": ep['episode_number'],
-                            "Nome_Epi": ep['name'], "Data_Estreia": ep['air_date'],
-                            "Visto": False, "Nota": 0, "Data_Visto": ""
-                        })
-                placeholder.text(f"Baixando T{sn}...")
-            else:
-                if sn > 1: break 
-        except: pass
-        bar.progress(min(sn/(total_seasons+1), 1.0))
-    placeholder.empty(); bar.empty()
-    return novos
+    for resposta in respostas:
+        for chave, temporada in resposta.items():
+            # Temporada que não existe (ex.: total+1) volta ausente ou sem episódios
+            if not chave.startswith("season/") or not isinstance(temporada, dict):
+                continue
+            sn = int(chave.split("/")[1])
+            for ep in temporada.get('episodes', []):
+                if ep.get('air_date') and (sn, ep['episode_number']) not in ja_salvos:
+                    novos.append({
+                        "ID_TMDB": str(tmdb_id), "Titulo": titulo,
+                        "Temporada": sn, "Episodio": ep['episode_number'],
+                        "Nome_Epi": ep['name'], "Data_Estreia": ep['air_date'],
+                        "Visto": False, "Nota": 0, "Data_Visto": ""
+                    })
+    novos.sort(key=lambda e: (e["Temporada"], e["Episodio"]))
+    return novos, total
+
+def sync_series(series, df_log):
+    """
+    Sincroniza várias séries [(tmdb_id, titulo), ...] ao mesmo tempo.
+    Retorna (novos, {id: total de temporadas}, {id: erro}).
+    """
+    novos, totais, erros = [], {}, {}
+    if not series:
+        return novos, totais, erros
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS_TMDB, len(series))) as pool:
+        futuros = {pool.submit(sync_episodes, tmdb_id, titulo, df_log): tmdb_id for tmdb_id, titulo in series}
+        for futuro, tmdb_id in futuros.items():
+            try:
+                eps, totais[str(tmdb_id)] = futuro.result()
+                novos += eps
+            except Exception as e:
+                erros[str(tmdb_id)] = str(e)
+    return novos, totais, erros
+
+def atualizar_temporadas(df_master, totais):
+    """Series_Master com o Total_Seasons vindo do sync (só as linhas que mudaram diferem)."""
+    df = df_master.copy()
+    atual = pd.to_numeric(df['Total_Seasons'], errors='coerce')
+    novo = df['ID_TMDB'].astype(str).map(totais)
+    mudou = novo.notna() & (novo != atual)
+    df.loc[mudou, 'Total_Seasons'] = novo[mudou].astype(int)
+    return df, int(mudou.sum())
+
+def append_log(novos):
+    # Só as linhas novas sobem (values:append), sem reescrever o histórico de episódios
+    if novos:
+        conexoes.append_rows("Series_Log", pd.DataFrame(novos))
 
 # --- COMPONENTE DE RENDERIZAÇÃO DE SÉRIE ---
 def render_serie_card(serie, df_log, key_suffix, readonly=False):
@@ -110,8 +163,10 @@ def render_serie_card(serie, df_log, key_suffix, readonly=False):
                 if not temps:
                     st.warning("Sem episódios.")
                     if st.button("🔄 Baixar", key=f"sync_{serie['ID_TMDB']}_{key_suffix}"):
-                        eps = fetch_all_episodes(serie['ID_TMDB'], serie['Titulo'], serie['Total_Seasons'])
+                        with st.spinner("Baixando episódios..."):
+                            eps, _ = sync_episodes(serie['ID_TMDB'], serie['Titulo'], df_log)
                         if eps:
+                            append_log(eps)
                             st.rerun() 
                 else:
                     t_select = st.selectbox(f"Temp. ({serie['Titulo']})", temps, key=f"ts_{serie['ID_TMDB']}_{key_suffix}")
@@ -200,9 +255,9 @@ def render_page():
     with tab_add:
         q = st.text_input("Buscar Série", placeholder="Succession")
         if q:
-            url = f"{TMDB_BASE_URL}/search/tv?query={q}&language=pt-BR"
+            url = f"{TMDB_BASE_URL}/search/tv"
             try:
-                res = requests.get(url, headers=HEADERS).json().get('results', [])
+                res = rede.get_json(url, params={"query": q, "language": "pt-BR"}, headers=HEADERS).get('results', [])
                 for r in res[:3]:
                     with st.expander(f"{r['name']} ({r.get('first_air_date','')[:4]})"):
                         c_img, c_inf = st.columns([1,4])
@@ -212,14 +267,17 @@ def render_page():
                             if df_master[df_master['ID_TMDB']==str(r['id'])].empty:
                                 new_m = {"ID_TMDB":str(r['id']), "Titulo":r['name'], "Status":"Ativo", 
                                          "Poster_URL":r.get('poster_path'), "Total_Seasons":1}
-                                try:
-                                    det = requests.get(f"{TMDB_BASE_URL}/tv/{r['id']}", headers=HEADERS).json()
-                                    new_m['Total_Seasons'] = det.get('number_of_seasons', 1)
-                                except: pass
-                                conexoes.save_gsheet("Series_Master", pd.concat([df_master, pd.DataFrame([new_m])], ignore_index=True))
-                                eps = fetch_all_episodes(r['id'], r['name'], new_m['Total_Seasons'])
-                                if eps: save_log(pd.concat([df_log, pd.DataFrame(eps)], ignore_index=True))
-                                st.success("Adicionado!"); st.rerun()
+                                # Detalhes (total de temporadas) e episódios saem da mesma chamada
+                                eps = None
+                                with st.spinner("Baixando episódios..."):
+                                    try:
+                                        eps, new_m['Total_Seasons'] = sync_episodes(r['id'], r['name'], df_log)
+                                    except Exception as e:
+                                        st.error(f"Não foi possível baixar os episódios de {r['name']}: {e}")
+                                if eps is not None:
+                                    conexoes.append_rows("Series_Master", pd.DataFrame([new_m]))
+                                    append_log(eps)
+                                    st.success("Adicionado!"); st.rerun()
                             else: st.warning("Já existe.")
             except: pass
 
@@ -248,15 +306,31 @@ def render_page():
                 key="editor_status_master"
             )
             if st.button("💾 Salvar Status"):
+                df_master_novo = df_master.copy()
                 for i, row in edited_master.iterrows():
                     id_row = row['ID_TMDB']
-                    df_master.loc[df_master['ID_TMDB'] == id_row, 'Status'] = row['Status']
-                save_master(df_master); st.success("Atualizado!"); st.rerun()
+                    df_master_novo.loc[df_master_novo['ID_TMDB'] == id_row, 'Status'] = row['Status']
+                save_master(df_master_novo, df_original=df_master); st.success("Atualizado!"); st.rerun()
             
+            st.divider()
+            ativas = df_master[df_master['Status'] == 'Ativo']
+            if st.button(f"🔄 Buscar episódios novos ({len(ativas)} ativas)"):
+                with st.spinner("Consultando o TMDB..."):
+                    novos, totais, erros = sync_series(list(zip(ativas['ID_TMDB'], ativas['Titulo'])), df_log)
+                append_log(novos)
+                # Temporadas novas no TMDB: o master acompanha (só as células que mudaram)
+                df_master_novo, qtd_temporadas = atualizar_temporadas(df_master, totais)
+                if qtd_temporadas:
+                    save_master(df_master_novo, df_original=df_master)
+                for sid, erro in erros.items():
+                    st.error(f"Falha ao sincronizar {sid}: {erro}")
+                st.success(f"{len(novos)} episódios novos.")
+                if not erros: st.rerun()
+
             st.divider()
             del_serie = st.selectbox("Excluir Série", df_master['Titulo'].unique())
             if st.button("DELETAR SÉRIE"):
                 id_del = df_master[df_master['Titulo'] == del_serie].iloc[0]['ID_TMDB']
-                save_master(df_master[df_master['ID_TMDB'] != id_del])
+                save_master(df_master[df_master['ID_TMDB'] != id_del], df_original=df_master)
                 save_log(df_log[df_log['ID_TMDB'] != id_del])
                 st.success("Deletada."); st.rerun()
\ No newline at end of file
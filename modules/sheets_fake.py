@@ -0,0 +1,332 @@
+import pandas as pd
+import gspread
+from requests.exceptions import ReadTimeout
+from collections import Counter
+import threading
+import random
+import time
+import json
+import os
+
+# --- CLIENTE GSPREAD FALSO (em memória) ---
+# Substitui o cliente do conectar_gsheets para rodar as páginas sem credenciais e sem rede:
+#   SHEETS_FAKE=<pasta com <Aba>.csv ou um .json>  streamlit run main.py
+# ou, num script/benchmark: conexoes.set_cliente(FakeClient.de_dict({...}, latencia=0.2)).
+# Guarda as abas como listas de texto (igual o Sheets com RAW), conta as chamadas por método,
+# simula latência e injeta erros (timeout, 429, aba inexistente) nas próximas N chamadas.
+
+class _RespostaFake:
+    """O mínimo de um requests.Response que o gspread.exceptions.APIError usa."""
+
+    def __init__(self, codigo, mensagem, retry_after=None):
+        self.status_code = codigo
+        self.text = mensagem
+        self.headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+        self._erro = {"error": {"code": codigo, "message": mensagem, "status": "FAKE"}}
+
+    def json(self):
+        return self._erro
+
+def _criar_erro(tipo, metodo):
+    if isinstance(tipo, BaseException):
+        return tipo
+    if tipo == "timeout":
+        return ReadTimeout(f"timeout simulado em {metodo}")
+    if tipo == "429":
+        return gspread.exceptions.APIError(_RespostaFake(429, "Quota exceeded (simulado)", retry_after=1))
+    if tipo == "500":
+        return gspread.exceptions.APIError(_RespostaFake(500, "Internal error (simulado)"))
+    if tipo == "nao_encontrada":
+        return gspread.exceptions.WorksheetNotFound(f"aba simulada como inexistente ({metodo})")
+    raise ValueError(f"Tipo de erro desconhecido: {tipo}")
+
+def _nome_da_faixa(faixa):
+    # "'Aba'!A1:C3" -> "Aba"
+    nome = faixa.split("!")[0]
+    if nome.startswith("'") and nome.endswith("'"):
+        nome = nome[1:-1].replace("''", "'")
+    return nome
+
+class FakeClient:
+    """Cliente gspread falso. Todas as planilhas abertas compartilham as mesmas abas."""
+
+    def __init__(self, abas=None, latencia=0.0, jitter=0.0):
+        """
+        abas: {nome: DataFrame ou lista de linhas (a primeira é o cabeçalho)}.
+        latencia: segundos por chamada (float) ou {metodo: segundos}; jitter soma até +jitter s.
+        """
+        self.latencia = latencia
+        self.jitter = jitter
+        self.chamadas = Counter()
+        self._lock = threading.RLock()
+        self._erros = []  # [metodo ou "*", tipo, restantes]
+        self._planilha = FakeSpreadsheet(self)
+        for nome, dados in (abas or {}).items():
+            self._planilha._criar_aba(nome, dados)
+
+    # --- Fixtures ---
+    @classmethod
+    def de_dict(cls, abas, **kwargs):
+        return cls(abas, **kwargs)
+
+    @classmethod
+    def de_pasta(cls, caminho, **kwargs):
+        """Carrega um .json ({aba: [[linhas]]}) ou uma pasta com um <Aba>.csv por aba (tudo como texto)."""
+        abas = {}
+        if os.path.isfile(caminho):
+            with open(caminho, encoding="utf-8") as f:
+                abas = json.load(f)
+        else:
+            for arquivo in sorted(os.listdir(caminho)):
+                if arquivo.endswith(".csv"):
+                    df = pd.read_csv(os.path.join(caminho, arquivo), dtype=str, keep_default_na=False)
+                    abas[arquivo[:-4]] = df
+        return cls(abas, **kwargs)
+
+    def salvar_pasta(self, caminho):
+        """Grava o estado atual como fixture (um CSV por aba)."""
+        os.makedirs(caminho, exist_ok=True)
+        with self._lock:
+            for ws in self._planilha._abas.values():
+                valores = ws.get_all_values(_contar=False)
+                if valores:
+                    pd.DataFrame(valores[1:], columns=valores[0]).to_csv(
+                        os.path.join(caminho, f"{ws.title}.csv"), index=False
+                    )
+
+    # --- Controle do teste/benchmark ---
+    def injetar_erro(self, tipo, metodo="*", vezes=1):
+        """Faz as próximas `vezes` chamadas de `metodo` ("*" = qualquer) falharem com `tipo`:
+        "timeout", "429", "500", "nao_encontrada" ou uma exceção pronta."""
+        with self._lock:
+            self._erros.append([metodo, tipo, vezes])
+
+    def limpar_erros(self):
+        with self._lock:
+            self._erros.clear()
+
+    def zerar_contadores(self):
+        with self._lock:
+            self.chamadas.clear()
+
+    def total_chamadas(self):
+        with self._lock:
+            return sum(self.chamadas.values())
+
+    def _chamar(self, metodo):
+        # Conta, espera a latência simulada e dispara o erro injetado (se houver)
+        with self._lock:
+            self.chamadas[metodo] += 1
+            erro = None
+            for item in self._erros:
+                if item[0] in ("*", metodo) and item[2] > 0:
+                    item[2] -= 1
+                    erro = _criar_erro(item[1], metodo)
+                    break
+            self._erros = [item for item in self._erros if item[2] > 0]
+
+        espera = self.latencia.get(metodo, 0.0) if isinstance(self.latencia, dict) else self.latencia
+        if self.jitter:
+            espera += random.uniform(0, self.jitter)
+        if espera:
+            time.sleep(espera)
+        if erro is not None:
+            raise erro
+
+    # --- API do gspread.Client ---
+    def open(self, title, folder_id=None):
+        self._chamar("open")
+        self._planilha.title = title
+        return self._planilha
+
+    def open_by_key(self, key):
+        self._chamar("open_by_key")
+        return self._planilha
+
+class FakeSpreadsheet:
+    def __init__(self, cliente):
+        self._cliente = cliente
+        self.title = "Fake"
+        self.id = "fake-spreadsheet"
+        self._abas = {}
+        self._proximo_id = 1
+        self._modificado = time.time()  # modifiedTime do Drive (muda a cada escrita)
+
+    def _tocar(self):
+        self._modificado = max(time.time(), self._modificado + 1e-6)
+
+    def _criar_aba(self, nome, dados=None):
+        ws = FakeWorksheet(self, nome, self._proximo_id)
+        self._proximo_id += 1
+        if isinstance(dados, pd.DataFrame):
+            dados = [list(map(str, dados.columns))] + dados.astype(str).values.tolist()
+        ws._valores = [list(map(str, linha)) for linha in (dados or [])]
+        self._abas[nome] = ws
+        return ws
+
+    def worksheets(self, exclude_hidden=False):
+        self._cliente._chamar("worksheets")
+        with self._cliente._lock:
+            return list(self._abas.values())
+
+    def worksheet(self, title):
+        self._cliente._chamar("worksheet")
+        with self._cliente._lock:
+            if title not in self._abas:
+                raise gspread.exceptions.WorksheetNotFound(title)
+            return self._abas[title]
+
+    def add_worksheet(self, title, rows=100, cols=26, index=None):
+        self._cliente._chamar("add_worksheet")
+        with self._cliente._lock:
+            self._tocar()
+            return self._criar_aba(title)
+
+    def get_lastUpdateTime(self):
+        self._cliente._chamar("get_lastUpdateTime")
+        with self._cliente._lock:
+            return pd.Timestamp(self._modificado, unit="s", tz="UTC").isoformat()
+
+    def values_batch_get(self, ranges, params=None):
+        self._cliente._chamar("values_batch_get")
+        with self._cliente._lock:
+            value_ranges = []
+            for faixa in ranges:
+                nome = _nome_da_faixa(faixa)
+                if nome not in self._abas:
+                    raise gspread.exceptions.APIError(_RespostaFake(400, f"Unable to parse range: {faixa}"))
+                valores = self._abas[nome].get_all_values(_contar=False)
+                vr = {"range": faixa, "majorDimension": "ROWS"}
+                if valores:
+                    vr["values"] = valores
+                value_ranges.append(vr)
+            return {"spreadsheetId": self.id, "valueRanges": value_ranges}
+
+    def batch_update(self, body):
+        """Suporta os requests usados pelo conexoes: updateCells, deleteDimension (linhas) e appendCells."""
+        self._cliente._chamar("batch_update")
+        with self._cliente._lock:
+            self._tocar()
+            por_id = {ws.id: ws for ws in self._abas.values()}
+            for req in body.get("requests", []):
+                if "updateCells" in req:
+                    r = req["updateCells"]
+                    ws = por_id[r["start"]["sheetId"]]
+                    for i, linha in enumerate(r["rows"]):
+                        for j, celula in enumerate(linha["values"]):
+                            ws._set(r["start"]["rowIndex"] + i, r["start"]["columnIndex"] + j, _valor_celula(celula))
+                elif "deleteDimension" in req:
+                    faixa = req["deleteDimension"]["range"]
+                    ws = por_id[faixa["sheetId"]]
+                    del ws._valores[faixa["startIndex"]:faixa["endIndex"]]
+                elif "appendCells" in req:
+                    r = req["appendCells"]
+                    ws = por_id[r["sheetId"]]
+                    for linha in r["rows"]:
+                        ws._valores.append([_valor_celula(c) for c in linha["values"]])
+                else:
+                    raise NotImplementedError(f"Request não suportado no fake: {list(req)}")
+            return {"spreadsheetId": self.id, "replies": []}
+
+def _valor_celula(celula):
+    valor = celula.get("userEnteredValue", {})
+    for chave in ("stringValue", "numberValue", "boolValue"):
+        if chave in valor:
+            return str(valor[chave])
+    return ""
+
+class FakeWorksheet:
+    def __init__(self, planilha, title, sheet_id):
+        self._planilha = planilha
+        self._cliente = planilha._cliente
+        self.title = title
+        self.id = sheet_id
+        self._valores = []
+        self._colunas_extra = 0
+
+    @property
+    def col_count(self):
+        largura = max((len(linha) for linha in self._valores), default=0)
+        return max(largura, 26) + self._colunas_extra
+
+    @property
+    def row_count(self):
+        return max(len(self._valores), 1000)
+
+    def _set(self, linha, coluna, valor):
+        self._planilha._tocar()
+        while len(self._valores) <= linha:
+            self._valores.append([])
+        atual = self._valores[linha]
+        while len(atual) <= coluna:
+            atual.append("")
+        atual[coluna] = valor
+
+    def _sem_vazias_no_fim(self):
+        valores = [list(linha) for linha in self._valores]
+        while valores and not any(str(v) for v in valores[-1]):
+            valores.pop()
+        return valores
+
+    # --- Leitura ---
+    def get_all_values(self, _contar=True):
+        if _contar:
+            self._cliente._chamar("get_all_values")
+        with self._cliente._lock:
+            return gspread.utils.fill_gaps(self._sem_vazias_no_fim()) if self._valores else []
+
+    def get_all_records(self, **kwargs):
+        self._cliente._chamar("get_all_records")
+        with self._cliente._lock:
+            valores = gspread.utils.fill_gaps(self._sem_vazias_no_fim()) if self._valores else []
+        if not valores:
+            return []
+        cabecalho, linhas = valores[0], valores[1:]
+        linhas = [gspread.utils.numericise_all(linha) for linha in linhas]
+        return gspread.utils.to_records(cabecalho, linhas)
+
+    def row_values(self, row, **kwargs):
+        self._cliente._chamar("row_values")
+        with self._cliente._lock:
+            if row - 1 >= len(self._valores):
+                return []
+            linha = list(self._valores[row - 1])
+        while linha and linha[-1] == "":
+            linha.pop()
+        return linha
+
+    # --- Escrita ---
+    def clear(self):
+        self._cliente._chamar("clear")
+        with self._cliente._lock:
+            self._planilha._tocar()
+            self._valores = []
+
+    def update(self, values=None, range_name=None, **kwargs):
+        self._cliente._chamar("update")
+        # Aceita a ordem antiga do gspread (range_name, values) também
+        if isinstance(values, str):
+            values, range_name = range_name, values
+        linha0, coluna0 = gspread.utils.a1_to_rowcol(range_name.split("!")[-1].split(":")[0]) if range_name else (1, 1)
+        with self._cliente._lock:
+            for i, linha in enumerate(values or []):
+                for j, valor in enumerate(linha):
+                    self._set(linha0 - 1 + i, coluna0 - 1 + j, str(valor))
+        return {"updatedRows": len(values or [])}
+
+    def append_rows(self, values, value_input_option="RAW", insert_data_option=None, table_range=None, **kwargs):
+        self._cliente._chamar("append_rows")
+        with self._cliente._lock:
+            self._planilha._tocar()
+            self._valores = self._sem_vazias_no_fim()
+            for linha in values:
+                self._valores.append([str(v) for v in linha])
+        return {"updates": {"updatedRows": len(values)}}
+
+    def append_row(self, values, **kwargs):
+        return self.append_rows([values], **kwargs)
+
+    def add_cols(self, cols):
+        self._cliente._chamar("add_cols")
+        with self._cliente._lock:
+            self._colunas_extra += cols
@@ -0,0 +1,239 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+from modules import mercado
+
+# --- SIMULAÇÃO DE CENÁRIOS (MONTE CARLO) ---
+# Sorteia caminhos mensais de CDI, IPCA e DY e o reajuste anual do salário para N cenários
+# e roda a mesma conta do projetar_futuro em todos ao mesmo tempo. Os arrays são
+# (meses x cenários): o laço é só nos meses e cada passo é uma operação NumPy nos N cenários.
+# CDI e IPCA seguem um AR(1) ajustado ao histórico do BCB (mercado.parametros_ar1).
+
+CENARIOS_PADRAO = 20000
+PERCENTIS = (5, 25, 50, 75, 95)
+
+# DY da carteira: desvio relativo de longo prazo em volta do DY atual e persistência mensal
+VOL_DY = 0.15
+PERSISTENCIA_DY = 0.95
+
+# Reajuste anual = IPCA acumulado no ano x (1 + ganho real sorteado), nunca abaixo de zero
+GANHO_REAL_MEDIO = 0.01
+GANHO_REAL_DESVIO = 0.02
+
+def sortear_ar1(rng, n, meses, inicio, media, phi, sigma, minimo=0.0):
+    """Caminhos (meses x n) de um AR(1) mensal que parte de `inicio`, cortados em `minimo`."""
+    caminhos = rng.standard_normal((meses, n), dtype=np.float32)
+    caminhos *= sigma
+    desvio = np.full(n, inicio - media, dtype=np.float32)
+    for t in range(meses):
+        desvio *= phi
+        desvio += caminhos[t]
+        caminhos[t] = desvio
+    caminhos += media
+    return np.maximum(caminhos, minimo, out=caminhos)
+
+def _rotulos_meses(meses):
+    inicio = pd.Timestamp(datetime.now().date()).replace(day=1)
+    return pd.date_range(inicio, periods=meses, freq="MS").strftime("%b/%y")
+
+def simular(salario, div_inicial, patrimonio_fii, saldo_cdi, config_pesos, dy_mensal, teto_cdi, gastos,
+            n=CENARIOS_PADRAO, semente=None, reais=False):
+    """
+    Projeção do projetar_futuro em n cenários sorteados.
+    gastos: total de cartão + financiamentos de cada mês (o tamanho define o horizonte).
+    reais: valores das faixas em dinheiro de hoje (descontando o IPCA sorteado).
+    Retorna (faixas, probabilidade): percentis por mês de Patrimônio FII, Renda Passiva e Reserva
+    (formato longo) e a chance de a reserva já ter batido o teto até cada mês.
+    """
+    gastos = np.asarray(gastos, dtype=np.float32)
+    meses = len(gastos)
+    rng = np.random.default_rng(semente)
+
+    # 1. Caminhos (meses x cenários)
+    cdi = sortear_ar1(rng, n, meses, mercado.ultima_taxa("CDI")[0], *mercado.parametros_ar1("CDI"))
+    ipca = sortear_ar1(rng, n, meses, mercado.ultima_taxa("IPCA")[0], *mercado.parametros_ar1("IPCA"), minimo=-0.01)
+    choque_dy = VOL_DY * np.sqrt(1 - PERSISTENCIA_DY ** 2)
+    dy = sortear_ar1(rng, n, meses, 0.0, 0.0, PERSISTENCIA_DY, choque_dy, minimo=-np.inf)
+    dy = np.exp(dy, out=dy)
+    dy *= dy_mensal
+    ganho_real = rng.normal(GANHO_REAL_MEDIO, GANHO_REAL_DESVIO, size=(meses // 12 + 1, n)).astype(np.float32)
+
+    peso_fii = config_pesos.get('p_fii', 0.25)
+    peso_cdi = config_pesos.get('p_cdi', 0.25)
+    soma_pesos = peso_fii + peso_cdi
+    if soma_pesos == 0: soma_pesos = 1
+
+    # 2. Estado de cada cenário
+    sal = np.full(n, salario, dtype=np.float32)
+    base_div = div_inicial / dy_mensal if dy_mensal > 0 else 0.0  # patrimônio que paga o dividendo atual
+    aportado = np.zeros(n, dtype=np.float32)
+    reserva = np.full(n, saldo_cdi, dtype=np.float32)
+    div = np.full(n, div_inicial, dtype=np.float32)
+    inflacao_ano = np.ones(n, dtype=np.float32)
+    deflator = np.ones(n, dtype=np.float32)
+    ja_bateu = np.zeros(n, dtype=bool)
+
+    patrimonio = np.empty((meses, n), dtype=np.float32)
+    renda = np.empty((meses, n), dtype=np.float32)
+    saldo_reserva = np.empty((meses, n), dtype=np.float32)
+    probabilidade = np.empty(meses)
+
+    for t in range(meses):
+        if t > 0 and t % 12 == 0:
+            sal *= np.maximum(inflacao_ano * (1 + ganho_real[t // 12]), 1.0)
+            inflacao_ano[:] = 1.0
+        aporte = np.maximum(sal + div - gastos[t], 0.0)
+        aportado += aporte * (peso_fii / soma_pesos)
+        reserva = reserva * (1 + cdi[t]) + aporte * (peso_cdi / soma_pesos)
+        div = (base_div + aportado) * dy[t]
+        inflacao_ano *= 1 + ipca[t]
+        deflator *= 1 + ipca[t]
+
+        ja_bateu |= reserva >= teto_cdi
+        probabilidade[t] = ja_bateu.mean()
+        divisor = deflator if reais else 1.0
+        np.divide(patrimonio_fii + aportado, divisor, out=patrimonio[t])
+        np.divide(div, divisor, out=renda[t])
+        np.divide(reserva, divisor, out=saldo_reserva[t])
+
+    # 3. Percentis por mês (ordenar a linha inteira sai mais barato que np.percentile aqui)
+    rotulos = _rotulos_meses(meses)
+    posicoes = np.round(np.array(PERCENTIS) / 100 * (n - 1)).astype(int)
+    faixas = []
+    for nome, valores in (("Patrimônio FII", patrimonio), ("Renda Passiva", renda), ("Reserva", saldo_reserva)):
+        valores.sort(axis=1)
+        df = pd.DataFrame(valores[:, posicoes], columns=[f"P{q}" for q in PERCENTIS])
+        df.insert(0, "Série", nome)
+        df.insert(0, "Mês", rotulos)
+        faixas.append(df)
+    return (
+        pd.concat(faixas, ignore_index=True),
+        pd.DataFrame({"Mês": rotulos, "Probabilidade": probabilidade}),
+    )
+
+# --- PROJEÇÃO DETALHADA EM LOTE (VÁRIAS ALOCAÇÕES) ---
+# A mesma conta da "Projeção Detalhada - 60 Meses" com as alocações no segundo eixo:
+# arrays (meses x alocações), laço só nos meses. Uma alocação = (peso FIIs, peso CDI);
+# o resto do salário é estilo de vida (Lazer, Casa, Carro, Vida).
+
+PASSO_VARREDURA = 0.05
+
+def projetar_alocacoes(salario, pesos_fii, pesos_cdi, yield_fii, yield_cdi, meses=60, reajuste_anual=0.05, meses_reserva=6, salarios=None):
+    """
+    Projeção Detalhada para A alocações de uma vez (pesos_fii/pesos_cdi com A valores).
+    A reserva alvo é `meses_reserva` salários; cheia, o peso do CDI passa para os FIIs.
+    yield_fii/yield_cdi: taxa mensal fixa ou caminhos (meses x A); salarios: caminho do salário
+    (meses,) ou (meses x A) no lugar do reajuste fixo (é assim que entram os cenários sorteados).
+    Retorna {coluna: array (meses x A)} mais "Salário" e "Mês Reserva" (A,),
+    o primeiro mês (1..meses) com a reserva no alvo, ou NaN se não chegar.
+    """
+    pesos_fii = np.atleast_1d(np.asarray(pesos_fii, dtype=float))
+    pesos_cdi = np.atleast_1d(np.asarray(pesos_cdi, dtype=float))
+    a = len(pesos_fii)
+
+    # Salário em degraus (reajuste a cada 12 meses), igual para todas as alocações
+    if salarios is None:
+        salarios = salario * (1 + reajuste_anual) ** (np.arange(meses) // 12)
+    sal_mes = np.broadcast_to(np.reshape(salarios, (meses, -1)), (meses, a))
+    yield_fii = np.broadcast_to(yield_fii, (meses, a))
+    yield_cdi = np.broadcast_to(yield_cdi, (meses, a))
+
+    cheia = np.empty((meses, a), dtype=bool)
+    aporte = np.empty((meses, a))
+    patrimonio = np.empty((meses, a))
+    renda = np.empty((meses, a))
+    saldo_reserva = np.empty((meses, a))
+
+    saldo_fiis = np.zeros(a)
+    reserva = np.zeros(a)
+    dividendos = np.zeros(a)
+    for t in range(meses):
+        sal = sal_mes[t]
+        cheia[t] = reserva >= sal * meses_reserva
+        # Reserva cheia: o fluxo do CDI vai para os FIIs
+        aporte[t] = sal * np.where(cheia[t], pesos_fii + pesos_cdi, pesos_fii) + dividendos
+        saldo_fiis += aporte[t]
+        reserva = (reserva + sal * np.where(cheia[t], 0.0, pesos_cdi)) * (1 + yield_cdi[t])
+        dividendos = saldo_fiis * yield_fii[t]
+        patrimonio[t], renda[t], saldo_reserva[t] = saldo_fiis, dividendos, reserva
+
+    completa = saldo_reserva >= sal_mes * meses_reserva
+    mes_reserva = np.where(completa.any(axis=0), completa.argmax(axis=0) + 1.0, np.nan)
+    return {
+        "Salário": salarios,
+        "Reserva Cheia": cheia,
+        "Aporte FIIs (+Div)": aporte,
+        "Patrimônio FIIs": patrimonio,
+        "Renda Passiva": renda,
+        "Saldo Reserva": saldo_reserva,
+        "Mês Reserva": mes_reserva,
+    }
+
+def cenarios_alocacao(salario, yield_fii, cdi_ar1, cdi_inicio, meses=60, n=1000, semente=0, reajuste_anual=0.05, desvio_reajuste=0.02):
+    """
+    Caminhos (meses x n) de salário, yield dos FIIs e CDI para a Projeção Detalhada.
+    cdi_ar1 = (média, phi, sigma) de mercado.parametros_ar1; a mesma semente gera os mesmos
+    cenários (todas as alocações comparadas contra os mesmos sorteios).
+    """
+    rng = np.random.default_rng(semente)
+    yield_cdi = sortear_ar1(rng, n, meses, cdi_inicio, *cdi_ar1)
+    choque_dy = VOL_DY * np.sqrt(1 - PERSISTENCIA_DY ** 2)
+    dy = sortear_ar1(rng, n, meses, 0.0, 0.0, PERSISTENCIA_DY, choque_dy, minimo=-np.inf)
+    dy = np.exp(dy, out=dy)
+    dy *= yield_fii
+    reajustes = np.maximum(rng.normal(reajuste_anual, desvio_reajuste, size=(meses // 12 + 1, n)), 0.0)
+    reajustes[0] = 0.0  # o primeiro ano é o salário atual
+    fatores = np.cumprod(1 + reajustes, axis=0)[np.arange(meses) // 12]
+    return {"salarios": salario * fatores, "yield_fii": dy, "yield_cdi": yield_cdi}
+
+def avaliar_alocacoes(pesos_fii, pesos_cdi, cenarios, mes_limite, meses_reserva=6):
+    """
+    Cada alocação contra todos os cenários: (renda passiva mediana no último mês,
+    fração dos cenários com a reserva completa até `mes_limite`), um valor por alocação.
+    """
+    pesos_fii = np.atleast_1d(np.asarray(pesos_fii, dtype=float))
+    pesos_cdi = np.atleast_1d(np.asarray(pesos_cdi, dtype=float))
+    meses, n = cenarios["yield_cdi"].shape
+    c = len(pesos_fii)
+    # Colunas = alocação x cenário (alocação 0 nos n primeiros, depois a 1, ...)
+    r = projetar_alocacoes(
+        None, np.repeat(pesos_fii, n), np.repeat(pesos_cdi, n),
+        np.tile(cenarios["yield_fii"], (1, c)), np.tile(cenarios["yield_cdi"], (1, c)),
+        meses=meses, meses_reserva=meses_reserva, salarios=np.tile(cenarios["salarios"], (1, c)),
+    )
+    renda = np.median(r["Renda Passiva"][-1].reshape(c, n), axis=1)
+    no_prazo = (r["Mês Reserva"].reshape(c, n) <= mes_limite).mean(axis=1)  # NaN conta como não
+    return renda, no_prazo
+
+def fronteira_pareto(renda, mes_reserva):
+    """Máscara das alocações não dominadas: mais renda e reserva completa mais cedo (NaN = nunca)."""
+    mes = np.where(np.isnan(mes_reserva), np.inf, mes_reserva)
+    ordem = np.lexsort((-renda, mes))  # mês crescente; no mesmo mês, maior renda primeiro
+    melhor_antes = np.concatenate([[-np.inf], np.maximum.accumulate(renda[ordem])[:-1]])
+    mascara = np.zeros(len(renda), dtype=bool)
+    mascara[ordem] = renda[ordem] > melhor_antes
+    return mascara
+
+def varrer_pesos(salario, yield_fii, yield_cdi, passo=PASSO_VARREDURA, estilo_minimo=0.0, meses=60, reajuste_anual=0.05, meses_reserva=6):
+    """
+    Todas as alocações da grade (FIIs, CDI em múltiplos de `passo`, estilo de vida >= estilo_minimo)
+    num lote só. Uma linha por alocação, com a renda e o patrimônio no último mês,
+    o mês em que a reserva completa e se a alocação está na fronteira de Pareto.
+    """
+    grade = np.round(np.arange(0, 1 + passo / 2, passo), 4)
+    fii, cdi = (g.ravel() for g in np.meshgrid(grade, grade, indexing="ij"))
+    validas = fii + cdi <= 1 - estilo_minimo + 1e-9
+    fii, cdi = fii[validas], cdi[validas]
+
+    r = projetar_alocacoes(salario, fii, cdi, yield_fii, yield_cdi, meses, reajuste_anual, meses_reserva)
+    df = pd.DataFrame({
+        "FIIs": fii,
+        "CDI": cdi,
+        "Estilo de Vida": np.round(1 - fii - cdi, 4) + 0.0,  # + 0.0 tira o -0.0
+        "Renda Passiva": r["Renda Passiva"][-1],
+        "Patrimônio FIIs": r["Patrimônio FIIs"][-1],
+        "Mês Reserva": r["Mês Reserva"],
+    })
+    df["Pareto"] = fronteira_pareto(df["Renda Passiva"].to_numpy(), df["Mês Reserva"].to_numpy())
+    return df
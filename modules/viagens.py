@@ -20,14 +20,9 @@ def load_data_sheet(aba, columns):
             if "Valor" in col or "Cotacao" in col or "lat" in col or "lon" in col:
                 df[col] = 0.0
             elif col == "Moeda": df[col] = "BRL"
-            elif col == "Pago": df[col] = "FALSE"
+            elif col == "Pago": df[col] = False
             else: df[col] = ""
-            
-    # Saneamento de Tipos para cálculos
-    if "Valor_Final_BRL" in df.columns:
-        df["Valor_Final_BRL"] = pd.to_numeric(df["Valor_Final_BRL"], errors='coerce').fillna(0.0)
-    if "Pago" in df.columns:
-        df["Pago"] = df["Pago"].astype(str).str.upper() == "TRUE"
+    # Valor_Final_BRL/Pago já vêm tipados pelo registro de tipos (modules/schemas.py)
         
     return df
 
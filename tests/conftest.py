@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modules import agendador, conexoes
+from modules.sheets_fake import FakeClient
+
+@pytest.fixture(autouse=True)
+def agendador_rapido(monkeypatch):
+    """Buckets folgados e backoff curto: os testes não esperam o limite da API."""
+    monkeypatch.setattr(agendador, "_buckets", {
+        tipo: agendador.TokenBucket(1000, 1000.0) for tipo in ("leitura", "escrita")
+    })
+    monkeypatch.setattr(agendador, "BACKOFF_BASE", 0.001)
+    monkeypatch.setattr(agendador, "_retry_after", lambda erro: 0.001)
+
+@pytest.fixture
+def planilha_fake():
+    """Devolve uma função que instala um FakeClient com as abas dadas no conexoes."""
+    def _instalar(abas):
+        cliente = FakeClient.de_dict(abas)
+        conexoes.set_cliente(cliente)
+        return cliente
+
+    yield _instalar
+    conexoes._cabecalhos.clear()
+    conexoes.set_cliente(None)
@@ -0,0 +1,133 @@
+import pandas as pd
+import pytest
+from requests.exceptions import ReadTimeout
+
+from modules import agendador, conexoes
+from modules.sheets_fake import _criar_erro
+
+# --- DUBLÊ ---
+class Chamada:
+    """Função que falha com os erros dados (um por chamada) e depois responde "ok"."""
+
+    def __init__(self, *erros):
+        self.erros = list(erros)
+        self.vezes = 0
+
+    def __call__(self):
+        self.vezes += 1
+        if self.erros:
+            raise self.erros.pop(0)
+        return "ok"
+
+# --- executar ---
+def test_escrita_nao_idempotente_sem_verificar_sobe_incerta():
+    chamada = Chamada(_criar_erro("500", "append_rows"))
+    with pytest.raises(agendador.EscritaIncerta):
+        agendador.executar("escrita", chamada)
+    assert chamada.vezes == 1
+
+def test_escrita_timeout_sem_verificar_sobe_incerta():
+    chamada = Chamada(ReadTimeout("timeout"))
+    with pytest.raises(agendador.EscritaIncerta):
+        agendador.executar("escrita", chamada)
+    assert chamada.vezes == 1
+
+def test_escrita_ja_aplicada_nao_reenvia():
+    chamada = Chamada(_criar_erro("500", "append_rows"))
+    assert agendador.executar("escrita", chamada, verificar=lambda: True) is None
+    assert chamada.vezes == 1
+
+def test_escrita_nao_aplicada_reenvia():
+    chamada = Chamada(_criar_erro("500", "append_rows"))
+    assert agendador.executar("escrita", chamada, verificar=lambda: False) == "ok"
+    assert chamada.vezes == 2
+
+def test_verificar_que_falha_sobe_incerta():
+    def verificar():
+        raise ReadTimeout("releitura")
+
+    chamada = Chamada(_criar_erro("500", "append_rows"))
+    with pytest.raises(agendador.EscritaIncerta):
+        agendador.executar("escrita", chamada, verificar=verificar)
+    assert chamada.vezes == 1
+
+def test_escrita_incerta_nao_e_transitoria():
+    assert not agendador.eh_transitorio(agendador.EscritaIncerta("x"))
+
+def test_429_na_escrita_repete_sem_verificar():
+    chamada = Chamada(_criar_erro("429", "append_rows"), _criar_erro("429", "append_rows"))
+    assert agendador.executar("escrita", chamada) == "ok"
+    assert chamada.vezes == 3
+
+def test_escrita_idempotente_repete_no_500():
+    chamada = Chamada(_criar_erro("500", "update"))
+    assert agendador.executar("escrita", chamada, idempotente=True) == "ok"
+    assert chamada.vezes == 2
+
+def test_leitura_repete_no_timeout():
+    chamada = Chamada(ReadTimeout("timeout"), _criar_erro("500", "get_all_values"))
+    assert agendador.executar("leitura", chamada) == "ok"
+    assert chamada.vezes == 3
+
+def test_erro_nao_transitorio_sobe_direto():
+    chamada = Chamada(ValueError("dado ruim"))
+    with pytest.raises(ValueError):
+        agendador.executar("escrita", chamada, verificar=lambda: False)
+    assert chamada.vezes == 1
+
+def test_desiste_depois_de_max_tentativas():
+    chamada = Chamada(*[ReadTimeout("timeout")] * agendador.MAX_TENTATIVAS)
+    with pytest.raises(ReadTimeout):
+        agendador.executar("leitura", chamada)
+    assert chamada.vezes == agendador.MAX_TENTATIVAS
+
+# --- _sheets_anexar contra o FakeClient ---
+def _log():
+    return pd.DataFrame([["2025-01-01", "Café", "5"], ["2025-01-01", "Café", "5"]], columns=["Data", "Item", "Valor"])
+
+def test_anexar_500_antes_de_aplicar_reenvia_mesmo_com_fim_igual(planilha_fake):
+    # As duas últimas linhas já são iguais à nova: só o tamanho diz que o append não entrou
+    cliente = planilha_fake({"Gastos": _log()})
+    conexoes.get_worksheet("Gastos")
+    cliente.injetar_erro("500", "append_rows")
+
+    conexoes._sheets_anexar("Gastos", _log().iloc[[0]])
+
+    assert cliente.chamadas["append_rows"] == 2
+    assert len(conexoes.get_worksheet("Gastos").get_all_values(_contar=False)) == 4
+
+def test_anexar_resposta_perdida_nao_duplica(planilha_fake, monkeypatch):
+    cliente = planilha_fake({"Gastos": _log()})
+    ws = conexoes.get_worksheet("Gastos")
+    original = ws.append_rows
+    perdidas = [_criar_erro("500", "append_rows")]
+
+    def append_sem_resposta(*args, **kwargs):
+        resposta = original(*args, **kwargs)
+        if perdidas:
+            raise perdidas.pop()
+        return resposta
+
+    monkeypatch.setattr(ws, "append_rows", append_sem_resposta)
+
+    conexoes._sheets_anexar("Gastos", _log().iloc[[0]])
+
+    assert cliente.chamadas["append_rows"] == 1
+    assert len(ws.get_all_values(_contar=False)) == 4
+
+def test_anexar_com_outra_escrita_no_meio_sobe_incerta(planilha_fake, monkeypatch):
+    # A aba cresceu mais do que o enviado: não dá para saber se o append entrou
+    planilha_fake({"Gastos": _log()})
+    ws = conexoes.get_worksheet("Gastos")
+    original = ws.append_rows
+
+    def append_e_outra_escrita(*args, **kwargs):
+        original(*args, **kwargs)
+        original([["2025-01-02", "Pão", "3"]])
+        raise _criar_erro("500", "append_rows")
+
+    monkeypatch.setattr(ws, "append_rows", append_e_outra_escrita)
+
+    with pytest.raises(agendador.EscritaIncerta):
+        conexoes._sheets_anexar("Gastos", _log().iloc[[0]])
+    assert len(ws.get_all_values(_contar=False)) == 5
@@ -0,0 +1,182 @@
+import pandas as pd
+import pytest
+
+from modules import agendador, armazenamento, conexoes
+from modules.sheets_fake import _criar_erro
+
+# --- DADOS ---
+COLUNAS = ["Data", "Nome", "Valor"]
+
+def _aba():
+    return pd.DataFrame(
+        [["2025-01-01", "a", "1"], ["2025-01-02", "b", "2"], ["2025-01-03", "c", "3"], ["2025-01-04", "d", "4"]],
+        columns=COLUNAS,
+    )
+
+def _como_texto(valores):
+    return pd.DataFrame(valores[1:], columns=valores[0])
+
+# --- calcular_diff / aplicar_diff ---
+def test_calcular_diff_celulas_removidas_e_novas():
+    orig = _aba()
+    edit = orig.drop(index=1)
+    edit.loc[2, "Valor"] = "30"
+    edit.loc[4] = ["2025-01-05", "e", "5"]
+
+    comuns, removidas, novas, linhas_mud, cols_mud = armazenamento.calcular_diff(orig, edit)
+
+    assert list(removidas) == [1]
+    assert novas == [4]
+    # Posições dentro de `comuns`: só a célula Valor do rótulo 2 mudou
+    assert [comuns[r] for r in linhas_mud] == [2]
+    assert [COLUNAS[c] for c in cols_mud] == ["Valor"]
+
+def test_calcular_diff_sem_mudanca():
+    orig = _aba()
+    comuns, removidas, novas, linhas_mud, _ = armazenamento.calcular_diff(orig, orig.copy())
+    assert list(comuns) == [0, 1, 2, 3]
+    assert len(removidas) == 0 and novas == [] and len(linhas_mud) == 0
+
+@pytest.mark.parametrize("orig, edit", [
+    (_aba(), _aba().rename(columns={"Valor": "Preco"})),
+    (_aba(), _aba()[["Nome", "Data", "Valor"]]),
+    (_aba(), _aba().set_index(pd.Index([0, 0, 1, 2]))),
+    # O snapshot precisa ter as posições da aba como rótulos
+    (_aba().set_index(pd.Index(["x", "y", "z", "w"])), _aba()),
+    (_aba().set_index(pd.Index([-1, 0, 1, 2])), _aba()),
+])
+def test_calcular_diff_estrutura_mudou(orig, edit):
+    assert armazenamento.calcular_diff(orig, edit) is None
+
+def test_aplicar_diff_usa_rotulos_como_posicao():
+    # Apagar o rótulo 1 não desloca os outros: o rótulo 3 continua sendo a 4ª linha da aba
+    orig = _aba()
+    edit = orig.drop(index=1)
+    edit.loc[3, "Nome"] = "D"
+    edit.loc[7] = ["2025-01-05", "e", "5"]
+
+    resultado = armazenamento.aplicar_diff(orig.copy(), orig, edit)
+
+    assert resultado.values.tolist() == [
+        ["2025-01-01", "a", "1"],
+        ["2025-01-03", "c", "3"],
+        ["2025-01-04", "D", "4"],
+        ["2025-01-05", "e", "5"],
+    ]
+
+def test_aplicar_diff_preserva_colunas_fora_do_frame():
+    atual = _aba().assign(Obs=["x", "y", "z", "w"])
+    orig = _aba()
+    edit = orig.drop(index=[0, 2])
+    edit.loc[3, "Valor"] = "40"
+
+    resultado = armazenamento.aplicar_diff(atual, orig, edit)
+
+    assert list(resultado.columns) == COLUNAS + ["Obs"]
+    assert resultado.values.tolist() == [["2025-01-02", "b", "2", "y"], ["2025-01-04", "d", "40", "w"]]
+
+def test_aplicar_diff_estrutura_mudou_vira_aba_inteira():
+    orig = _aba()
+    edit = orig.rename(columns={"Valor": "Preco"})
+    resultado = armazenamento.aplicar_diff(orig.copy(), orig, edit)
+    assert list(resultado.columns) == ["Data", "Nome", "Preco"]
+    assert resultado.values.tolist() == orig.values.tolist()
+
+# --- _sheets_salvar_diff contra o FakeClient ---
+def test_salvar_diff_remove_edita_e_anexa(planilha_fake):
+    cliente = planilha_fake({"Log": _aba()})
+    orig = _aba()
+    edit = orig.drop(index=[1, 2])
+    edit.loc[3, "Valor"] = "40"
+    edit.loc[4] = ["2025-01-05", "e", "5"]
+
+    resumo = conexoes._sheets_salvar_diff("Log", orig, edit)
+
+    assert resumo == {"modo": "diff", "celulas": 1, "inseridas": 1, "removidas": 2}
+    assert cliente.chamadas["batch_update"] == 1
+    assert cliente.chamadas["clear"] == 0
+    valores = conexoes.get_worksheet("Log").get_all_values(_contar=False)
+    assert _como_texto(valores).equals(armazenamento.aplicar_diff(orig.copy(), orig, edit))
+    assert valores[1:] == [["2025-01-01", "a", "1"], ["2025-01-04", "d", "40"], ["2025-01-05", "e", "5"]]
+
+def test_salvar_diff_com_colunas_projetadas(planilha_fake):
+    # O frame do app tem só parte das colunas: as outras ficam como estão na aba
+    planilha_fake({"Log": _aba().assign(Obs=["x", "y", "z", "w"])})
+    orig = _aba()[["Nome", "Valor"]]
+    edit = orig.drop(index=0)
+    edit.loc[2, "Valor"] = "30"
+
+    conexoes._sheets_salvar_diff("Log", orig, edit)
+
+    valores = conexoes.get_worksheet("Log").get_all_values(_contar=False)
+    assert valores == [
+        ["Data", "Nome", "Valor", "Obs"],
+        ["2025-01-02", "b", "2", "y"],
+        ["2025-01-03", "c", "30", "z"],
+        ["2025-01-04", "d", "4", "w"],
+    ]
+
+def test_salvar_diff_estrutura_mudou_reescreve(planilha_fake):
+    cliente = planilha_fake({"Log": _aba()})
+    orig = _aba()
+    edit = orig.rename(columns={"Valor": "Preco"})
+
+    resumo = conexoes._sheets_salvar_diff("Log", orig, edit)
+
+    assert resumo["modo"] == "completo"
+    assert cliente.chamadas["batch_update"] == 0
+    assert conexoes.get_worksheet("Log").get_all_values(_contar=False)[0] == ["Data", "Nome", "Preco"]
+
+def test_salvar_diff_resposta_perdida_nao_reaplica(planilha_fake, monkeypatch):
+    # O batch entra na aba e só a resposta se perde: a releitura confere e nada é apagado duas vezes
+    cliente = planilha_fake({"Log": _aba()})
+    planilha = conexoes._get_planilha()
+    original = planilha.batch_update
+    perdidas = [_criar_erro("500", "batch_update")]
+
+    def batch_update_sem_resposta(body):
+        resposta = original(body)
+        if perdidas:
+            raise perdidas.pop()
+        return resposta
+
+    monkeypatch.setattr(planilha, "batch_update", batch_update_sem_resposta)
+    orig = _aba()
+    edit = orig.drop(index=1)
+
+    conexoes._sheets_salvar_diff("Log", orig, edit)
+
+    assert cliente.chamadas["batch_update"] == 1
+    assert [l[1] for l in conexoes.get_worksheet("Log").get_all_values(_contar=False)[1:]] == ["a", "c", "d"]
+
+def test_salvar_diff_500_antes_de_aplicar_reenvia(planilha_fake):
+    cliente = planilha_fake({"Log": _aba()})
+    conexoes.get_worksheet("Log")
+    cliente.injetar_erro("500", "batch_update")
+    orig = _aba()
+    edit = orig.drop(index=1)
+
+    conexoes._sheets_salvar_diff("Log", orig, edit)
+
+    assert cliente.chamadas["batch_update"] == 2
+    assert [l[1] for l in conexoes.get_worksheet("Log").get_all_values(_contar=False)[1:]] == ["a", "c", "d"]
+
+def test_salvar_diff_aba_mexida_por_fora_sobe_incerta(planilha_fake, monkeypatch):
+    # Se a aba não está nem como antes nem como esperado, não dá para saber: não reenvia
+    cliente = planilha_fake({"Log": _aba()})
+    planilha = conexoes._get_planilha()
+    ws = conexoes.get_worksheet("Log")
+    original = planilha.batch_update
+
+    def batch_update_e_outra_edicao(body):
+        original(body)
+        ws.append_rows([["2025-01-09", "z", "9"]])
+        raise _criar_erro("500", "batch_update")
+
+    monkeypatch.setattr(planilha, "batch_update", batch_update_e_outra_edicao)
+    orig = _aba()
+
+    with pytest.raises(agendador.EscritaIncerta):
+        conexoes._sheets_salvar_diff("Log", orig, orig.drop(index=1))
+    assert cliente.chamadas["batch_update"] == 1
+    assert len(ws.get_all_values(_contar=False)) == 5
@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules import livro
+
+@pytest.fixture(autouse=True)
+def livro_limpo(monkeypatch):
+    """Cada teste começa sem eventos dobrados nem snapshots."""
+    monkeypatch.setattr(livro, "_hashes", np.array([], dtype=np.uint64))
+    monkeypatch.setattr(livro, "_snapshots", {0: {}})
+    monkeypatch.setattr(livro, "_stats", {"consultas": 0, "eventos_dobrados": 0, "eventos_reaproveitados": 0})
+
+# --- DADOS ---
+def _historico(n=300, semente=7):
+    """n eventos em dias distintos, com vendas que nunca passam da posição."""
+    rng = np.random.default_rng(semente)
+    datas = pd.date_range("2023-01-01", periods=n, freq="D")
+    cotas = {"MXRF11": 0, "HGLG11": 0, "VGIR11": 0}
+    linhas = []
+    for data in datas:
+        ticker = rng.choice(list(cotas))
+        preco = float(rng.integers(8, 12))
+        if cotas[ticker] > 0 and rng.random() < 0.3:
+            q = int(rng.integers(1, cotas[ticker] + 1))
+            cotas[ticker] -= q
+            linhas.append(livro.evento(data, ticker, "Venda", q, preco, taxas=0.5))
+        else:
+            q = int(rng.integers(1, 20))
+            cotas[ticker] += q
+            linhas.append(livro.evento(data, ticker, "Compra", q, preco, taxas=0.5))
+    return pd.DataFrame(linhas, columns=livro.COLUNAS_EVENTO)
+
+def _fold_referencia(df_hist, ate=None):
+    """O fold linha a linha, sem snapshots: {ticker: (cotas, custo, realizado)}."""
+    df = df_hist.assign(_data=pd.to_datetime(df_hist["Data"])).sort_values("_data", kind="stable")
+    if ate is not None:
+        df = df[df["_data"] <= pd.Timestamp(ate)]
+    estado = {}
+    for _, ev in df.iterrows():
+        qtd, custo, realizado = estado.get(ev["Ticker"], (0.0, 0.0, 0.0))
+        if ev["Tipo"] == "Venda":
+            baixa = (custo / qtd if qtd > 0 else 0.0) * ev["Cotas"]
+            qtd, custo, realizado = qtd - ev["Cotas"], custo - baixa, realizado + ev["Total"] - baixa
+            if qtd <= 1e-9:
+                qtd, custo = 0.0, 0.0
+        else:
+            qtd, custo = qtd + ev["Cotas"], custo + ev["Total"]
+        estado[ev["Ticker"]] = (qtd, custo, realizado)
+    return estado
+
+def _confere(df_hist, ate=None):
+    obtido = livro.posicoes(df_hist, ate=ate, incluir_zeradas=True).set_index("Ticker")
+    esperado = _fold_referencia(df_hist, ate)
+    assert sorted(obtido.index) == sorted(esperado)
+    for ticker, (qtd, custo, realizado) in esperado.items():
+        assert obtido.at[ticker, "Cotas"] == pytest.approx(qtd)
+        assert obtido.at[ticker, "Custo_Total"] == pytest.approx(custo)
+        assert obtido.at[ticker, "Lucro_Realizado"] == pytest.approx(realizado)
+
+# --- FOLD E SNAPSHOTS ---
+def test_posicoes_igual_ao_fold_linha_a_linha():
+    hist = _historico()
+    _confere(hist)
+    _confere(hist, ate="2023-05-15")
+
+def test_append_dobra_so_o_evento_novo():
+    hist = _historico()
+    livro.posicoes(hist)
+    antes = livro.get_stats()["eventos_dobrados"]
+
+    novo = pd.concat([hist, pd.DataFrame([livro.evento("2024-06-01", "MXRF11", "Compra", 5, 10)])], ignore_index=True)
+    _confere(novo)
+
+    assert livro.get_stats()["eventos_dobrados"] - antes == 1
+
+def test_insercao_retroativa_parte_do_snapshot_anterior():
+    hist = _historico()
+    livro.posicoes(hist)
+    antes = livro.get_stats()
+
+    # Compra com data no meio do histórico, anexada no fim da planilha
+    retroativa = livro.evento("2023-08-15", "HGLG11", "Compra", 7, 9)
+    novo = pd.concat([hist, pd.DataFrame([retroativa])], ignore_index=True)
+    _confere(novo)
+
+    depois = livro.get_stats()
+    posicao = int((pd.to_datetime(hist["Data"]) <= pd.Timestamp("2023-08-15")).sum())
+    base = posicao // livro.INTERVALO_SNAPSHOT * livro.INTERVALO_SNAPSHOT
+    assert base > 0
+    assert depois["eventos_dobrados"] - antes["eventos_dobrados"] == len(novo) - base
+    assert depois["eventos_reaproveitados"] - antes["eventos_reaproveitados"] == base
+
+def test_consulta_em_data_depois_de_insercao_retroativa():
+    hist = _historico()
+    livro.posicoes(hist)
+    novo = pd.concat([hist, pd.DataFrame([livro.evento("2023-03-10", "VGIR11", "Compra", 3, 10)])], ignore_index=True)
+    for ate in ["2023-03-09", "2023-03-10", "2023-07-01", "2023-10-27"]:
+        _confere(novo, ate=ate)
+
+def test_edicao_no_meio_invalida_snapshots_seguintes():
+    hist = _historico()
+    livro.posicoes(hist)
+    editado = hist.copy()
+    editado.loc[200, "Total"] = float(editado.loc[200, "Total"]) + 100
+    _confere(editado)
+
+# --- COTAS DISPONÍVEIS ---
+def _mxrf():
+    return pd.DataFrame([
+        ["2025-01-10", "MXRF11", "Compra", 100, 10, 1000],
+        ["2025-03-01", "MXRF11", "Venda", 80, 11, 880],
+        ["2025-05-01", "MXRF11", "Compra", 50, 10, 500],
+    ], columns=livro.COLUNAS_EVENTO)
+
+@pytest.mark.parametrize("data, esperado", [
+    ("2024-12-01", 0.0),   # antes da primeira compra
+    ("2025-01-10", 20.0),  # no dia da compra: a venda de março precisa de 80 delas
+    ("2025-02-01", 20.0),
+    ("2025-04-01", 20.0),
+    ("2025-06-01", 70.0),
+])
+def test_cotas_disponiveis(data, esperado):
+    assert livro.cotas_disponiveis(_mxrf(), "MXRF11", data) == esperado
+
+def test_cotas_disponiveis_ativo_sem_eventos():
+    assert livro.cotas_disponiveis(_mxrf(), "HGLG11", "2025-06-01") == 0.0
+
+# --- MIGRAÇÃO ---
+def test_reconciliar_permite_venda_retroativa_da_posicao_migrada():
+    hist = pd.DataFrame([
+        ["2025-01-10", "MXRF11", "Compra", 20, 10, 200],
+        ["2025-02-01", "HGLG11", "Compra", 10, 160, 1600],
+    ], columns=livro.COLUNAS_EVENTO)
+    carteira = pd.DataFrame({
+        "Ticker": ["MXRF11", "HGLG11", "VGIR11"],
+        "Cotas": [100, 5, 50],
+        "Preco_Medio": [10, 160, 9.5],
+    })
+
+    ajustes = livro.reconciliar(carteira, hist, "2025-07-01", data_inicial="2025-01-09")
+    migrado = pd.concat([hist, pd.DataFrame(ajustes)], ignore_index=True)
+
+    # A posição antiga entra antes do primeiro evento; só a redução fica na data da migração
+    por_ticker = {(a["Ticker"], a["Data"]): a["Cotas"] for a in ajustes}
+    assert por_ticker[("MXRF11", "2025-01-09")] == 80
+    assert por_ticker[("VGIR11", "2025-01-09")] == 50
+    assert por_ticker[("HGLG11", "2025-07-01")] == -5
+
+    final = livro.posicoes(migrado).set_index("Ticker")
+    assert final.at["MXRF11", "Cotas"] == 100 and final.at["MXRF11", "Preco_Medio"] == pytest.approx(10)
+    assert final.at["VGIR11", "Preco_Medio"] == pytest.approx(9.5)
+    assert final.at["HGLG11", "Cotas"] == 5
+
+    # Venda com data anterior à migração de uma posição que só existia na Carteira antiga
+    assert livro.cotas_disponiveis(migrado, "VGIR11", "2025-06-01") == 50
+    venda = livro.evento("2025-06-01", "VGIR11", "Venda", 20, 10)
+    depois = livro.posicoes(pd.concat([migrado, pd.DataFrame([venda])], ignore_index=True)).set_index("Ticker")
+    assert depois.at["VGIR11", "Cotas"] == 30
+    assert depois.at["VGIR11", "Lucro_Realizado"] == pytest.approx(20 * (10 - 9.5))
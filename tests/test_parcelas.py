@@ -0,0 +1,111 @@
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from dateutil.relativedelta import relativedelta
+
+from modules import financeiro
+
+DIAS_FECHAMENTO = {"Nubank": 2, "Itaú": 1, "Mercado Pago": 5, "Banco Pan": 26}
+
+# --- DADOS ---
+def _parcelas():
+    return pd.DataFrame([
+        ["Geladeira", 3000.0 / 10, 10, "2025-01-15", "Nubank"],
+        ["Fone", 50.0, 1, "2025-03-02", "Nubank"],          # no dia do fechamento: mês seguinte
+        ["Livro", 40.0, 1, "2025-03-01", "Nubank"],         # antes do fechamento: mesmo mês
+        ["Passagem", 200.0, 6, "2025-02-26", "Banco Pan"],
+        ["Mercado", 120.0, 2, "2025-02-25", "Banco Pan"],
+        ["Curso", 99.9, 12, "2024-11-30", "Mercado Pago"],
+        ["Sem cartão", 10.0, 3, "2025-04-10", "Cartão Novo"],  # fora do dicionário: fecha dia 1
+        ["Notebook", 450.0, 24, "2024-06-05", "Itaú"],
+        ["Antiga", 80.0, 3, "2023-01-10", "Itaú"],          # já terminou
+        ["Futura", 70.0, 4, "2026-01-20", "Nubank"],        # começa depois do horizonte
+    ], columns=["O Quê", "Valor", "Vezes", "Data_Compra", "Cartão"])
+
+def _financiamentos():
+    return pd.DataFrame([
+        ["Carro", "2024-10-10", 48, 900.0],
+        ["Moto", "2025-01-31", 3, 300.0],      # fim de mês: dia 28 ainda não chegou
+        ["Reforma", "2025-02-28", 5, 150.0],
+        ["Celular", "2025-03-29", 2, 80.0],
+        ["Quitado", "2023-05-01", 12, 500.0],
+    ], columns=["Descricao", "Data_Inicio", "Qtd_Total", "Valor_Parcela"])
+
+# --- LAÇO ANTIGO (projetar_futuro antes da varredura) ---
+def _cartao_antigo(lista_despesas, hoje, horizonte):
+    gastos = []
+    for i in range(horizonte):
+        data_ref = hoje + relativedelta(months=i)
+        total = 0.0
+        for despesa in lista_despesas:
+            data_compra = datetime.strptime(str(despesa["Data_Compra"]), "%Y-%m-%d").date()
+            dia_fec = DIAS_FECHAMENTO.get(despesa["Cartão"], 1)
+            if data_compra.day >= dia_fec: inicio_pagto = data_compra + relativedelta(months=1)
+            else: inicio_pagto = data_compra
+            data_primeira_parc = date(inicio_pagto.year, inicio_pagto.month, 1)
+            data_ultima_parc = data_primeira_parc + relativedelta(months=despesa["Vezes"] - 1)
+            if data_primeira_parc <= date(data_ref.year, data_ref.month, 1) <= data_ultima_parc:
+                total += float(despesa["Valor"])
+        gastos.append(total)
+    return np.array(gastos)
+
+def _financiamentos_antigo(lista_financiamentos, hoje, horizonte):
+    gastos = []
+    for i in range(horizonte):
+        data_ref = hoje + relativedelta(months=i)
+        ano_ref, mes_ref = data_ref.year, data_ref.month
+        total = 0.0
+        for fin in lista_financiamentos:
+            dt_inicio = datetime.strptime(str(fin["Data_Inicio"]), "%Y-%m-%d").date()
+            dt_fim = dt_inicio + relativedelta(months=fin["Qtd_Total"])
+            if dt_inicio <= date(ano_ref, mes_ref, 28) <= dt_fim:
+                meses_corridos = (ano_ref - dt_inicio.year) * 12 + (mes_ref - dt_inicio.month)
+                if meses_corridos < fin["Qtd_Total"]:
+                    total += float(fin["Valor_Parcela"])
+        gastos.append(total)
+    return np.array(gastos)
+
+# --- VARREDURA x LAÇO ---
+@pytest.mark.parametrize("hoje", [date(2024, 9, 15), date(2025, 1, 1), date(2025, 2, 28), date(2025, 12, 31)])
+@pytest.mark.parametrize("horizonte", [1, 12, 36])
+def test_parcelas_igual_ao_laco_antigo(hoje, horizonte):
+    mes_inicial = hoje.year * 12 + hoje.month - 1
+    obtido = financeiro._varrer_meses(*financeiro._triplas_parcelas(_parcelas(), DIAS_FECHAMENTO), mes_inicial, horizonte)
+    esperado = _cartao_antigo(_parcelas().to_dict("records"), hoje, horizonte)
+    np.testing.assert_allclose(obtido, esperado, atol=1e-9)
+
+@pytest.mark.parametrize("hoje", [date(2024, 9, 15), date(2025, 1, 1), date(2025, 2, 28), date(2025, 12, 31)])
+@pytest.mark.parametrize("horizonte", [1, 12, 36])
+def test_financiamentos_igual_ao_laco_antigo(hoje, horizonte):
+    mes_inicial = hoje.year * 12 + hoje.month - 1
+    obtido = financeiro._varrer_meses(*financeiro._triplas_financiamentos(_financiamentos()), mes_inicial, horizonte)
+    esperado = _financiamentos_antigo(_financiamentos().to_dict("records"), hoje, horizonte)
+    np.testing.assert_allclose(obtido, esperado, atol=1e-9)
+
+def test_simulacao_entra_como_mais_uma_compra():
+    hoje = date(2025, 3, 10)
+    simulacao = {"desc": "TV", "valor": 2400.0, "vezes": 12, "data": date(2025, 3, 5), "cartao": "Mercado Pago"}
+    mes_inicial = hoje.year * 12 + hoje.month - 1
+    obtido = financeiro._varrer_meses(
+        *financeiro._triplas_parcelas(_parcelas(), DIAS_FECHAMENTO, simulacao), mes_inicial, 18
+    )
+    lista = _parcelas().to_dict("records") + [{
+        "Valor": 2400.0 / 12, "Vezes": 12, "Data_Compra": "2025-03-05", "Cartão": "Mercado Pago",
+    }]
+    np.testing.assert_allclose(obtido, _cartao_antigo(lista, hoje, 18), atol=1e-9)
+    # Depois da última parcela o mês fica zerado de fato (sem resíduo da soma acumulada)
+    assert obtido[-1] == 0.0 and not np.signbit(obtido[-1])
+
+def test_tabelas_vazias():
+    vazias = pd.DataFrame(columns=["O Quê", "Valor", "Vezes", "Data_Compra", "Cartão"])
+    cartao, finan = financeiro.gastos_projetados(vazias, pd.DataFrame(), horizonte=6)
+    np.testing.assert_array_equal(cartao, np.zeros(6))
+    np.testing.assert_array_equal(finan, np.zeros(6))
+
+def test_gastos_projetados_a_partir_do_mes_atual():
+    hoje = datetime.now().date()
+    cartao, finan = financeiro.gastos_projetados(_parcelas(), _financiamentos(), horizonte=24, dias_fechamento=DIAS_FECHAMENTO)
+    np.testing.assert_allclose(cartao, _cartao_antigo(_parcelas().to_dict("records"), hoje, 24), atol=1e-9)
+    np.testing.assert_allclose(finan, _financiamentos_antigo(_financiamentos().to_dict("records"), hoje, 24), atol=1e-9)